@@ -0,0 +1,267 @@
+"""
+Medidas de desempenho das etapas da ferramenta.
+"""
+from argparse import Namespace
+from typing import Callable, Dict, List, Sequence, Tuple, Any
+import numpy as np
+from lib.tipos import Imagem
+from lib.args import Argumentos, verbosidade, transformacoes, imagem, natural, racional, metodo, cor
+from lib.inout import encode, canais
+from lib.interp import Metodo
+from lib.plano import plano, indices
+from lib.adaptativo import adaptativo, detalhes
+from lib.custo import CALIBRACAO, calibracao
+from lib.ajuste import PERFIL, carrega, salva, ajusta, interpolacao, cache, lado
+from lib.cisalhamento import cisalhamento
+from lib.maquina import medida
+
+
+DESCRICAO = 'Medidas de desempenho das etapas da ferramenta.'
+# parser de argumentos
+parser = Argumentos(allow_abbrev=False, description=DESCRICAO)
+parser.add_argument('-v', '--verboso', action='count', default=0,
+                    help='mostra detalhes da execução')
+parser.add_argument('-r', '--repeticoes', type=natural(min=1), default=3,
+                    help='repetições de cada medida, usando a menor (padrão: 3)')
+comandos = parser.add_subparsers(dest='comando', metavar='COMANDO', required=True)
+
+
+def comando(nome: str, ajuda: str, fn: Callable[[Namespace], None]) -> Argumentos:
+    """
+    Registra a função como subcomando, retornando o
+    parser dele para argumentos adicionais.
+    """
+    sub = comandos.add_parser(nome, help=ajuda, description=ajuda)
+    sub.set_defaults(executa=fn)
+    return sub
+
+
+def psnr(img: Imagem, ref: Imagem) -> float:
+    """
+    Relação sinal-ruído de pico entre duas imagens,
+    em dB.
+    """
+    mse = np.mean(np.square(img.astype(float) - ref))
+    return 10 * np.log10(255**2 / mse) if mse > 0 else float('inf')
+
+
+def argumentos(sub: Argumentos) -> None:
+    """
+    Argumentos comuns de transformação da imagem.
+    """
+    sub.add_argument('imagem', metavar='IMAGEM', type=imagem,
+                     help='imagem de entrada')
+    transformacoes(sub)
+    sub.add_argument('-m', '--metodo', type=metodo, choices=Metodo, default='bicubica',
+                     help='método de interpolação (padrão: bicubica)')
+    sub.add_argument('-c', '--cor', type=cor, default=cor('transparente'),
+                     help='cor de fundo da imagem transformada')
+
+
+def tabela(cabecalho: Sequence[str], linhas: List[Sequence[Any]]) -> None:
+    """
+    Imprime as linhas alinhadas em colunas.
+    """
+    texto = [list(map(str, cabecalho))] + [list(map(str, linha)) for linha in linhas]
+    largura = [max(len(linha[i]) for linha in texto) for i in range(len(cabecalho))]
+    for linha in texto:
+        print('  '.join(cel.rjust(tam) for cel, tam in zip(linha, largura)))
+
+
+# # # # # # # #
+# COMANDOS    #
+
+# formatos e opções de escrita comparados
+CODIFICACOES: List[Tuple[str, Dict[str, Any]]] = [
+    ('png', {}),
+    *(('png', {'compressao': nivel}) for nivel in (0, 1, 3, 6, 9)),
+    ('png', {'compressao': 1, 'estrategia': 'rle'}),
+    ('png', {'compressao': 1, 'estrategia': 'huffman'}),
+    ('png', {'compressao': 1, 'filtro': 'nenhum'}),
+    ('png', {'compressao': 1, 'filtro': 'paeth'}),
+    ('png', {'compressao': 6, 'filtro': 'todos'}),
+    ('pam', {}),
+    ('bmp', {}),
+    ('npy', {}),
+    ('raw', {}),
+]
+
+def codificacao(args: Namespace) -> None:
+    """
+    Tamanho e tempo de codificação de cada formato.
+    """
+    img, arquivo = args.imagem
+    print(f'{arquivo} {img.shape}')
+
+    linhas = []
+    for ext, opcoes in CODIFICACOES:
+        tempo, buf = medida(lambda: encode(img, ext, **opcoes), args.repeticoes)
+        nome = ' '.join(f'{chave}={valor}' for chave, valor in opcoes.items())
+        linhas.append((ext, nome or '-', len(buf), f'{len(buf) / img.nbytes:.3f}', f'{1000 * tempo:.2f}'))
+
+    tabela(('formato', 'opções', 'bytes', 'proporção', 'ms'), linhas)
+
+cod = comando('codificacao', 'tamanho e tempo de escrita por formato', codificacao)
+cod.add_argument('imagem', metavar='IMAGEM', type=imagem,
+                 help='imagem a ser codificada')
+
+
+def adaptacao(args: Namespace) -> None:
+    """
+    Fração de pixels com o método caro, tempo e PSNR da
+    interpolação adaptativa contra o método completo.
+    """
+    img, fundo = canais(args.imagem[0], args.cor)
+    ind = indices(plano(img.shape[:2], angulo=args.angulo, beta=args.beta, escala=args.escala, dim=args.dim))
+    print(f'{args.imagem[1]} {img.shape} -> {ind.shape[1:]}')
+
+    tempo, ref = medida(lambda: args.metodo(img, ind, fundo), args.repeticoes)
+    linhas = [(f'{args.metodo}', '-', '100.0', f'{1000 * tempo:.1f}', 'inf')]
+    for limiar in args.limiares:
+        tempo, res = medida(lambda: adaptativo(img, ind, fundo, args.metodo, limiar, simples=args.simples),
+                            args.repeticoes)
+        fracao = detalhes(img, ind, limiar).mean()
+        linhas.append((f'adaptativo/{args.simples}', limiar, f'{100 * fracao:.1f}',
+                       f'{1000 * tempo:.1f}', f'{psnr(res, ref):.2f}'))
+
+    tabela(('método', 'limiar', '% caro', 'ms', 'PSNR'), linhas)
+
+adp = comando('adaptativo', 'interpolação adaptativa contra o método completo', adaptacao)
+argumentos(adp)
+adp.add_argument('-l', '--limiares', metavar='LIMIAR', type=racional(min=0), nargs='+',
+                 default=[4, 8, 16, 32, 64], help='limiares de variação comparados')
+adp.add_argument('-s', '--simples', type=metodo, choices=Metodo, default='bilinear',
+                 help='método das regiões planas (padrão: bilinear)')
+
+
+def calibragem(args: Namespace) -> None:
+    """
+    Refaz a calibração do modelo de custo de `--plano`
+    e salva para esta máquina.
+    """
+    coef = calibracao(args.arquivo, recalibra=True, repeticoes=args.repeticoes)
+    print(f'{args.arquivo}')
+    tabela(('etapa', 'ns', 'por'),
+           [(nome, f'{1e9 * k:.2f}', 'pixel' if nome == 'indices' else 'pixel e canal')
+            for nome, k in coef.items()])
+
+cal = comando('calibracao', 'calibra os tempos previstos por --plano nesta máquina', calibragem)
+cal.add_argument('-a', '--arquivo', default=CALIBRACAO,
+                 help=f'arquivo das calibrações (padrão: {CALIBRACAO})')
+
+
+def autoajuste(args: Namespace) -> None:
+    """
+    Ajusta a configuração de cada método nesta máquina,
+    salvando o melhor perfil para `transforma.py`.
+    """
+    formas = [(lado, lado) for lado in args.formas]
+    perfis = carrega(args.arquivo)
+
+    linhas = []
+    for met in args.metodos:
+        melhor, tempos = ajusta(met, formas, repeticoes=args.repeticoes, trabalhadores=args.trabalhadores)
+        perfis[met] = melhor
+        padrao = tempos[0][1]
+        for perfil, tempo in tempos:
+            marca = '*' if perfil == melhor._replace(trabalhadores=None) else ''
+            linhas.append((f'{met}', perfil.coleta, perfil.faixa or '-', perfil.ladrilho or '-', f'{1000 * tempo:.1f}',
+                           f'{padrao / tempo:.2f}x', marca))
+        print(f'{met}: {melhor}')
+
+    salva(perfis, args.arquivo)
+    tabela(('método', 'coleta', 'faixa', 'ladrilho', 'ms', 'aceleração', 'melhor'), linhas)
+    print(f'perfil salvo em {args.arquivo}')
+
+aju = comando('autoajuste', 'ajusta coleta, faixas ou ladrilhos e processos de cada método nesta máquina', autoajuste)
+aju.add_argument('-m', '--metodos', type=metodo, choices=Metodo, nargs='+', default=list(Metodo),
+                 help='métodos ajustados (padrão: todos)')
+aju.add_argument('-f', '--formas', metavar='LADO', type=natural(min=1), nargs='+', default=[256, 1024],
+                 help='lados das saídas quadradas medidas (padrão: 256 1024)')
+aju.add_argument('-t', '--trabalhadores', metavar='N', type=natural(min=1), nargs='+',
+                 help='números de processos comparados (padrão: 1, metade e todas as CPUs)')
+aju.add_argument('-a', '--arquivo', default=PERFIL,
+                 help=f'arquivo dos perfis (padrão: {PERFIL})')
+
+
+def cisalhamentos(args: Namespace) -> None:
+    """
+    Tempo e PSNR das três passadas 1D de `--cisalhamento`
+    contra a interpolação 2D direta, para cada método.
+    """
+    img, fundo = canais(args.imagem[0], args.cor)
+    P = plano(img.shape[:2], angulo=args.angulo, beta=args.beta, escala=args.escala, dim=args.dim)
+    print(f'{args.imagem[1]} {img.shape} -> {P.dim}')
+
+    linhas = []
+    for met in args.metodos:
+        direto, ref = medida(lambda: met(img, indices(P), fundo), args.repeticoes)
+        tempo, res = medida(lambda: cisalhamento(img, P, met, fundo), args.repeticoes)
+        linhas.append((f'{met}', f'{1000 * direto:.1f}', f'{1000 * tempo:.1f}',
+                       f'{direto / tempo:.2f}x', f'{psnr(res, ref):.2f}'))
+
+    tabela(('método', 'direto ms', 'cisalh. ms', 'aceleração', 'PSNR'), linhas)
+
+cis = comando('cisalhamento', 'três cisalhamentos 1D contra a interpolação 2D direta', cisalhamentos)
+cis.add_argument('imagem', metavar='IMAGEM', type=imagem,
+                 help='imagem de entrada')
+transformacoes(cis)
+cis.add_argument('-m', '--metodos', type=metodo, choices=Metodo, nargs='+', default=list(Metodo),
+                 help='métodos comparados (padrão: todos)')
+cis.add_argument('-c', '--cor', type=cor, default=cor('transparente'),
+                 help='cor de fundo da imagem transformada')
+
+
+def localidade(args: Namespace) -> None:
+    """
+    Tempo da mesma janela da saída, de uma rotação de
+    entradas cada vez maiores, interpolada de uma vez,
+    em faixas e em ladrilhos na ordem de Morton.
+    """
+    l2, l3 = cache(2), cache(3)
+    print(f'cache L2 {l2 >> 10} KiB, L3 {l3 >> 10} KiB')
+    rng = np.random.default_rng(0)
+    fundo = np.zeros(args.canais, dtype=np.uint8)
+
+    linhas = []
+    for met in args.metodos:
+        ladrilho = args.ladrilho or lado(met, args.canais)
+        for lado_entrada in args.lados:
+            img = rng.integers(0, 256, (lado_entrada, lado_entrada, args.canais), dtype=np.uint8)
+            P = plano(img.shape[:2], angulo=args.angulo)
+            # janela fixa no centro, com o mesmo trabalho em todas as entradas
+            H, W = P.dim
+            J = min(args.janela, H, W)
+            janela = ((H - J) // 2, (W - J) // 2, J, J)
+
+            cheia, _ = medida(lambda: interpolacao(img, P, met, fundo, janela=janela), args.repeticoes)
+            faixas, _ = medida(lambda: interpolacao(img, P, met, fundo, faixa=64, janela=janela), args.repeticoes)
+            ladrilhos, _ = medida(lambda: interpolacao(img, P, met, fundo, ladrilho=ladrilho, janela=janela),
+                                  args.repeticoes)
+            linhas.append((f'{met}', lado_entrada, f'{img.nbytes >> 20}', 'sim' if img.nbytes > l3 else 'não',
+                           f'{1000 * cheia:.1f}', f'{1000 * faixas:.1f}', ladrilho, f'{1000 * ladrilhos:.1f}',
+                           f'{cheia / ladrilhos:.2f}x'))
+
+    tabela(('método', 'entrada', 'MiB', '> L3', 'inteira ms', 'faixas ms', 'ladrilho', 'ladrilhos ms',
+            'aceleração'), linhas)
+
+loc = comando('localidade', 'ladrilhos em ordem de Morton contra a saída inteira, por tamanho de entrada',
+              localidade)
+loc.add_argument('-m', '--metodos', type=metodo, choices=Metodo, nargs='+', default=list(Metodo),
+                 help='métodos comparados (padrão: todos)')
+loc.add_argument('-l', '--lados', metavar='LADO', type=natural(min=1), nargs='+',
+                 default=[1024, 2048, 4096, 8192], help='lados das entradas quadradas (padrão: 1024 2048 4096 8192)')
+loc.add_argument('-a', '--angulo', type=racional(), default=30,
+                 help='rotação das entradas, em graus (padrão: 30)')
+loc.add_argument('-j', '--janela', metavar='LADO', type=natural(min=1), default=1024,
+                 help='lado da janela central da saída (padrão: 1024)')
+loc.add_argument('-c', '--canais', type=natural(min=1, max=4), default=4,
+                 help='canais das entradas (padrão: 4)')
+loc.add_argument('-L', '--ladrilho', type=natural(min=1),
+                 help='lado dos ladrilhos (padrão: pelo cache L2)')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    verbosidade(args.verboso)
+    args.executa(args)
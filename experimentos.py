@@ -0,0 +1,151 @@
+"""
+Geração dos resultados do relatório em um único processo,
+com os mesmos casos de `run.sh`.
+"""
+import os
+import shlex
+import logging
+from time import perf_counter
+from fnmatch import fnmatch
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, NamedTuple, Optional
+from lib.tipos import Imagem
+from lib.args import Argumentos, SAIDA, verbosidade, natural, imagem, cor
+from lib.inout import imgwrite
+from lib.interp import Metodo
+from lib.api import transforma
+
+
+class Experimento(NamedTuple):
+    """
+    Caso do relatório: imagem de entrada e etapas de
+    transformação aplicadas em sequência.
+    """
+    saida: str
+    entrada: str
+    # opções de cada etapa, como na linha de comando
+    etapas: Tuple[str, ...]
+
+
+# sufixo dos arquivos de cada método
+METODOS = {'viz': 'vizinho', 'bil': 'bilinear', 'bic': 'bicubica', 'lag': 'lagrange'}
+
+def serie(saida: str, entrada: str, *etapas: str) -> List[Experimento]:
+    """
+    O mesmo caso com cada método de interpolação. O
+    método entra no lugar de `{m}` nas etapas e o sufixo
+    dele no lugar de `{m}` na saída.
+    """
+    return [Experimento(saida.format(m=sufixo), entrada, tuple(etapa.format(m=nome) for etapa in etapas))
+            for sufixo, nome in METODOS.items()]
+
+
+EXPERIMENTOS = [
+    # exemplos
+    Experimento('exemplo.png', 'city.png', ('-a asin(0.25) -b deg(pi/4) -e 1/3',)),
+    Experimento('exemplo2.png', 'city.png', ('-a asin(0.25) -b deg(pi/4) -e 1/3 -c red -m bicubica',)),
+    # rotações
+    *serie('rotacoes/house_alp_{m}.png', 'house.png', '-a 15 -m {m}'),
+    *serie('rotacoes/16_alp_{m}.png', 'house16.png', '-a 15 -m {m}'),
+    *serie('rotacoes/64_alp_{m}.png', 'house64.png', '-b -30 -m {m}'),
+    # escalonamento
+    *serie('escala/city_13_{m}.png', 'city.png', '-e 1/3 -m {m}'),
+    *serie('escala/128_86_{m}.png', 'city128.png', '-d 80 60 -m {m}'),
+    *serie('escala/128_15_{m}.png', 'city128.png', '-e 1.5 -m {m}'),
+    # reconstrução, ida e volta
+    *serie('reconstrucao/baboon_x2_{m}.png', 'baboon128.png', '-e 2 -m {m}', '-e 1/2 -m {m}'),
+    *serie('reconstrucao/baboon_45_{m}.png', 'baboon128.png', '-a 45 -m {m} -c black', '-a -45 -m {m}'),
+]
+
+
+DESCRICAO = 'Gera os resultados do relatório em um único processo.'
+# parser de argumentos
+parser = Argumentos(allow_abbrev=False, description=DESCRICAO)
+parser.add_argument('filtros', metavar='FILTRO', nargs='*',
+                    help='só gera as saídas que casam com algum dos padrões (ex: "escala/*")')
+parser.add_argument('-o', '--destino', default='resultados',
+                    help='diretório dos resultados (padrão: resultados)')
+parser.add_argument('-t', '--trabalhadores', type=natural(min=1),
+                    help='número de processos paralelos (padrão: número de CPUs)')
+parser.add_argument('--prefiltro', action='store_true',
+                    help='reduz a entrada antes de reduções grandes, como em transforma.py')
+parser.add_argument('-v', '--verboso', action='count', default=0,
+                    help='mostra detalhes da execução')
+
+
+# imagens de entrada, decodificadas uma vez e
+# herdadas por cada processo
+_ENTRADAS: Dict[str, Imagem] = {}
+
+def _inicia(entradas: Dict[str, Imagem], nivel: int) -> None:
+    """
+    Estado global de cada processo trabalhador.
+    """
+    _ENTRADAS.update(entradas)
+    logging.getLogger().setLevel(nivel)
+
+
+def executa(exp: Experimento, destino: str, prefiltro: bool=False) -> Tuple[Experimento, float]:
+    """
+    Aplica as etapas do experimento em memória e
+    escreve o resultado.
+
+    Retorno
+    -------
+    exp: Experimento
+        O experimento executado.
+    tempo: float
+        Tempo das transformações e da escrita, em segundos.
+    """
+    inicio = perf_counter()
+    img = _ENTRADAS[exp.entrada]
+    for etapa in exp.etapas:
+        opcoes = SAIDA.parse_args(shlex.split(etapa))
+        img = transforma(img, angulo=opcoes.angulo, beta=opcoes.beta, escala=opcoes.escala,
+                         dim=opcoes.dim, metodo=opcoes.metodo or Metodo.BILINEAR,
+                         cor=cor('transparente') if opcoes.cor is None else opcoes.cor, prefiltro=prefiltro)
+
+    caminho = os.path.join(destino, exp.saida)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    imgwrite(img, caminho)
+    return exp, perf_counter() - inicio
+
+
+def experimentos(destino: str, filtros: Optional[List[str]]=None,
+                 trabalhadores: Optional[int]=None, prefiltro: bool=False) -> List[Tuple[Experimento, float]]:
+    """
+    Executa os experimentos selecionados em paralelo,
+    decodificando cada entrada só uma vez.
+    """
+    selecao = [exp for exp in EXPERIMENTOS
+               if not filtros or any(fnmatch(exp.saida, filtro) for filtro in filtros)]
+
+    inicio = perf_counter()
+    entradas = {nome: imagem(os.path.join('imagens', nome))[0]
+                for nome in sorted({exp.entrada for exp in selecao})}
+    logging.info(f'{len(entradas)} entradas em {perf_counter() - inicio:.3f} segundos')
+
+    iniciais = (entradas, logging.getLogger().level)
+    with ProcessPoolExecutor(trabalhadores, initializer=_inicia, initargs=iniciais) as executor:
+        futuros = [executor.submit(executa, exp, destino, prefiltro) for exp in selecao]
+        return [futuro.result() for futuro in futuros]
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    verbosidade(args.verboso)
+
+    inicio = perf_counter()
+    tempos = experimentos(args.destino, args.filtros, args.trabalhadores, args.prefiltro)
+    total = perf_counter() - inicio
+
+    # resumo por grupo de resultados
+    grupos: Dict[str, List[float]] = {}
+    for exp, tempo in tempos:
+        grupos.setdefault(os.path.dirname(exp.saida) or '.', []).append(tempo)
+        logging.info(f'{exp.saida}: {tempo:.3f} segundos')
+
+    for grupo, lista in grupos.items():
+        print(f'{grupo:>14}: {len(lista):3d} saídas em {sum(lista):7.3f} segundos')
+    print(f'{"total":>14}: {len(tempos):3d} saídas em {total:7.3f} segundos'
+          f' (soma das saídas: {sum(t for _, t in tempos):.3f} segundos)')
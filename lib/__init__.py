@@ -4,6 +4,8 @@ Biblioteca auxiliar para a ferramenta.
 
 - `tipos`: Tipos para análise com MyPy.
 
+- `api`: Interface em memória, sem linha de comando.
+
 - `inout`: Leitura e escrita de imagens.
 
 - `args`: Tratamento de argumentos da linha de
@@ -18,5 +20,51 @@ Biblioteca auxiliar para a ferramenta.
 - `opimg`: Operações lineares aplicadas em imagens,
     considerando os limites dela.
 
+- `plano`: Montagem da transformação completa, dos
+    índices de uma janela da saída e da renderização em
+    faixas ou ladrilhos.
+
 - `interp`: Métodos de interpolação.
+
+- `visual`: Visualização interativa com controles.
+
+- `fonte`: Entrada mapeada em disco, lida por blocos
+    sob demanda.
+
+- `distribuido`: Renderização em faixas por trabalhadores
+    ligados por sockets.
+
+- `reducao`: Pré-filtro da entrada por médias de blocos.
+
+- `multiplo`: Várias saídas de uma mesma entrada.
+
+- `varredura`: Varredura de parâmetros em paralelo.
+
+- `piramide`: Pirâmides de ladrilhos Deep Zoom.
+
+- `adaptativo`: Interpolação adaptativa pela variação
+    local da entrada.
+
+- `cache`: Cache de resultados em disco, pelo conteúdo
+    da entrada e pela transformação.
+
+- `custo`: Memória e tempo previstos, com calibração
+    por máquina.
+
+- `maquina`: Nome da máquina, arquivos salvos por
+    usuário e medida de tempo.
+
+- `incremental`: Renderização só das regiões afetadas
+    por alterações na entrada.
+
+- `ajuste`: Perfil da interpolação ajustado para cada
+    máquina, com faixas ou ladrilhos em ordem de Morton.
+
+- `cisalhamento`: Transformações afins em três
+    cisalhamentos 1D.
+
+- `mapa`: Mapas de coordenadas externos, lidos em
+    faixas do disco.
+
+- `espaco`: Buffers reutilizáveis para as interpolações.
 """
@@ -0,0 +1,117 @@
+"""
+Interpolação adaptativa: métodos caros só onde a imagem
+tem detalhe.
+"""
+import logging
+import numpy as np
+import cv2
+from .tipos import Imagem, Indices, Color
+from .interp import Metodo
+
+
+def variacao(img: Imagem, bloco: int=8) -> np.ndarray:
+    """
+    Mapa de variação local da entrada, com o maior
+    gradiente de cada bloco e de seus vizinhos.
+
+    Parâmetros
+    ----------
+    img: ndarray
+        Imagem de entrada.
+    bloco: int, opcional
+        Lado dos blocos. Padrão: 8.
+
+    Retorno
+    -------
+    mapa: ndarray
+        Matriz `(H / bloco, W / bloco)`, arredondada
+        para cima, com a maior diferença absoluta entre
+        pixels adjacentes, em qualquer canal.
+    """
+    H, W, _ = img.shape
+    f = img.astype(np.int16)
+    grad = np.zeros((H, W), dtype=np.int16)
+
+    # diferenças horizontais, marcadas nos dois pixels
+    gx = np.abs(np.diff(f, axis=1)).max(axis=2)
+    np.maximum(grad[:, :-1], gx, out=grad[:, :-1])
+    np.maximum(grad[:, 1:], gx, out=grad[:, 1:])
+    # e verticais
+    gy = np.abs(np.diff(f, axis=0)).max(axis=2)
+    np.maximum(grad[:-1], gy, out=grad[:-1])
+    np.maximum(grad[1:], gy, out=grad[1:])
+
+    # máximo por bloco
+    Hb, Wb = -(-H // bloco), -(-W // bloco)
+    blocos = np.zeros((Hb * bloco, Wb * bloco), dtype=np.int16)
+    blocos[:H, :W] = grad
+    mapa = blocos.reshape(Hb, bloco, Wb, bloco).max(axis=(1, 3))
+    # vizinhança dos núcleos pode cruzar blocos
+    return cv2.dilate(mapa, np.ones((3, 3), dtype=np.uint8))
+
+
+def detalhes(img: Imagem, ind: Indices, limiar: float, *, bloco: int=8) -> np.ndarray:
+    """
+    Pixels da saída que precisam do método caro: os que
+    caem em blocos com variação acima do limiar ou que
+    têm vizinhança cruzando a borda da entrada.
+
+    Retorno
+    -------
+    mascara: ndarray
+        Matriz booleana com o formato da saída.
+    """
+    H, W, _ = img.shape
+    mapa = variacao(img, bloco)
+    x, y = np.floor(ind[:2])
+
+    # vizinhança 4x4, de -1 a +2, com algum pixel dentro da imagem
+    toca = (x > -3) & (x < W + 1) & (y > -3) & (y < H + 1)
+    # mas não totalmente dentro, transição para o fundo
+    dentro = (x >= 1) & (x <= W - 3) & (y >= 1) & (y <= H - 3)
+
+    # ou bloco com detalhe
+    bx = np.clip(x // bloco, 0, mapa.shape[1] - 1).astype(int)
+    by = np.clip(y // bloco, 0, mapa.shape[0] - 1).astype(int)
+    detalhe = mapa[by, bx] > limiar
+    return toca & (detalhe | ~dentro)
+
+
+def adaptativo(img: Imagem, ind: Indices, fundo: Color, metodo: Metodo, limiar: float, *,
+               simples: Metodo=Metodo.BILINEAR, bloco: int=8) -> Imagem:
+    """
+    Interpolação com `metodo` nos pixels com detalhe e
+    `simples` no resto.
+
+    Parâmetros
+    ----------
+    img: ndarray
+        Imagem de entrada.
+    ind: ndarray
+        Matriz das coordenadas homogêneas.
+    fundo: ndarray
+        Cor para índices fora da imagem.
+    metodo: Metodo
+        Método para regiões com detalhe.
+    limiar: float
+        Variação mínima, em níveis de intensidade, para
+        usar o método caro.
+    simples: Metodo, opcional
+        Método para regiões planas. Padrão: bilinear.
+    bloco: int, opcional
+        Lado dos blocos do mapa de variação. Padrão: 8.
+
+    Retorno
+    -------
+    out: ndarray
+        Imagem interpolada da entrada.
+    """
+    mascara = detalhes(img, ind, limiar, bloco=bloco)
+    logging.info(f'{metodo} em {100 * mascara.mean():.1f}% dos pixels, {simples} no resto')
+
+    out = np.empty(ind.shape[1:] + img.shape[2:], dtype=np.uint8)
+    # interpolação só nos pontos selecionados, como vetores
+    for mtd, sel in ((metodo, mascara), (simples, ~mascara)):
+        if sel.any():
+            out[sel] = mtd(img, ind[:, sel, np.newaxis], fundo)[:, 0]
+    return out
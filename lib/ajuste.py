@@ -0,0 +1,241 @@
+"""
+Ajuste automático da configuração da interpolação em
+cada máquina: estratégia de coleta, altura das faixas ou
+lado dos ladrilhos e número de processos, salvos em um
+perfil por método.
+"""
+import os
+import json
+import math
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, Optional, NamedTuple
+import numpy as np
+from . import idx
+from .tipos import Imagem, Color
+from .espaco import Espaco
+from .interp import Metodo
+from .plano import Plano, Janela, plano, indices, ladrilhado
+from .custo import BUFFERS
+from . import maquina
+
+
+# perfis salvos, por nome de máquina e método
+PERFIL = maquina.arquivo('perfil.json')
+# alturas de faixa comparadas, `None` para a saída inteira
+FAIXAS = (None, 16, 64, 256)
+# lados de ladrilho comparados, além do lado pelo cache
+LADRILHOS = (64, 128, 256)
+# cache por núcleo, quando o sistema não informa
+CACHE = 1 << 20
+
+
+class Perfil(NamedTuple):
+    """
+    Configuração da interpolação para um método.
+    """
+    # estratégia de `idx.acesso`
+    coleta: str = 'take'
+    # linhas da saída interpoladas por vez
+    faixa: Optional[int] = None
+    # lado dos ladrilhos da saída interpolados por vez, em
+    # ordem de Morton, no lugar das faixas
+    ladrilho: Optional[int] = None
+    # processos das saídas em paralelo, `None` para o
+    # número de CPUs
+    trabalhadores: Optional[int] = None
+
+
+def carrega(caminho: str=PERFIL) -> Dict[Metodo, Perfil]:
+    """
+    Perfis desta máquina, vazio se não há ajuste salvo.
+    """
+    try:
+        with open(caminho) as arquivo:
+            salvos = json.load(arquivo).get(maquina.nome(), {})
+        return {Metodo[nome.upper()]: Perfil(**perfil) for nome, perfil in salvos.items()}
+    except (OSError, ValueError, KeyError, TypeError) as err:
+        logging.debug(f'perfil {caminho} não lido: {err}')
+        return {}
+
+
+def salva(perfis: Dict[Metodo, Perfil], caminho: str=PERFIL) -> None:
+    """
+    Salva os perfis desta máquina, mantendo os das
+    outras.
+
+    Erro
+    ----
+    ValueError
+        Problema de escrita do arquivo.
+    """
+    try:
+        with open(caminho) as arquivo:
+            salvos = json.load(arquivo)
+    except (OSError, ValueError):
+        salvos = {}
+
+    salvos[maquina.nome()] = {str(metodo): perfil._asdict() for metodo, perfil in perfis.items()}
+    try:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, 'w') as arquivo:
+            json.dump(salvos, arquivo, indent=2)
+    except OSError as err:
+        raise ValueError(f'problema de escrita em {caminho}: {err}') from err
+
+
+def aplica(perfil: Perfil) -> None:
+    """
+    Ativa as opções globais do perfil.
+    """
+    if perfil.coleta not in idx.COLETAS:
+        raise ValueError(f'estratégia de coleta desconhecida: {perfil.coleta}')
+    idx.COLETA = perfil.coleta
+
+
+def cache(nivel: int=2) -> int:
+    """
+    Tamanho do cache de dados do nível dado nesta
+    máquina, em bytes, pelo sysfs do Linux ou pelo
+    `sysconf`.
+    """
+    unidades = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    base = '/sys/devices/system/cpu/cpu0/cache'
+    try:
+        for nome in sorted(os.listdir(base)):
+            caminho = os.path.join(base, nome)
+            with open(os.path.join(caminho, 'level')) as arquivo:
+                if int(arquivo.read()) != nivel:
+                    continue
+            with open(os.path.join(caminho, 'type')) as arquivo:
+                if arquivo.read().strip() == 'Instruction':
+                    continue
+            with open(os.path.join(caminho, 'size')) as arquivo:
+                texto = arquivo.read().strip()
+            if texto[-1:] in unidades:
+                return int(texto[:-1]) * unidades[texto[-1]]
+            return int(texto)
+    except (OSError, ValueError):
+        pass
+    try:
+        tamanho = os.sysconf(f'SC_LEVEL{nivel}_CACHE_SIZE')
+    except (ValueError, OSError):
+        tamanho = 0
+    return tamanho if tamanho > 0 else CACHE
+
+
+def lado(metodo: Metodo, canais: int, tamanho: Optional[int]=None) -> int:
+    """
+    Maior lado de ladrilho, em potência de dois, cujos
+    buffers por canal cabem no cache. São os vizinhos
+    coletados e os acumuladores, relidos a cada vizinho,
+    enquanto coordenadas e pesos são percorridos poucas
+    vezes.
+    """
+    if tamanho is None:
+        tamanho = cache()
+    _, porcanal = BUFFERS[metodo]
+    n = max(int(math.sqrt(tamanho / max(porcanal * canais, 1))), 1)
+    return max(1 << (n.bit_length() - 1), 64)
+
+
+def interpolacao(img: Imagem, P: Plano, metodo: Metodo, fundo: Color, *, faixa: Optional[int]=None,
+                 ladrilho: Optional[int]=None, janela: Optional[Janela]=None,
+                 out: Optional[Imagem]=None) -> Imagem:
+    """
+    Interpolação da janela em faixas de `faixa` linhas
+    ou em ladrilhos de lado `ladrilho`, com os buffers
+    reaproveitados entre eles. Sem nenhum dos dois, a
+    janela é feita de uma vez.
+
+    O resultado é o mesmo da janela inteira, já que as
+    coordenadas de cada pixel são calculadas da mesma
+    forma. A divisão é a de `plano.ladrilhado`.
+    """
+    espaco = Espaco()
+    def desenha(jan: Janela, destino: Imagem) -> None:
+        metodo(img, indices(P, jan), fundo, out=destino, espaco=espaco)
+
+    return ladrilhado(desenha, P.dim, img.shape[2], janela=janela, faixa=faixa, ladrilho=ladrilho, out=out)
+
+
+# # # # # # # # # #
+# Ajuste
+
+def _lote(tarefa: Tuple[Imagem, Plano, Metodo, Color]) -> int:
+    img, P, metodo, fundo = tarefa
+    return metodo(img, indices(P), fundo).size
+
+
+def sinteticos(forma: Tuple[int, int], canais: int=3) -> Tuple[Imagem, Plano, Color]:
+    """
+    Entrada aleatória com metade das dimensões da saída
+    e uma transformação representativa: rotação com
+    ampliação.
+    """
+    rng = np.random.default_rng(0)
+    H, W = forma
+    img = rng.integers(0, 256, (max(H // 2, 1), max(W // 2, 1), canais), dtype=np.uint8)
+    P = plano(img.shape[:2], angulo=30, escala=2, dim=forma)
+    return img, P, np.zeros(canais, dtype=np.uint8)
+
+
+def ajusta(metodo: Metodo, formas: List[Tuple[int, int]], *, repeticoes: int=3,
+           trabalhadores: Optional[List[int]]=None) -> Tuple[Perfil, List[Tuple[Perfil, float]]]:
+    """
+    Compara as configurações candidatas do método nas
+    formas de saída dadas.
+
+    A estratégia de coleta e a faixa ou o ladrilho são
+    medidos juntos, pela soma dos tempos em todas as
+    formas. Além de `LADRILHOS`, também é medido o lado
+    que cabe no cache, por `lado`. O número de
+    processos é medido depois, com a melhor delas, pela
+    vazão de um lote de saídas pequenas.
+
+    Retorno
+    -------
+    melhor: Perfil
+        Configuração mais rápida.
+    tempos: [(Perfil, float)]
+        Tempo de cada configuração medida, em segundos,
+        com o padrão primeiro.
+    """
+    casos = [sinteticos(forma) for forma in formas]
+    anterior = idx.COLETA
+
+    ladrilhos = sorted(set(LADRILHOS) | {lado(metodo, casos[0][0].shape[2])})
+    tempos: List[Tuple[Perfil, float]] = []
+    try:
+        for coleta in idx.COLETAS:
+            for faixa, ladrilho in [(f, None) for f in FAIXAS] + [(None, l) for l in ladrilhos]:
+                perfil = Perfil(coleta, faixa, ladrilho)
+                aplica(perfil)
+                tempo = sum(maquina.medida(lambda: interpolacao(img, P, metodo, fundo, faixa=faixa,
+                                                                  ladrilho=ladrilho), repeticoes)[0]
+                            for img, P, fundo in casos)
+                logging.info(f'{metodo} {perfil}: {tempo:.4f} segundos')
+                tempos.append((perfil, tempo))
+    finally:
+        idx.COLETA = anterior
+    melhor = min(tempos, key=lambda item: item[1])[0]
+
+    cpus = os.cpu_count() or 1
+    if trabalhadores is None:
+        trabalhadores = sorted({1, max(cpus // 2, 1), cpus})
+    if len(trabalhadores) > 1:
+        img, P, fundo = sinteticos((256, 256))
+        lote = [(img, P, metodo, fundo)] * (2 * max(trabalhadores))
+
+        vazoes = []
+        for n in trabalhadores:
+            # pool criado e aquecido fora da medida, que fica só
+            # com a vazão, sem o início dos processos
+            with ProcessPoolExecutor(n, initializer=aplica, initargs=(melhor,)) as executor:
+                list(executor.map(_lote, lote[:n]))
+                tempo, _ = maquina.medida(lambda: list(executor.map(_lote, lote)), repeticoes)
+            logging.info(f'{metodo} com {n} processos: {tempo:.4f} segundos')
+            vazoes.append((tempo, n))
+        melhor = melhor._replace(trabalhadores=min(vazoes)[1])
+
+    return melhor, tempos
@@ -0,0 +1,185 @@
+"""
+Interface em memória para uso da biblioteca em outros
+programas, sem argumentos de linha de comando e sem
+arquivos.
+"""
+from functools import lru_cache
+from typing import Tuple, Optional, Union, Any
+import numpy as np
+from .tipos import Imagem, Color
+from .inout import encode, decode, dimensoes, canais
+from .interp import Metodo
+from .espaco import Espaco
+from .plano import Plano, Janela, plano, indices, pontos
+from .reducao import reduz, nivel, adapta
+
+
+# número de planos mantidos em cache
+PLANOS = 32
+# fundo transparente, em BGRA
+TRANSPARENTE = np.zeros(4, dtype=np.uint8)
+
+
+@lru_cache(maxsize=PLANOS)
+def planejado(shape: Tuple[int, int], angulo: Optional[float], beta: Optional[float],
+              escala: Optional[float], dim: Optional[Tuple[int, int]], reducao: int=0) -> Plano:
+    """
+    Plano da transformação, em cache para chamadas
+    repetidas com os mesmos parâmetros, para a entrada
+    original de dimensões `shape` reduzida `reducao`
+    vezes pela metade.
+
+    Só o plano fica em cache, não os índices, que ocupam
+    24 bytes por pixel da saída e são refeitos a cada
+    chamada.
+    """
+    return adapta(plano(shape, angulo=angulo, beta=beta, escala=escala, dim=dim), reducao)
+
+
+def transforma(entrada: Union[Imagem, bytes], *, angulo: Optional[float]=None,
+               beta: Optional[float]=None, escala: Optional[float]=None,
+               dim: Optional[Tuple[int, int]]=None, metodo: Metodo=Metodo.BILINEAR,
+               cor: Optional[Color]=None, janela: Optional[Janela]=None,
+               tolerancia: Optional[float]=None, formato: Optional[str]=None,
+               out: Optional[Imagem]=None, espaco: Optional[Espaco]=None,
+               prefiltro: bool=False, **codificacao: Any) -> Union[Imagem, bytes]:
+    """
+    Aplica a transformação em uma imagem em memória.
+
+    Parâmetros
+    ----------
+    entrada: ndarray ou bytes
+        Imagem `(H, W)` ou `(H, W, C)` de 8 bits, ou
+        dados codificados de um arquivo de imagem.
+    angulo, beta, escala, dim: opcionais
+        Parâmetros da transformação, como em `plano`.
+    metodo: Metodo, opcional
+        Método de interpolação. Padrão: bilinear.
+    cor: ndarray, opcional
+        Cor de fundo em BGRA. Padrão: transparente.
+    janela: (int, int, int, int), opcional
+        Retângulo `(y, x, altura, largura)` da saída.
+    tolerancia: float, opcional
+        Erro máximo da aproximação por partes.
+    formato: str, opcional
+        Formato de codificação do resultado, como em
+        `encode`. Padrão: PNG para entradas codificadas
+        e nenhum para matrizes.
+    out: ndarray, opcional
+        Matriz de 8 bits, com o formato do resultado,
+        para salvar a imagem interpolada.
+    espaco: Espaco, opcional
+        Área de trabalho reaproveitada entre chamadas.
+    prefiltro: bool, opcional
+        Reduz a entrada pela metade, na decodificação ou
+        por médias de blocos, antes de reduções grandes,
+        como `--prefiltro`. O resultado é aproximado.
+    codificacao:
+        Opções de `encode`, como `compressao`.
+
+    Retorno
+    -------
+    res: ndarray ou bytes
+        Imagem resultante, ou seus dados codificados
+        quando há `formato`.
+
+    Erro
+    ----
+    ValueError
+        Entrada inválida, janela fora da saída, `out`
+        com formato incompatível ou falha na codificação.
+    """
+    dim = None if dim is None else tuple(dim)
+    reducao = 0
+    if isinstance(entrada, (bytes, bytearray, memoryview)):
+        dados = bytes(entrada)
+        forma = dimensoes(dados) if prefiltro else None
+        if forma is not None:
+            reducao = nivel(plano(forma, angulo=angulo, beta=beta, escala=escala, dim=dim).T)
+        img = decode(dados, reducao)
+        forma = forma or img.shape[:2]
+        formato = formato or 'PNG'
+    else:
+        img = np.asarray(entrada)
+        if img.dtype != np.uint8 or img.ndim not in (2, 3):
+            raise ValueError(f'imagem deve ser matriz de 8 bits com 2 ou 3 eixos, não {img.dtype}{img.shape}')
+        if img.ndim == 2:
+            img = img[..., np.newaxis]
+        forma = img.shape[:2]
+        if prefiltro:
+            reducao = nivel(plano(forma, angulo=angulo, beta=beta, escala=escala, dim=dim).T)
+            for _ in range(reducao):
+                img = reduz(img)
+
+    img, fundo = canais(img, TRANSPARENTE if cor is None else cor)
+    P = planejado(tuple(forma), angulo, beta, escala, dim, reducao)
+    ind = indices(P, None if janela is None else tuple(janela), tolerancia)
+
+    shape = ind.shape[1:] + img.shape[2:]
+    if out is not None and (out.shape != shape or out.dtype != np.uint8):
+        raise ValueError(f'saída deve ser matriz de 8 bits {shape}, não {out.dtype}{out.shape}')
+    res = metodo(img, ind, fundo, out=out, espaco=espaco)
+
+    if formato is None:
+        return res
+    return encode(res, formato, **codificacao)
+
+
+def amostras(entrada: Union[Imagem, bytes], coords: np.ndarray, *, angulo: Optional[float]=None,
+             beta: Optional[float]=None, escala: Optional[float]=None,
+             dim: Optional[Tuple[int, int]]=None, metodo: Metodo=Metodo.BILINEAR,
+             cor: Optional[Color]=None, saida: bool=True,
+             espaco: Optional[Espaco]=None) -> np.ndarray:
+    """
+    Valores da imagem transformada só em uma lista de
+    pontos, com custo proporcional ao número de pontos,
+    e não à área da saída.
+
+    Pontos inteiros da saída têm os mesmos valores dos
+    pixels de `transforma`.
+
+    Parâmetros
+    ----------
+    entrada: ndarray ou bytes
+        Imagem `(H, W)` ou `(H, W, C)` de 8 bits, ou
+        dados codificados de um arquivo de imagem.
+    coords: ndarray
+        Matriz `(N, 2)` com as coordenadas `(x, y)` de
+        cada ponto, em pixels.
+    angulo, beta, escala, dim: opcionais
+        Parâmetros da transformação, como em `plano`.
+    metodo: Metodo, opcional
+        Método de interpolação. Padrão: bilinear.
+    cor: ndarray, opcional
+        Cor de fundo em BGRA. Padrão: transparente.
+    saida: bool, opcional
+        Se os pontos estão na saída, ou se já estão na
+        entrada e são amostrados direto nela. Padrão: na
+        saída.
+    espaco: Espaco, opcional
+        Área de trabalho reaproveitada entre chamadas.
+
+    Retorno
+    -------
+    res: ndarray
+        Matriz `(N, C)` de 8 bits com a cor de cada
+        ponto, com os canais do fundo.
+
+    Erro
+    ----
+    ValueError
+        Entrada inválida ou pontos fora do formato
+        `(N, 2)`.
+    """
+    if isinstance(entrada, (bytes, bytearray, memoryview)):
+        img = decode(bytes(entrada))
+    else:
+        img = np.asarray(entrada)
+        if img.dtype != np.uint8 or img.ndim not in (2, 3):
+            raise ValueError(f'imagem deve ser matriz de 8 bits com 2 ou 3 eixos, não {img.dtype}{img.shape}')
+        if img.ndim == 2:
+            img = img[..., np.newaxis]
+
+    img, fundo = canais(img, TRANSPARENTE if cor is None else cor)
+    P = plano(img.shape[:2], angulo=angulo, beta=beta, escala=escala, dim=None if dim is None else tuple(dim))
+    return metodo(img, pontos(P, coords, saida=saida), fundo, espaco=espaco)
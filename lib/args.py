@@ -1,18 +1,24 @@
 """
 Tratamento de argumentos da linha de comando.
 """
+import re
 import math
+import shlex
 import logging
 from sys import stdin
 from warnings import warn
 from functools import wraps
-from argparse import ArgumentParser, Action, ArgumentTypeError, Namespace, BooleanOptionalAction
-from typing import Any, Tuple, Optional, Sequence, Callable, Dict, Iterator
+from argparse import (
+    ArgumentParser, Action, ArgumentTypeError, ArgumentError,
+    Namespace, BooleanOptionalAction, _ActionsContainer
+)
+from typing import Any, Tuple, List, Union, Optional, Sequence, Callable, Dict, Iterator
 from matplotlib import colors
 import numpy as np
 from .tipos import Imagem, Color
 from .interp import Metodo
 from .inout import decode
+from .fonte import mapeia
 
 
 class Argumentos(ArgumentParser):
@@ -47,22 +53,40 @@ def verbosidade(level: int) -> None:
     logging.getLogger().setLevel(log_level)
 
 
-def imagem(arquivo: str) -> Tuple[Imagem, str]:
+def entrada(arquivo: str) -> Tuple[Union[bytes, Imagem], str]:
     """
-    Leitura e decodificação da imagem.
+    Leitura da imagem, sem decodificação. Matrizes `npy`
+    são só mapeadas, para leitura sob demanda.
     """
     try:
         # argumento especial
         if arquivo == '-':
-            return decode(stdin.buffer.read()), '[STDIN]'
+            return stdin.buffer.read(), '[STDIN]'
+        # entrada fora da memória
+        if arquivo.lower().endswith('.npy'):
+            return mapeia(arquivo), arquivo
         # arquivos comuns
         with open(arquivo, 'rb') as file:
-            return decode(file.read()), arquivo
+            return file.read(), arquivo
 
     except (OSError, ValueError) as err:
         raise ArgumentTypeError(str(err)) from err
 
 
+def imagem(arquivo: str) -> Tuple[Imagem, str]:
+    """
+    Leitura e decodificação da imagem.
+    """
+    dados, nome = entrada(arquivo)
+    if not isinstance(dados, bytes):
+        return dados, nome
+
+    try:
+        return decode(dados), nome
+    except ValueError as err:
+        raise ArgumentTypeError(str(err)) from err
+
+
 def metodo(texto: str) -> Metodo:
     """
     Método de interpolação.
@@ -93,6 +117,36 @@ def racional(*, min: float=-inf, max: float=inf) -> Callable[[str], float]:
     return parse
 
 
+# maior quantidade de valores de um intervalo
+VALORES = 10_000
+
+def intervalo(*, min: float=-inf, max: float=inf) -> Callable[[str], List[float]]:
+    """
+    Valores de `INICIO..FIM[:PASSO]`, com o fim incluso
+    e passo padrão de 1, ou um único valor. Intervalos
+    com mais de `VALORES` valores são recusados antes de
+    serem montados.
+    """
+    numero = racional(min=min, max=max)
+
+    def parse(texto: str) -> List[float]:
+        faixa, _, passo = texto.partition(':')
+        inicio, sep, fim = faixa.partition('..')
+        if not sep:
+            return [numero(inicio)]
+
+        a, b = numero(inicio), numero(fim)
+        p = racional(min=0)(passo) if passo else 1
+        # tolerância para o fim cair exatamente no passo
+        n = math.floor((b - a) / p + 1e-9)
+        if n < 0:
+            raise ArgumentTypeError(f'intervalo vazio: {texto}')
+        if n >= VALORES:
+            raise ArgumentTypeError(f'intervalo {texto} com {n + 1} valores, mais que o limite de {VALORES}')
+        return [a + k * p for k in range(n + 1)]
+    return parse
+
+
 def natural(*, min: float=-inf, max: float=inf) -> Callable[[str], int]:
     """
     Tratamento de argumentos inteiros limitados.
@@ -114,6 +168,7 @@ def cor(texto: str) -> Color:
     """
     Opções de cor reconhecidas pelo Matplotlib.
     """
+    # cor sempre em BGRA, ajustada depois para os canais da imagem
     # opções especiais para fundo transparente
     if texto in ('t', 'transparente'):
         return np.zeros(4, dtype=np.uint8)
@@ -201,3 +256,72 @@ def math_eval(expr: str) -> float:
         raise ArgumentTypeError(f'expressão não númerica: {expr}')
 
     return ans
+
+
+def transformacoes(grupo: _ActionsContainer) -> None:
+    """
+    Opções das transformações da imagem, compartilhadas
+    entre a linha de comando e as especificações de saída.
+    """
+    grupo.add_argument('-a', '--angulo', metavar='ALFA', type=racional(),
+                       help='rotação no plano da imagem, em graus')
+    grupo.add_argument('-b', '--beta', type=racional(),
+                       help='rotação em torno de Y, em graus, projetado de volta para o plano XY')
+    escala = grupo.add_mutually_exclusive_group()
+    escala.add_argument('-e', '--escala', type=racional(min=0),
+                        help='escala de redimensionamento')
+    escala.add_argument('-d', '--dim', metavar=('ALTURA', 'LARGURA'), type=natural(min=0), nargs=2,
+                        help='dimensões da imagem resultante')
+
+
+# opções aceitas em cada especificação de saída
+SAIDA = Argumentos(prog='SAIDA', allow_abbrev=False, add_help=False, exit_on_error=False)
+transformacoes(SAIDA)
+SAIDA.add_argument('-m', '--metodo', type=metodo)
+SAIDA.add_argument('-c', '--cor', type=cor)
+SAIDA.add_argument('-j', '--janela', type=natural(min=0), nargs=4)
+SAIDA.add_argument('--tolerancia', type=racional(min=0))
+SAIDA.add_argument('--compacto', type=natural(min=1, max=16), nargs='?', const=16)
+SAIDA.add_argument('--adaptativo', type=racional(min=0))
+SAIDA.add_argument('--simples', type=metodo)
+
+def saida(texto: str) -> Tuple[str, Namespace]:
+    """
+    Especificação de saída no formato `ARQUIVO[:OPÇÕES]`,
+    com as opções de transformação, método, cor, janela
+    e tolerância da linha de comando.
+
+    A separação é no primeiro `:` seguido de uma opção,
+    então caminhos com `:` continuam válidos, assim como
+    cores como `tab:blue` nas opções.
+    """
+    sep = re.search(r':\s*-', texto)
+    if sep is None:
+        caminho, opcoes = texto, ''
+    else:
+        caminho, opcoes = texto[:sep.start()], texto[sep.start()+1:]
+    if not caminho:
+        raise ArgumentTypeError(f'saída sem arquivo: {texto}')
+
+    try:
+        args, restantes = SAIDA.parse_known_args(shlex.split(opcoes))
+    except (ArgumentError, ValueError) as err:
+        raise ArgumentTypeError(f'{texto}: {err}') from err
+    if restantes:
+        raise ArgumentTypeError(f'{texto}: opções não reconhecidas: {" ".join(restantes)}')
+    return caminho, args
+
+
+def combina(base: Namespace, opcoes: Namespace) -> Namespace:
+    """
+    Opções de uma saída herdando as da linha de comando.
+    Escala ou dimensões da saída substituem as duas.
+    """
+    args = Namespace(**vars(base))
+    if opcoes.escala is not None or opcoes.dim is not None:
+        args.escala = args.dim = None
+
+    for nome, valor in vars(opcoes).items():
+        if valor is not None:
+            setattr(args, nome, valor)
+    return args
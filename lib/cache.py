@@ -0,0 +1,200 @@
+"""
+Cache de resultados em disco, endereçado pelo conteúdo
+da entrada e pela transformação completa.
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from typing import Dict, Optional, Any
+import numpy as np
+from .plano import Plano
+
+
+# casas decimais da matriz na chave, para que erros de
+# arredondamento não separem transformações iguais
+CASAS = 9
+# versão dos resultados, parte da chave, para mudanças
+# que alteram as saídas das mesmas opções
+VERSAO = 1
+# arquivo com as estatísticas acumuladas
+ESTATISTICAS = 'estatisticas.json'
+
+
+def canonica(P: Plano) -> Dict[str, Any]:
+    """
+    Forma canônica do plano: matriz normalizada pelo
+    termo projetivo e arredondada, e dimensões da saída.
+    """
+    T = P.T / P.T[2, 2]
+    # soma com zero para não separar `-0.0` de `0.0`
+    T = np.round(T, CASAS) + 0.0
+    return dict(T=T.tolist(), dim=list(P.dim))
+
+
+class Cache:
+    """
+    Resultados codificados em um diretório, um arquivo
+    por chave, com os menos usados removidos quando o
+    total passa do limite.
+
+    Toda escrita é feita em um arquivo temporário e
+    depois renomeada, então leitores concorrentes nunca
+    veem um resultado incompleto.
+    """
+    def __init__(self, diretorio: str, *, limite: int=1 << 30) -> None:
+        self.diretorio = diretorio
+        self.limite = limite
+        self.acertos = self.falhas = 0
+        os.makedirs(diretorio, exist_ok=True)
+
+    @staticmethod
+    def chave(dados: bytes, P: Plano, **opcoes: Any) -> str:
+        """
+        Chave do resultado: hash SHA-256 dos dados de
+        entrada, do plano canônico e das demais opções,
+        que devem ser serializáveis em JSON.
+        """
+        descricao = json.dumps(dict(canonica(P), versao=VERSAO, **opcoes), sort_keys=True)
+        h = hashlib.sha256(dados)
+        h.update(descricao.encode())
+        return h.hexdigest()
+
+    def caminho(self, chave: str) -> str:
+        """
+        Arquivo do resultado, em subdiretórios pelo
+        prefixo da chave.
+        """
+        return os.path.join(self.diretorio, chave[:2], chave)
+
+    def busca(self, chave: str) -> Optional[bytes]:
+        """
+        Resultado guardado com a chave, se existir. Um
+        acerto renova o uso do arquivo.
+        """
+        caminho = self.caminho(chave)
+        try:
+            with open(caminho, 'rb') as arquivo:
+                buf = arquivo.read()
+            os.utime(caminho)
+        except OSError:
+            self.falhas += 1
+            self.registra(falhas=1)
+            logging.info(f'cache: falha para {chave[:16]}')
+            return None
+
+        self.acertos += 1
+        self.registra(acertos=1)
+        logging.info(f'cache: acerto para {chave[:16]}, {len(buf)} bytes')
+        return buf
+
+    def guarda(self, chave: str, buf: bytes) -> None:
+        """
+        Guarda o resultado e remove os menos usados
+        além do limite.
+        """
+        caminho = self.caminho(chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        atomico(caminho, buf)
+        self.limpa()
+
+    def entradas(self) -> Dict[str, os.stat_result]:
+        """
+        Arquivos de resultado e seus metadados.
+        """
+        res = {}
+        for raiz, _, arquivos in os.walk(self.diretorio):
+            if raiz == self.diretorio:
+                continue
+            for nome in arquivos:
+                # temporários ainda em escrita
+                if nome.startswith('.tmp-'):
+                    continue
+                caminho = os.path.join(raiz, nome)
+                try:
+                    res[caminho] = os.stat(caminho)
+                except OSError:
+                    pass # removido por outro processo
+        return res
+
+    def limpa(self) -> int:
+        """
+        Remove os resultados usados há mais tempo até o
+        total caber no limite.
+
+        Retorno
+        -------
+        removidos: int
+            Número de arquivos removidos.
+        """
+        entradas = self.entradas()
+        total = sum(info.st_size for info in entradas.values())
+
+        removidos = 0
+        for caminho, info in sorted(entradas.items(), key=lambda item: item[1].st_mtime):
+            if total <= self.limite:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                continue
+            total -= info.st_size
+            removidos += 1
+
+        if removidos > 0:
+            logging.info(f'cache: {removidos} resultados removidos, {total} bytes restantes')
+        return removidos
+
+    def registra(self, **contagens: int) -> None:
+        """
+        Soma as contagens nas estatísticas acumuladas do
+        diretório. Atualizações concorrentes podem se
+        perder, já que servem só de relatório.
+        """
+        estat = self.estatisticas()
+        for nome, n in contagens.items():
+            estat[nome] = estat.get(nome, 0) + n
+        try:
+            atomico(os.path.join(self.diretorio, ESTATISTICAS), json.dumps(estat).encode())
+        except OSError as err:
+            logging.warning(f'cache: estatísticas não atualizadas: {err}')
+
+    def estatisticas(self) -> Dict[str, int]:
+        """
+        Acertos e falhas acumulados no diretório, entre
+        todas as execuções.
+        """
+        try:
+            with open(os.path.join(self.diretorio, ESTATISTICAS)) as arquivo:
+                estat = json.load(arquivo)
+        except (OSError, ValueError):
+            estat = {}
+        return {'acertos': estat.get('acertos', 0), 'falhas': estat.get('falhas', 0)}
+
+    def relatorio(self) -> str:
+        """
+        Resumo das estatísticas e da ocupação.
+        """
+        estat = self.estatisticas()
+        entradas = self.entradas()
+        total = estat['acertos'] + estat['falhas']
+        taxa = estat['acertos'] / total if total > 0 else 0.0
+        ocupado = sum(info.st_size for info in entradas.values())
+        return (f'{estat["acertos"]} acertos e {estat["falhas"]} falhas ({taxa:.1%}),'
+                f' {len(entradas)} resultados em {ocupado} de {self.limite} bytes')
+
+
+def atomico(caminho: str, buf: bytes) -> None:
+    """
+    Escreve o arquivo inteiro ou nada, por meio de um
+    temporário no mesmo diretório.
+    """
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(caminho), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as arquivo:
+            arquivo.write(buf)
+        os.replace(temp, caminho)
+    except BaseException:
+        os.remove(temp)
+        raise
@@ -0,0 +1,286 @@
+"""
+Transformações afins em três cisalhamentos (decomposição
+de Paeth), cada um feito como reamostragem 1D das linhas
+ou das colunas, com o núcleo 1D do método escolhido.
+"""
+import math
+import logging
+from typing import List, Tuple, Optional
+import numpy as np
+from .tipos import Imagem, Color
+from .interp import Metodo, asimg
+from .plano import Plano, Janela, recorte
+
+
+class Cisalhamentos:
+    """
+    Fatores de `A = H3 @ V2 @ H1`, para a parte linear
+    `A` da operação direta:
+
+        H1 = [[1, b1], [0, 1]]
+        V2 = [[1, 0], [a2, b2]]
+        H3 = [[a3, b3], [0, 1]]
+
+    com `b1 = -tan(φ/2)`, onde `φ` é o ângulo de rotação
+    de `A`, para que as passadas intermediárias fiquem
+    próximas da rotação de Paeth.
+    """
+    def __init__(self, A: np.ndarray) -> None:
+        (m00, m01), (m10, m11) = A
+        phi = math.atan2(m10, m00)
+        self.b1 = -math.tan(phi / 2)
+        self.a2 = m10
+        self.b2 = m11 - m10 * self.b1
+        if abs(self.b2) < 1e-12:
+            raise ValueError('transformação sem decomposição em cisalhamentos')
+        self.b3 = (m01 - m00 * self.b1) / self.b2
+        self.a3 = m00 - self.b3 * m10
+        if abs(self.a3) < 1e-12:
+            raise ValueError('transformação sem decomposição em cisalhamentos')
+
+
+def afim(P: Plano) -> np.ndarray:
+    """
+    Matriz afim `2x3` do plano.
+
+    Erro
+    ----
+    ValueError
+        O plano é projetivo.
+    """
+    T = P.T / P.T[2, 2]
+    if not np.allclose(T[2, :2], 0):
+        raise ValueError('transformação projetiva não se decompõe em cisalhamentos')
+    return T[:2]
+
+
+def pesos(metodo: Metodo, pos: np.ndarray) -> Tuple[np.ndarray, List[Tuple[int, np.ndarray]]]:
+    """
+    Núcleo 1D do método nas posições `pos`.
+
+    Retorno
+    -------
+    base: ndarray
+        Índice inteiro de referência de cada posição.
+    taps: [(int, ndarray)]
+        Deslocamento de cada vizinho a partir da base e
+        seu peso.
+    """
+    if metodo is Metodo.VIZINHO:
+        base = np.rint(pos)
+        return base.astype(np.intp), [(0, np.ones_like(pos))]
+
+    base = np.floor(pos)
+    d = pos - base
+    base = base.astype(np.intp)
+
+    if metodo is Metodo.BILINEAR:
+        return base, [(0, 1 - d), (1, d)]
+
+    if metodo is Metodo.BICUBICA:
+        # B-spline cúbica, como em `interp.bicubica`
+        def Pe3(t: np.ndarray) -> np.ndarray:
+            return np.maximum(t, 0) ** 3
+        def R(s: np.ndarray) -> np.ndarray:
+            return (Pe3(s + 2) - 4 * Pe3(s + 1) + 6 * Pe3(s) - 4 * Pe3(s - 1)) / 6
+        return base, [(m, R(m - d)) for m in range(-1, 2+1)]
+
+    # polinômios de Lagrange, como em `interp.lagrange`
+    return base, [
+        (-1, -d * (d - 1) * (d - 2) / 6),
+        (0, (d + 1) * (d - 1) * (d - 2) / 2),
+        (1, -d * (d + 1) * (d - 2) / 2),
+        (2, d * (d + 1) * (d - 1) / 6),
+    ]
+
+
+def linhas(buf: np.ndarray, pos: np.ndarray, metodo: Metodo, fundo: np.ndarray) -> np.ndarray:
+    """
+    Reamostragem 1D de cada linha de `buf` nas posições
+    `pos`, com o fundo para vizinhos fora da linha.
+
+    Parâmetros
+    ----------
+    buf: ndarray
+        Matriz `(H, W, C)` das linhas.
+    pos: ndarray
+        Posições `(H, L)` em cada linha, em índices de
+        coluna de `buf`.
+
+    Retorno
+    -------
+    out: ndarray
+        Matriz `(H, L, C)` reamostrada.
+    """
+    H, W, C = buf.shape
+    base, taps = pesos(metodo, pos)
+    # índice linear do início de cada linha
+    inicio = (np.arange(H, dtype=np.intp) * W)[:, np.newaxis]
+    plano = buf.reshape(-1, C)
+
+    def vizinhos(k: int) -> np.ndarray:
+        col = base + k
+        fora = (col < 0) | (col >= W)
+        np.clip(col, 0, W - 1, out=col)
+        col += inicio
+        f = np.take(plano, col, axis=0)
+        f[fora] = fundo
+        return f
+
+    # vizinho mais próximo, sem pesos
+    if len(taps) == 1:
+        return vizinhos(0)
+
+    out = np.zeros(pos.shape + (C,), dtype=buf.dtype)
+    for k, w in taps:
+        f = vizinhos(k)
+        f *= w[..., np.newaxis]
+        out += f
+    return out
+
+
+def _faixa(valores: np.ndarray, margem: int) -> Tuple[int, int]:
+    """
+    Início e tamanho do intervalo inteiro que cobre os
+    valores, com margem.
+    """
+    inicio = math.floor(np.min(valores)) - margem
+    return inicio, math.ceil(np.max(valores)) + margem - inicio + 1
+
+
+def quartos(img: Imagem, k: int) -> Tuple[Imagem, np.ndarray, np.ndarray]:
+    """
+    Imagem girada em `k` quartos de volta, sem cópia, e
+    a relação `p = R @ q + desvio` entre as coordenadas
+    `(x, y)` na imagem original e na girada.
+    """
+    H, W, _ = img.shape
+    if k == 1:
+        R, desvio = [[0, -1], [1, 0]], [W - 1, 0]
+    elif k == 2:
+        R, desvio = [[-1, 0], [0, -1]], [W - 1, H - 1]
+    elif k == 3:
+        R, desvio = [[0, 1], [-1, 0]], [0, H - 1]
+    else:
+        R, desvio = [[1, 0], [0, 1]], [0, 0]
+    return np.rot90(img, k), np.asarray(R, dtype=float), np.asarray(desvio, dtype=float)
+
+
+def translacao(img: Imagem, desvio: Tuple[int, int], dim: Tuple[int, int], fundo: Color, *,
+               out: Optional[Imagem]=None) -> Imagem:
+    """
+    Cópia da imagem deslocada em `(dy, dx)` pixels inteiros
+    para uma saída de dimensões `dim`, com fundo fora.
+    """
+    dy, dx = desvio
+    H, W = dim
+    Hi, Wi, _ = img.shape
+    if out is None:
+        out = np.empty((H, W) + img.shape[2:], dtype=np.uint8)
+    out[...] = fundo
+    y0, y1 = max(dy, 0), min(Hi + dy, H)
+    x0, x1 = max(dx, 0), min(Wi + dx, W)
+    if y1 > y0 and x1 > x0:
+        out[y0:y1, x0:x1] = img[y0-dy:y1-dy, x0-dx:x1-dx]
+    return out
+
+
+def cisalhamento(img: Imagem, P: Plano, metodo: Metodo, fundo: Color, *,
+                 janela: Optional[Janela]=None, out: Optional[Imagem]=None) -> Imagem:
+    """
+    Aplica a transformação afim em três passadas 1D:
+    cisalhamento das linhas, das colunas e de novo das
+    linhas, com o mesmo resultado geométrico de `indices`
+    e do método 2D.
+
+    A entrada é girada antes em múltiplos de 90 graus,
+    só com permutação de índices, para que a rotação
+    restante fique entre -45 e 45 graus e os fatores de
+    cisalhamento continuem limitados. Quando não sobra
+    rotação nem escala e a translação é inteira, como em
+    múltiplos exatos de 90 graus, o resultado é só uma
+    cópia de pixels.
+
+    Parâmetros
+    ----------
+    img: ndarray
+        Imagem de entrada, já com os canais do fundo.
+    P: Plano
+        Transformação afim a ser aplicada.
+    metodo: Metodo
+        Método cujo núcleo 1D é usado nas passadas.
+    fundo: ndarray
+        Cor de fundo.
+    janela: (int, int, int, int), opcional
+        Retângulo `(y, x, altura, largura)` da saída.
+    out: ndarray, opcional
+        Matriz com o formato da janela para o resultado.
+
+    Erro
+    ----
+    ValueError
+        Transformação projetiva ou janela fora da saída.
+    """
+    if janela is None:
+        janela = (0, 0) + P.dim
+    Y, X, H, W = recorte(janela, P.dim)
+    M = afim(P)
+    A, t = M[:, :2], M[:, 2]
+
+    # quartos de volta exatos até a rotação restante
+    # ficar entre -45 e 45 graus
+    k = round(-math.degrees(math.atan2(A[1, 0], A[0, 0])) / 90) % 4
+    img, R, desvio = quartos(img, k)
+    t = t + A @ desvio
+    A = A @ R
+    Hi, Wi, C = img.shape
+
+    # sem rotação nem escala, só cópia
+    tr = np.rint(t)
+    if np.allclose(A, np.eye(2), atol=1e-9) and np.allclose(t, tr, atol=1e-9):
+        return translacao(img, (int(tr[1]) - Y, int(tr[0]) - X), (H, W), fundo, out=out)
+
+    c = Cisalhamentos(A)
+    # translações na segunda e na terceira passada, com a
+    # saída da janela começando em (0, 0)
+    t1 = t[1] - Y
+    t0 = t[0] - X - c.b3 * t1
+    logging.debug(f'cisalhamentos b1={c.b1:.4f} a2={c.a2:.4f} b2={c.b2:.4f} a3={c.a3:.4f} b3={c.b3:.4f}')
+
+    raio = metodo.raio
+    # o vizinho mais próximo só copia, sem ponto flutuante
+    tipo = img.dtype if metodo is Metodo.VIZINHO else np.float32
+    fundo = fundo.astype(tipo)
+    ys, xs = np.arange(H, dtype=float), np.arange(W, dtype=float)
+
+    # colunas necessárias da primeira passada: alcançadas
+    # pela entrada e lidas pela terceira
+    y = np.arange(Hi, dtype=float)
+    cantos = np.asarray([-raio, Wi - 1 + raio], dtype=float)
+    x1_entrada = (cantos[:, np.newaxis] + c.b1 * y[[0, -1]]).ravel()
+    x1_saida = ((xs[[0, -1], np.newaxis] - c.b3 * ys[[0, -1]] - t0) / c.a3).ravel()
+    ini_e, tam_e = _faixa(x1_entrada, 0)
+    ini_s, tam_s = _faixa(x1_saida, raio)
+    ox1 = max(ini_e, ini_s)
+    w1 = max(min(ini_e + tam_e, ini_s + tam_s) - ox1, 1)
+
+    # H1: x1 = x + b1 y, nas linhas da entrada
+    x1 = ox1 + np.arange(w1, dtype=float)
+    pos = x1[np.newaxis, :] - c.b1 * y[:, np.newaxis]
+    buf = linhas(img.astype(tipo), pos, metodo, fundo)
+
+    # V2: y2 = a2 x1 + b2 y + t1, pelas colunas transpostas
+    pos = (ys[np.newaxis, :] - c.a2 * x1[:, np.newaxis] - t1) / c.b2
+    buf = linhas(np.ascontiguousarray(buf.transpose(1, 0, 2)), pos, metodo, fundo)
+    buf = np.ascontiguousarray(buf.transpose(1, 0, 2))
+
+    # H3: x3 = a3 x1 + b3 y2 + t0, nas linhas da saída
+    pos = (xs[np.newaxis, :] - c.b3 * ys[:, np.newaxis] - t0) / c.a3 - ox1
+    buf = linhas(buf, pos, metodo, fundo)
+
+    if metodo is Metodo.VIZINHO:
+        if out is None:
+            return buf
+        np.copyto(out, buf)
+        return out
+    return asimg(buf, out=out)
@@ -0,0 +1,215 @@
+"""
+Modelo de custo das transformações: memória de pico e
+tempo previstos sem renderizar, com coeficientes de
+tempo calibrados em cada máquina, só quando pedido.
+"""
+import os
+import json
+import logging
+from typing import Dict, Tuple, Optional, NamedTuple
+import numpy as np
+from .interp import Metodo
+from .idx import Compactas
+from .plano import Plano, Janela, FAIXA, plano, indices, recorte
+from . import maquina
+
+
+# bytes por pixel da saída nos buffers de cada método,
+# além de `modf` e `acesso`: fixos e por canal
+BUFFERS = {
+    Metodo.VIZINHO: (0, 1),
+    Metodo.BILINEAR: (24, 18),
+    Metodo.BICUBICA: (88, 18),
+    Metodo.LAGRANGE: (96, 26),
+}
+# bytes por pixel da parte fracionária de `modf`, dos
+# limites e do índice linear de `acesso`
+AUXILIARES = 16 + 2 + 16
+
+# calibrações salvas, por nome de máquina
+CALIBRACAO = maquina.arquivo('calibracao.json')
+
+
+class Estimativa(NamedTuple):
+    """
+    Custo previsto de uma transformação.
+    """
+    # dimensões `(H, W, C)` do resultado
+    saida: Tuple[int, int, int]
+    # bytes da entrada decodificada, com os canais do fundo
+    entrada: int
+    # bytes das coordenadas mantidas durante a interpolação
+    indices: int
+    # pico de memória, em bytes
+    memoria: int
+    # tempo total, em segundos, `None` sem calibração
+    tempo: Optional[float]
+
+
+def memoria(entrada: Tuple[int, int, int], saida: Tuple[int, int, int], metodo: Metodo, *,
+            compacto: Optional[int]=None, tolerancia: Optional[float]=None,
+            canais: Optional[int]=None, bloco: Optional[int]=None) -> Tuple[int, int, int]:
+    """
+    Memória prevista de cada etapa, pelos buffers que
+    cada uma aloca.
+
+    Parâmetros
+    ----------
+    entrada: (int, int, int)
+        Dimensões da entrada decodificada.
+    saida: (int, int, int)
+        Dimensões do resultado.
+    metodo: Metodo
+        Método de interpolação.
+    compacto: int, opcional
+        Bits das coordenadas em ponto fixo, se usadas.
+    tolerancia: float, opcional
+        Erro da aproximação por partes, que não monta a
+        grade completa da saída.
+    canais: int, opcional
+        Canais da entrada antes de receber os do fundo.
+    bloco: int, opcional
+        Pixels da saída interpolados por vez, nas faixas
+        ou ladrilhos do perfil, com coordenadas exatas.
+
+    Retorno
+    -------
+    img: int
+        Bytes da entrada, incluindo a cópia com os canais
+        do fundo.
+    ind: int
+        Bytes das coordenadas, mantidos até o fim.
+    pico: int
+        Maior ocupação prevista, em bytes.
+    """
+    Hi, Wi, C = entrada
+    H, W, _ = saida
+    N = H * W
+
+    img = Hi * Wi * C
+    if canais is not None and canais != C:
+        img += Hi * Wi * canais
+
+    if compacto is not None:
+        base, fracao = Compactas.tipos((Hi, Wi), compacto)
+        ind = 2 * N * (np.dtype(base).itemsize + np.dtype(fracao).itemsize)
+        # faixa exata, com a grade e o resultado
+        montagem = ind + 2 * 24 * min(FAIXA, H) * W
+        inteiros = 2 * np.dtype(base).itemsize
+    else:
+        ind = 24 * N
+        # grade e coordenadas transformadas juntas
+        montagem = ind if tolerancia is not None else 2 * ind
+        inteiros = 2 * np.dtype(np.intp).itemsize
+
+    fixos, porcanal = BUFFERS[metodo]
+    # Lagrange também copia os índices inteiros
+    if metodo is Metodo.LAGRANGE:
+        fixos += inteiros
+    if bloco is not None and compacto is None and bloco < N:
+        # só o resultado tem a saída inteira, os buffers
+        # e as coordenadas são de um bloco por vez
+        ind = 24 * bloco
+        montagem = 2 * ind + N * C
+        interpolacao = ind + bloco * (inteiros + AUXILIARES + fixos + porcanal * C) + N * C
+        return img, ind, img + max(montagem, interpolacao)
+
+    interpolacao = ind + N * (inteiros + AUXILIARES + fixos + porcanal * C)
+    return img, ind, img + max(montagem, interpolacao)
+
+
+def calibra(repeticoes: int=3, lado: int=512) -> Dict[str, float]:
+    """
+    Mede os coeficientes de tempo desta máquina com uma
+    transformação sintética de saída `lado x lado`.
+
+    Retorno
+    -------
+    coef: dict
+        Segundos por pixel da saída para as coordenadas,
+        em `indices`, e segundos por pixel e canal para
+        cada método.
+    """
+    C = 3
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (lado // 2, lado // 2, C), dtype=np.uint8)
+    fundo = np.zeros(C, dtype=np.uint8)
+    P = plano(img.shape[:2], angulo=30, escala=2, dim=(lado, lado))
+    N = lado * lado
+
+    coef = {'indices': maquina.medida(lambda: indices(P), repeticoes)[0] / N}
+    ind = indices(P)
+    for metodo in Metodo:
+        coef[str(metodo)] = maquina.medida(lambda: metodo(img, ind, fundo), repeticoes)[0] / (N * C)
+    logging.info(f'calibração: {coef}')
+    return coef
+
+
+def calibracao(caminho: str=CALIBRACAO, *, recalibra: bool=False,
+               repeticoes: int=3) -> Optional[Dict[str, float]]:
+    """
+    Coeficientes salvos desta máquina, ou `None` se ela
+    ainda não foi calibrada. Só calibra e salva com
+    `recalibra`, já que a medida leva alguns segundos.
+    """
+    nome = maquina.nome()
+    try:
+        with open(caminho) as arquivo:
+            salvas = json.load(arquivo)
+    except (OSError, ValueError):
+        salvas = {}
+
+    if not recalibra:
+        return salvas.get(nome)
+
+    salvas[nome] = calibra(repeticoes)
+    try:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, 'w') as arquivo:
+            json.dump(salvas, arquivo, indent=2)
+    except OSError as err:
+        logging.warning(f'calibração não salva em {caminho}: {err}')
+    return salvas[nome]
+
+
+def estimativa(P: Plano, entrada: Tuple[int, int, int], metodo: Metodo, coef: Optional[Dict[str, float]], *,
+               janela: Optional[Janela]=None, compacto: Optional[int]=None,
+               tolerancia: Optional[float]=None, canais: Optional[int]=None,
+               bloco: Optional[int]=None) -> Estimativa:
+    """
+    Custo previsto de renderizar o plano, só a partir
+    das dimensões da entrada e da saída.
+
+    Parâmetros
+    ----------
+    P: Plano
+        Transformação planejada.
+    entrada: (int, int, int)
+        Dimensões da entrada decodificada, já com os
+        canais do fundo.
+    metodo: Metodo
+        Método de interpolação.
+    coef: dict, opcional
+        Coeficientes de tempo, como em `calibra`. Sem
+        eles, o tempo não é previsto.
+    janela: (int, int, int, int), opcional
+        Retângulo `(y, x, altura, largura)` da saída.
+    compacto, tolerancia, canais, bloco: opcionais
+        Como em `memoria`. O tempo não depende do bloco.
+
+    Erro
+    ----
+    ValueError
+        A janela não tem intersecção com a saída.
+    """
+    if janela is None:
+        janela = (0, 0) + P.dim
+    _, _, H, W = recorte(janela, P.dim)
+    C = entrada[2]
+
+    img, ind, pico = memoria(entrada, (H, W, C), metodo, compacto=compacto,
+                             tolerancia=tolerancia, canais=canais, bloco=bloco)
+    tempo = None
+    if coef is not None:
+        tempo = H * W * (coef['indices'] + coef[str(metodo)] * C)
+    return Estimativa((H, W, C), img, ind, pico, tempo)
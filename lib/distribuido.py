@@ -0,0 +1,307 @@
+"""
+Renderização distribuída em faixas horizontais da saída,
+com trabalhadores ligados por sockets TCP.
+
+Cada mensagem é um cabeçalho JSON, precedido pelo seu
+tamanho em 4 bytes, seguido dos bytes crus da matriz
+descrita nele.
+"""
+import json
+import math
+import queue
+import socket
+import struct
+import logging
+import threading
+import socketserver
+import multiprocessing
+from time import time
+from typing import Tuple, List, Dict, Optional, Any, BinaryIO
+import numpy as np
+from .tipos import Imagem
+from .interp import Metodo
+from .inout import necessarios
+from .plano import Plano, Janela, recorte
+from .fonte import Fonte, pegada, regional
+
+
+# # # # # # #
+# Protocolo
+
+# maior cabeçalho JSON aceito, em bytes
+CABECALHO = 1 << 20
+# maior matriz aceita numa mensagem, em bytes
+DADOS = 1 << 31
+
+def envia(arquivo: BinaryIO, cabecalho: Dict[str, Any], dados: Optional[np.ndarray]=None) -> None:
+    """
+    Escreve uma mensagem, com a matriz opcional depois
+    do cabeçalho.
+    """
+    if dados is not None:
+        cabecalho = dict(cabecalho, forma=list(dados.shape))
+    texto = json.dumps(cabecalho).encode()
+    arquivo.write(struct.pack('>I', len(texto)) + texto)
+    if dados is not None:
+        arquivo.write(np.ascontiguousarray(dados, dtype=np.uint8).data)
+    arquivo.flush()
+
+
+def recebe(arquivo: BinaryIO) -> Tuple[Dict[str, Any], Optional[np.ndarray]]:
+    """
+    Lê uma mensagem completa.
+
+    O cabeçalho e a forma da matriz são conferidos antes
+    de qualquer alocação, contra `CABECALHO` e `DADOS`.
+
+    Erro
+    ----
+    ConnectionError
+        Conexão fechada no meio da mensagem.
+    ValueError
+        Cabeçalho ilegível, forma inválida ou mensagem
+        maior que os limites.
+    """
+    def exato(n: int) -> bytes:
+        buf = arquivo.read(n)
+        if len(buf) != n:
+            raise ConnectionError('conexão fechada durante mensagem')
+        return buf
+
+    tamanho, = struct.unpack('>I', exato(4))
+    if tamanho > CABECALHO:
+        raise ValueError(f'cabeçalho de {tamanho} bytes maior que o limite de {CABECALHO}')
+    cabecalho = json.loads(exato(tamanho))
+    if not isinstance(cabecalho, dict):
+        raise ValueError('cabeçalho não é um objeto JSON')
+    if 'forma' not in cabecalho:
+        return cabecalho, None
+
+    forma = cabecalho['forma']
+    if not isinstance(forma, list) or len(forma) not in (2, 3) \
+            or not all(isinstance(n, int) and not isinstance(n, bool) and n >= 0 for n in forma):
+        raise ValueError(f'forma inválida: {forma!r}')
+    forma = tuple(forma)
+    if math.prod(forma) > DADOS:
+        raise ValueError(f'matriz {forma} maior que o limite de {DADOS} bytes')
+    dados = np.frombuffer(exato(math.prod(forma)), dtype=np.uint8).reshape(forma)
+    return cabecalho, dados
+
+
+# # # # # # # #
+# Trabalhador
+
+class Tratador(socketserver.StreamRequestHandler):
+    """
+    Atende os pedidos de uma conexão, um por vez: região
+    da entrada e plano da faixa, respondidos com a faixa
+    renderizada.
+
+    Mensagens ilegíveis são respondidas com erro e fecham
+    a conexão, já que o resto do fluxo não é confiável.
+    """
+    def handle(self) -> None:
+        while True:
+            try:
+                pedido, regiao = recebe(self.rfile)
+            except ConnectionError:
+                return
+            except ValueError as err:
+                logging.warning(f'{self.client_address}: mensagem inválida: {err}')
+                try:
+                    envia(self.wfile, dict(erro=str(err)))
+                except OSError:
+                    pass
+                return
+
+            inicio = time()
+            try:
+                P = Plano(np.asarray(pedido['T'], dtype=float), tuple(pedido['dim']))
+                res = regional(regiao, tuple(pedido['origem']), P, tuple(pedido['janela']),
+                               Metodo[pedido['metodo'].upper()], np.asarray(pedido['cor'], dtype=np.uint8),
+                               tolerancia=pedido['tolerancia'])
+            except (ValueError, KeyError, TypeError, IndexError, AttributeError) as err:
+                envia(self.wfile, dict(erro=str(err)))
+                continue
+
+            logging.info(f'faixa {pedido["janela"]} em {time() - inicio:.3f} segundos')
+            envia(self.wfile, {}, res)
+
+
+class Servidor(socketserver.ThreadingTCPServer):
+    """
+    Trabalhador atendendo várias conexões em paralelo.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(endereco: Tuple[str, int], porta: 'Optional[multiprocessing.Queue[int]]'=None) -> None:
+    """
+    Executa um trabalhador até ser interrompido. A porta
+    efetiva é publicada em `porta`, se dada, para
+    endereços com porta zero.
+    """
+    with Servidor(endereco, Tratador) as servidor:
+        logging.info(f'trabalhador em {servidor.server_address}')
+        if porta is not None:
+            porta.put(servidor.server_address[1])
+        servidor.serve_forever()
+
+
+def locais(n: int) -> Tuple[List[str], List[multiprocessing.Process]]:
+    """
+    Inicia `n` trabalhadores locais, em processos
+    separados, no lugar de máquinas remotas.
+
+    Retorno
+    -------
+    enderecos: [str]
+        Endereços `host:porta` dos trabalhadores.
+    processos: [Process]
+        Processos, para serem terminados depois.
+    """
+    portas: 'multiprocessing.Queue[int]' = multiprocessing.Queue()
+    processos = [multiprocessing.Process(target=serve, args=(('127.0.0.1', 0), portas), daemon=True)
+                 for _ in range(n)]
+    for processo in processos:
+        processo.start()
+    return [f'127.0.0.1:{portas.get(timeout=30)}' for _ in processos], processos
+
+
+# # # # # # # #
+# Coordenador
+
+def faixas(janela: Janela, altura: int) -> List[Janela]:
+    """
+    Divisão da janela em faixas horizontais.
+    """
+    y, x, H, W = janela
+    return [(y + k, x, min(altura, H - k), W) for k in range(0, H, altura)]
+
+
+def distribuido(fonte: Fonte, P: Plano, metodo: Metodo, cor: np.ndarray, enderecos: List[str], *,
+                janela: Optional[Janela]=None, altura: Optional[int]=None, tolerancia: Optional[float]=None,
+                tentativas: int=3, limite: float=120) -> Imagem:
+    """
+    Renderiza a saída em faixas horizontais nos
+    trabalhadores, mandando para cada faixa só a região
+    da entrada que ela usa.
+
+    Faixas com falha voltam para a fila e são refeitas
+    por qualquer trabalhador. Um trabalhador que falha
+    `tentativas` vezes seguidas é abandonado.
+
+    Parâmetros
+    ----------
+    fonte: Fonte
+        Entrada, possivelmente mapeada em disco.
+    P: Plano
+        Transformação completa.
+    metodo: Metodo
+        Método de interpolação.
+    cor: ndarray
+        Cor de fundo em BGRA.
+    enderecos: [str]
+        Trabalhadores, como `host:porta`.
+    janela: (int, int, int, int), opcional
+        Retângulo `(y, x, altura, largura)` da saída.
+    altura: int, opcional
+        Altura das faixas. Padrão: quatro faixas por
+        trabalhador.
+    tolerancia: float, opcional
+        Erro máximo da aproximação por partes.
+    tentativas: int, opcional
+        Falhas aceitas por faixa e por trabalhador.
+    limite: float, opcional
+        Tempo máximo de espera de cada faixa, em segundos.
+
+    Retorno
+    -------
+    out: ndarray
+        Imagem resultante, montada na ordem das faixas.
+
+    Erro
+    ----
+    ValueError
+        Faixa com falha em todas as tentativas, ou sem
+        trabalhadores restantes.
+    """
+    if janela is None:
+        janela = (0, 0) + P.dim
+    Y, X, H, W = recorte(janela, P.dim)
+    if altura is None:
+        altura = max(math.ceil(H / (4 * len(enderecos))), 1)
+    out = np.empty((H, W, necessarios(cor, fonte.shape[2])), dtype=np.uint8)
+
+    pendentes: 'queue.Queue[Tuple[Janela, int]]' = queue.Queue()
+    for faixa in faixas((Y, X, H, W), altura):
+        pendentes.put((faixa, 0))
+    restantes = [pendentes.qsize()]
+    erros: List[str] = []
+    trava = threading.Lock()
+    leitura = threading.Lock()
+    raio = metodo.raio + math.ceil(tolerancia or 0)
+
+    def pedido(faixa: Janela) -> Tuple[Dict[str, Any], np.ndarray]:
+        # região fora da entrada, como em `fonte.renderiza`
+        y0, x0, y1, x1 = pegada(P, faixa, raio, fonte.shape[:2]) or (0, 0, 1, 1)
+        with leitura:
+            regiao = fonte.regiao(y0, x0, y1, x1)
+        cabecalho = dict(T=P.T.tolist(), dim=list(P.dim), janela=list(faixa), origem=[y0, x0],
+                         metodo=str(metodo), cor=cor.tolist(), tolerancia=tolerancia)
+        return cabecalho, regiao
+
+    def trabalha(endereco: str) -> None:
+        host, _, porta = endereco.rpartition(':')
+        falhas, conexao = 0, None
+        while falhas < tentativas:
+            with trava:
+                if restantes[0] == 0 or erros:
+                    break
+            try:
+                faixa, tentativa = pendentes.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            try:
+                if conexao is None:
+                    conexao = socket.create_connection((host or 'localhost', int(porta)), timeout=limite)
+                    arquivo = conexao.makefile('rwb')
+                envia(arquivo, *pedido(faixa))
+                resposta, res = recebe(arquivo)
+                if 'erro' in resposta:
+                    raise ValueError(resposta['erro'])
+            except (OSError, ValueError) as err:
+                falhas += 1
+                logging.warning(f'{endereco}: falha na faixa {faixa}: {err}')
+                if conexao is not None:
+                    conexao.close()
+                    conexao = None
+                with trava:
+                    if tentativa + 1 >= tentativas:
+                        erros.append(f'faixa {faixa} falhou {tentativas} vezes: {err}')
+                pendentes.put((faixa, tentativa + 1))
+                continue
+
+            falhas = 0
+            y, x, h, w = faixa
+            out[y-Y:y-Y+h, x-X:x-X+w] = res
+            logging.debug(f'{endereco}: faixa {faixa}')
+            with trava:
+                restantes[0] -= 1
+
+        if conexao is not None:
+            conexao.close()
+
+    threads = [threading.Thread(target=trabalha, args=(endereco,), daemon=True) for endereco in enderecos]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if erros:
+        raise ValueError(erros[0])
+    if restantes[0] > 0:
+        raise ValueError(f'{restantes[0]} faixas sem trabalhadores disponíveis')
+    return out
@@ -0,0 +1,54 @@
+"""
+Área de trabalho com buffers reutilizáveis para
+as interpolações.
+"""
+import logging
+from typing import Dict, Tuple
+import numpy as np
+
+
+class Espaco:
+    """
+    Conjunto de buffers pré-alocados, identificados por
+    nome.
+
+    Os buffers são mantidos entre chamadas e só são
+    realocados quando o formato ou o tipo pedido muda,
+    então interpolações sucessivas com a mesma saída não
+    alocam memória nova para pesos, vizinhos e acumuladores.
+    """
+    def __init__(self) -> None:
+        self.buffers: Dict[str, np.ndarray] = {}
+
+    def buffer(self, nome: str, shape: Tuple[int, ...], dtype: type=float) -> np.ndarray:
+        """
+        Buffer não inicializado com o nome, formato e
+        tipo dados.
+
+        Parâmetros
+        ----------
+        nome: str
+            Identificador do buffer.
+        shape: (int, ...)
+            Formato do buffer.
+        dtype: type, opcional
+            Tipo dos elementos. Padrão: float.
+
+        Retorno
+        -------
+        buf: ndarray
+            Buffer com conteúdo arbitrário.
+        """
+        buf = self.buffers.get(nome)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            logging.debug(f'alocando buffer {nome}:{shape} de {np.dtype(dtype)}')
+
+            buf = np.empty(shape, dtype=dtype)
+            self.buffers[nome] = buf
+        return buf
+
+    def nbytes(self) -> int:
+        """
+        Memória total ocupada pelos buffers.
+        """
+        return sum(buf.nbytes for buf in self.buffers.values())
@@ -0,0 +1,206 @@
+"""
+Entrada fora da memória: imagem mapeada em disco, lida
+só nas regiões que cada ladrilho da saída precisa.
+"""
+import os
+import math
+import logging
+from collections import OrderedDict
+from typing import Tuple, Optional
+import numpy as np
+from .tipos import Imagem, Color, Limites
+from .idx import aplica
+from .linop import inversa
+from .interp import Metodo
+from .inout import canais, necessarios
+from .plano import Plano, Janela, indices, ladrilhado
+
+
+def mapeia(caminho: str) -> Imagem:
+    """
+    Mapeia em memória uma imagem `npy`, sem ler os
+    pixels.
+
+    Erro
+    ----
+    ValueError
+        Formato desconhecido ou matriz que não representa
+        uma imagem de 8 bits.
+    """
+    if os.path.splitext(caminho)[1].lower() != '.npy':
+        raise ValueError(f'formato não mapeável: {caminho}')
+    try:
+        mapa = np.load(caminho, mmap_mode='r', allow_pickle=False)
+    except (OSError, ValueError) as err:
+        raise ValueError(f'problema de leitura em {caminho}: {err}') from err
+
+    if mapa.dtype != np.uint8 or mapa.ndim not in (2, 3) or (mapa.ndim == 3 and mapa.shape[2] not in (1, 3, 4)):
+        raise ValueError(f'{caminho} não é uma imagem de 8 bits: {mapa.dtype}{mapa.shape}')
+    # escala de cinza também tem eixo de canais
+    if mapa.ndim == 2:
+        mapa = mapa[..., np.newaxis]
+    return mapa
+
+
+class Fonte:
+    """
+    Imagem de entrada lida por blocos quadrados, com os
+    blocos usados mais recentemente mantidos em memória.
+    """
+    def __init__(self, mapa: Imagem, *, bloco: int=256, blocos: int=64) -> None:
+        self.mapa = mapa
+        self.bloco = bloco
+        self.blocos = blocos
+        self.cache: 'OrderedDict[Tuple[int, int], Imagem]' = OrderedDict()
+        self.lidos = self.reusados = 0
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.mapa.shape
+
+    def le(self, by: int, bx: int) -> Imagem:
+        """
+        Bloco `(by, bx)` da entrada, do cache ou do disco.
+        """
+        chave = by, bx
+        if chave in self.cache:
+            self.cache.move_to_end(chave)
+            self.reusados += 1
+            return self.cache[chave]
+
+        B = self.bloco
+        bloco = np.array(self.mapa[by*B:(by+1)*B, bx*B:(bx+1)*B])
+        self.lidos += 1
+        self.cache[chave] = bloco
+        if len(self.cache) > self.blocos:
+            self.cache.popitem(last=False)
+        return bloco
+
+    def regiao(self, y0: int, x0: int, y1: int, x1: int) -> Imagem:
+        """
+        Pixels de `[y0, y1) x [x0, x1)`, já limitados
+        para dentro da imagem, montados a partir dos
+        blocos.
+        """
+        B = self.bloco
+        out = np.empty((y1 - y0, x1 - x0, self.shape[2]), dtype=np.uint8)
+        for by in range(y0 // B, (y1 - 1) // B + 1):
+            for bx in range(x0 // B, (x1 - 1) // B + 1):
+                bloco = self.le(by, bx)
+                # intersecção do bloco com a região
+                ya, yb = max(y0, by * B), min(y1, (by + 1) * B)
+                xa, xb = max(x0, bx * B), min(x1, (bx + 1) * B)
+                out[ya-y0:yb-y0, xa-x0:xb-x0] = bloco[ya-by*B:yb-by*B, xa-bx*B:xb-bx*B]
+        return out
+
+
+def pegada(P: Plano, janela: Janela, raio: int, shape: Tuple[int, int]) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Região `(y0, x0, y1, x1)` da entrada usada pela
+    janela da saída: os cantos da janela levados pela
+    operação inversa, com o raio do método em volta e
+    limitados para a imagem.
+
+    Retorno
+    -------
+    regiao: (int, int, int, int) ou None
+        Limites da região, ou `None` se a janela cai
+        toda fora da entrada.
+    """
+    y, x, H, W = janela
+    cantos: Limites = np.asarray([
+        [x, x + W - 1, x, x + W - 1],
+        [y, y, y + H - 1, y + H - 1],
+        [1, 1, 1, 1],
+    ], dtype=float)
+    cx, cy, _ = aplica(inversa(P.T), cantos)
+
+    y0 = max(math.floor(cy.min()) - raio, 0)
+    x0 = max(math.floor(cx.min()) - raio, 0)
+    y1 = min(math.ceil(cy.max()) + raio + 1, shape[0])
+    x1 = min(math.ceil(cx.max()) + raio + 1, shape[1])
+    if y1 <= y0 or x1 <= x0:
+        return None
+    return y0, x0, y1, x1
+
+
+def regional(img: Imagem, origem: Tuple[int, int], P: Plano, janela: Janela, metodo: Metodo,
+             cor: Color, *, tolerancia: Optional[float]=None, out: Optional[Imagem]=None) -> Imagem:
+    """
+    Renderiza a janela da saída a partir só da região
+    da entrada que começa em `origem`, como em `pegada`.
+
+    Parâmetros
+    ----------
+    img: ndarray
+        Região da entrada, com os canais originais.
+    origem: (int, int)
+        Posição `(y, x)` da região na entrada.
+    P: Plano
+        Transformação completa.
+    janela: (int, int, int, int)
+        Retângulo `(y, x, altura, largura)` da saída.
+    metodo: Metodo
+        Método de interpolação.
+    cor: ndarray
+        Cor de fundo em BGRA.
+    tolerancia: float, opcional
+        Erro máximo da aproximação por partes.
+    out: ndarray, opcional
+        Matriz com o formato da janela para o resultado.
+    """
+    img, fundo = canais(img, cor)
+    # índices relativos à região lida
+    ind = indices(P, janela, tolerancia)
+    ind[0] -= origem[1]
+    ind[1] -= origem[0]
+    return metodo(img, ind, fundo, out=out)
+
+
+def renderiza(fonte: Fonte, P: Plano, metodo: Metodo, cor: Color, *, ladrilho: int=512,
+              janela: Optional[Janela]=None, tolerancia: Optional[float]=None,
+              out: Optional[Imagem]=None) -> Imagem:
+    """
+    Renderiza a transformação por ladrilhos, em ordem de
+    Morton, lendo da fonte só a região que cada um
+    precisa.
+
+    Parâmetros
+    ----------
+    fonte: Fonte
+        Entrada lida sob demanda.
+    P: Plano
+        Transformação a ser aplicada.
+    metodo: Metodo
+        Método de interpolação.
+    cor: ndarray
+        Cor de fundo em BGRA.
+    ladrilho: int, opcional
+        Lado dos ladrilhos da saída. Padrão: 512.
+    janela: (int, int, int, int), opcional
+        Retângulo `(y, x, altura, largura)` da saída.
+    tolerancia: float, opcional
+        Erro máximo da aproximação por partes, somado
+        ao raio da região lida.
+    out: ndarray, opcional
+        Matriz com o formato da janela para o resultado,
+        possivelmente também mapeada em disco.
+
+    Retorno
+    -------
+    out: ndarray
+        Imagem resultante.
+    """
+    raio = metodo.raio + math.ceil(tolerancia or 0)
+    def desenha(jan: Janela, destino: Imagem) -> None:
+        # ladrilhos fora da entrada ainda passam pelo método,
+        # que pode não reproduzir o fundo exato; qualquer
+        # região serve, já que todo acesso cai fora dela
+        y0, x0, y1, x1 = pegada(P, jan, raio, fonte.shape[:2]) or (0, 0, 1, 1)
+        regional(fonte.regiao(y0, x0, y1, x1), (y0, x0), P, jan, metodo, cor,
+                 tolerancia=tolerancia, out=destino)
+
+    out = ladrilhado(desenha, P.dim, necessarios(cor, fonte.shape[2]), janela=janela,
+                     ladrilho=ladrilho, out=out)
+    logging.info(f'{fonte.lidos} blocos lidos e {fonte.reusados} reusados do cache')
+    return out
@@ -1,12 +1,14 @@
 """
 Análise de índices e dimensões da imagem.
 """
-from typing import Tuple, Optional, overload
+import logging
+from typing import Tuple, Optional, NamedTuple, overload
 import numpy as np
 from .tipos import OpLin, Indices, Limites, Imagem, Color
+from .espaco import Espaco
 
 
-def indices(shape: Tuple[int, int]) -> Indices:
+def indices(shape: Tuple[int, int], inicio: Tuple[int, int]=(0, 0)) -> Indices:
     """
     Matriz de cordenadas homogêneas de todos os pixels
     da imagem. O resultado têm o mesmo shape da imagem.
@@ -15,6 +17,9 @@ def indices(shape: Tuple[int, int]) -> Indices:
     ----------
     shape: (int, int)
         Dimensões da imagem.
+    inicio: (int, int), opcional
+        Coordenadas `(y, x)` do primeiro pixel, para
+        gerar apenas uma janela da imagem.
 
     Retorno
     -------
@@ -23,8 +28,8 @@ def indices(shape: Tuple[int, int]) -> Indices:
         `(WX, WY, W)` de cada ponto `(y, x)` da imagem.
     """
     # valores de x e y
-    y = np.arange(shape[0], dtype=float)
-    x = np.arange(shape[1], dtype=float)
+    y = np.arange(inicio[0], inicio[0] + shape[0], dtype=float)
+    x = np.arange(inicio[1], inicio[1] + shape[1], dtype=float)
     x, y = np.meshgrid(x, y, copy=False)
     # dimensão de translação
     w = np.ones(shape, dtype=float)
@@ -58,21 +63,259 @@ def aplica(op: OpLin, ind: np.ndarray) -> np.ndarray:
     res /= [res[2]]
     return res
 
+def _interpola(G: np.ndarray, pos: np.ndarray, eixo: int, t: np.ndarray) -> np.ndarray:
+    """
+    Interpolação linear de `G` ao longo de `eixo`, com
+    amostras nas posições crescentes `pos`, para as
+    posições `t`.
+    """
+    k = np.clip(np.searchsorted(pos, t, side='right') - 1, 0, len(pos) - 2)
+    frac = (t - pos[k]) / (pos[k+1] - pos[k])
+    # valores no início de cada trecho e suas inclinações
+    base = np.take(G, k, axis=eixo)
+    delta = np.take(np.diff(G, axis=eixo), k, axis=eixo)
+
+    forma = [1] * G.ndim
+    forma[eixo] = len(t)
+    delta *= frac.reshape(forma)
+    base += delta
+    return base
+
+
+def _cantos(n: int, passo: int) -> np.ndarray:
+    """
+    Posições dos cantos dos ladrilhos de lado `passo`
+    em um eixo de tamanho `n`, incluindo a última.
+    """
+    pos = np.arange(0, n, passo, dtype=float)
+    if pos[-1] != n - 1:
+        pos = np.append(pos, n - 1)
+    if len(pos) < 2:
+        pos = np.asarray([0, 1], dtype=float)
+    return pos
+
+
+def _exato(op: OpLin, y: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    Coordenadas `(X, Y)` exatas na grade `y x x`.
+    """
+    xx, yy = np.meshgrid(x, y)
+    return aplica(op, np.stack((xx, yy, np.ones_like(xx)), axis=0))[:2]
+
+
+def aproxima(op: OpLin, shape: Tuple[int, int], inicio: Tuple[int, int]=(0, 0), *, tol: float=0.01) -> Indices:
+    """
+    Aproximação de `aplica(op, indices(shape, inicio))`
+    por partes.
+
+    A operação exata só é calculada nos cantos de
+    ladrilhos da saída e as coordenadas dentro de cada
+    ladrilho são interpoladas a partir deles, sem divisão
+    por `W` em cada pixel. O lado dos ladrilhos é reduzido
+    até que o erro, medido nos centros e nos pontos médios
+    das arestas, fique abaixo de `tol`.
+
+    Parâmetros
+    ----------
+    op: ndarray
+        Operação linear, possivelmente projetiva.
+    shape: (int, int)
+        Dimensões da saída.
+    inicio: (int, int), opcional
+        Coordenadas `(y, x)` do primeiro pixel.
+    tol: float, opcional
+        Erro máximo das coordenadas, em pixels.
+        Padrão: 0.01.
+
+    Retorno
+    -------
+    indices: ndarray
+        Matriz de coordenadas transformadas, com `W = 1`.
+    """
+    H, W = shape
+    # operação a partir da origem da janela
+    op = op @ np.asarray([
+        [1, 0, inicio[1]],
+        [0, 1, inicio[0]],
+        [0, 0,         1]
+    ], dtype=float)
+
+    passo = 1 << max(shape).bit_length()
+    while passo > 1:
+        y, x = _cantos(H, passo), _cantos(W, passo)
+        G = _exato(op, y, x)
+        # centros e pontos médios das arestas
+        ym = np.sort(np.concatenate((y, (y[1:] + y[:-1]) / 2)))
+        xm = np.sort(np.concatenate((x, (x[1:] + x[:-1]) / 2)))
+        aprox = _interpola(_interpola(G, y, 1, ym), x, 2, xm)
+        erro = np.max(np.abs(aprox - _exato(op, ym, xm)))
+
+        if erro <= tol:
+            logging.debug(f'ladrilhos de {passo}px com erro {erro:.2e}')
+            break
+        passo //= 2
+    # passo unitário é a própria operação exata
+    else:
+        return aplica(op, indices(shape))
+
+    res = np.empty((3, H, W), dtype=float)
+    res[2] = 1
+    # linhas dos cantos interpoladas em todas as colunas
+    linhas = _interpola(G, x, 2, np.arange(W, dtype=float))
+    delta = np.diff(linhas, axis=1)
+    # e cada faixa de ladrilhos a partir das suas bordas
+    for j in range(len(y) - 1):
+        y0, y1 = int(y[j]), min(int(y[j+1]), H - 1)
+        if j == len(y) - 2:
+            y1 = H
+        frac = (np.arange(y0, y1) - y[j]) / (y[j+1] - y[j])
+
+        faixa = res[:2, y0:y1]
+        np.multiply(delta[:, j, np.newaxis], frac[:, np.newaxis], out=faixa)
+        faixa += linhas[:, j, np.newaxis]
+    return res
+
+
+# alcance máximo dos métodos de interpolação em torno
+# da coordenada truncada, com folga
+_MARGEM = 4
+
+class Compactas(NamedTuple):
+    """
+    Coordenadas em ponto fixo: parte inteira em 16 ou
+    32 bits e parte fracionária quantizada em `bits`.
+    """
+    # `(X, Y)` truncados, limitados à volta da entrada
+    base: np.ndarray
+    # partes fracionárias, em unidades de `2 ** -bits`
+    fracao: np.ndarray
+    bits: int
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        """
+        Formato equivalente da matriz de índices.
+        """
+        return self.base.shape
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes ocupados pela base e pela fração.
+        """
+        return self.base.nbytes + self.fracao.nbytes
+
+    @staticmethod
+    def tipos(entrada: Tuple[int, int], bits: int=16) -> Tuple[type, type]:
+        """
+        Menores tipos da parte inteira e da fracionária
+        para uma entrada de dimensões `entrada`.
+        """
+        if not 1 <= bits <= 16:
+            raise ValueError(f'parte fracionária deve ter de 1 a 16 bits, não {bits}')
+        limite = max(entrada) + _MARGEM
+        base = np.int16 if limite <= np.iinfo(np.int16).max else np.int32
+        fracao = np.uint8 if bits <= 8 else np.uint16
+        return base, fracao
+
+    @staticmethod
+    def vazia(shape: Tuple[int, int], entrada: Tuple[int, int], bits: int=16) -> 'Compactas':
+        """
+        Coordenadas não inicializadas para uma saída de
+        dimensões `shape` e entrada de dimensões `entrada`,
+        com os menores tipos que as representam.
+        """
+        base, fracao = Compactas.tipos(entrada, bits)
+        return Compactas(np.empty((2,) + shape, dtype=base), np.empty((2,) + shape, dtype=fracao), bits)
+
+    def preenche(self, y: int, ind: Indices, entrada: Tuple[int, int]) -> None:
+        """
+        Quantiza as coordenadas `ind` nas linhas a partir
+        de `y`, truncando a parte fracionária.
+
+        A parte inteira é sempre a mesma das coordenadas
+        exatas, mas a fração truncada fica até `2 ** -bits`
+        abaixo da exata. Com 12 bits ou mais, os métodos com
+        pesos ficam a no máximo um nível de 8 bits do
+        resultado exato. No vizinho mais próximo, frações
+        logo acima de 0.5 podem ser truncadas para 0.5 ou
+        menos, e então o pixel vizinho é escolhido. Com
+        menos bits, os desvios crescem.
+
+        Coordenadas muito fora da entrada são aproximadas
+        para perto da borda, onde continuam acessando só o
+        fundo.
+
+        Parâmetros
+        ----------
+        y: int
+            Primeira linha preenchida.
+        ind: ndarray
+            Coordenadas homogêneas `(3, h, W)` das linhas.
+        entrada: (int, int)
+            Dimensões da imagem de entrada.
+        """
+        H, W = entrada
+        pos = ind[:2]
+        inteiro = np.floor(pos)
+        # fração truncada, para que a parte inteira seja
+        # sempre a mesma das coordenadas exatas
+        frac = np.floor((pos - inteiro) * (1 << self.bits))
+
+        base, fracao = self.base[:, y:y+pos.shape[1]], self.fracao[:, y:y+pos.shape[1]]
+        np.clip(inteiro[0], -_MARGEM, W + _MARGEM, out=inteiro[0])
+        np.clip(inteiro[1], -_MARGEM, H + _MARGEM, out=inteiro[1])
+        np.copyto(base, inteiro, casting='unsafe')
+        np.copyto(fracao, frac, casting='unsafe')
+
+
+# estratégias de coleta dos pixels em `acesso`: `take`
+# pelo índice linear ou indexação por linha e coluna
+COLETAS = ('take', 'indexacao')
+# estratégia em uso, ajustável pelo perfil da máquina
+COLETA = 'take'
+
+def palavras(img: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Imagem de 8 bits `(..., C)` vista como uma matriz
+    `(...)` de palavras de `C` bytes, sem cópia, ou `None`
+    se ela não é contígua.
+
+    Palavras de 1, 2 e 4 bytes são inteiros sem sinal,
+    como BGRA em `uint32`, e as demais são opacas.
+    """
+    if img.dtype != np.uint8 or not img.flags.c_contiguous:
+        return None
+    return img.view(_PALAVRAS.get(img.shape[-1], f'V{img.shape[-1]}'))[..., 0]
+
+
+def palavra(cor: Color, dtype: np.dtype) -> np.ndarray:
+    """
+    Cor de 8 bits como uma única palavra, como em
+    `palavras`.
+    """
+    return np.frombuffer(np.ascontiguousarray(cor, dtype=np.uint8).tobytes(), dtype=dtype)[0]
+
+
+# tipos das palavras de cada número de canais
+_PALAVRAS = {1: np.uint8, 2: np.uint16, 4: np.uint32}
+
 @overload
-def zeros(ind: Indices) -> Imagem: ...
+def zeros(ind: Indices, canais: int=4) -> Imagem: ...
 @overload
-def zeros(ind: Indices, *, dtype: type) -> np.ndarray: ...
-def zeros(ind: Indices, *, dtype: type=np.uint8) -> np.ndarray:
+def zeros(ind: Indices, canais: int=4, *, dtype: type) -> np.ndarray: ...
+def zeros(ind: Indices, canais: int=4, *, dtype: type=np.uint8) -> np.ndarray:
     """
-    Matriz de zeros com o formato da imagem resultante.
+    Matriz de zeros com o formato da imagem resultante,
+    com `canais` canais de cor.
     """
-    return np.zeros(ind.shape[1:] + (4,), dtype=dtype)
+    return np.zeros(ind.shape[1:] + (canais,), dtype=dtype)
 
 @overload
-def acesso(img: Imagem, ind: Indices, fundo: Color) -> Imagem: ...
+def acesso(img: Imagem, ind: Indices, fundo: Color, *, espaco: Optional[Espaco]=None) -> Imagem: ...
 @overload
-def acesso(img: Imagem, ind: Indices, fundo: Color, *, out: np.ndarray) -> np.ndarray: ...
-def acesso(img: Imagem, ind: Indices, fundo: Color, *, out: Optional[np.ndarray]=None) -> np.ndarray:
+def acesso(img: Imagem, ind: Indices, fundo: Color, *, out: np.ndarray, espaco: Optional[Espaco]=None) -> np.ndarray: ...
+def acesso(img: Imagem, ind: Indices, fundo: Color, *, out: Optional[np.ndarray]=None, espaco: Optional[Espaco]=None) -> np.ndarray:
     """
     Acesso na imagem pela matriz de índices.
 
@@ -82,10 +325,13 @@ def acesso(img: Imagem, ind: Indices, fundo: Color, *, out: Optional[np.ndarray]
         Imagem de entrada.
     ind: ndarray
         Matriz das coordenadas homogêneas.
-    fundo: (int, int, int, int)
-        Cor para índices fora da imagem.
+    fundo: ndarray
+        Cor para índices fora da imagem, com os mesmos
+        canais da imagem.
     out: ndarray, opcional
         Matriz para salvar o resultado.
+    espaco: Espaco, opcional
+        Área de trabalho para os buffers intermediários.
 
     Retorno
     -------
@@ -93,18 +339,60 @@ def acesso(img: Imagem, ind: Indices, fundo: Color, *, out: Optional[np.ndarray]
         Imagem com pixels recuperados da entrada nas
         coordenadas especificadas.
     """
-    H, W, _ = img.shape
-    # força inteiro, se necesserário
-    x, y = ind[:2].astype(int, copy=False)
-    # pontos que estão dentra da imagem de entrada
-    dentro = (x >= 0) & (x < W) & (y >= 0) & (y < H)
+    H, W, C = img.shape
+    shape = ind.shape[1:]
+    if espaco is None:
+        espaco = Espaco()
+
+    # força inteiro, se necesserário, mas mantém os
+    # tipos menores das coordenadas compactas
+    if np.issubdtype(ind.dtype, np.integer):
+        x, y = ind[:2]
+    else:
+        x, y = ind[:2].astype(int)
+    # linha e coluna, limitadas para a imagem
+    linear = espaco.buffer('acesso.linear', shape, np.intp)
+    coluna = espaco.buffer('acesso.coluna', shape, np.intp)
+    np.clip(y, 0, H - 1, out=linear)
+    np.clip(x, 0, W - 1, out=coluna)
+
+    # pontos fora da imagem de entrada são os alterados
+    # pelo limite
+    fora = espaco.buffer('acesso.fora', shape, bool)
+    aux = espaco.buffer('acesso.aux', shape, bool)
+    np.not_equal(coluna, x, out=fora)
+    fora |= np.not_equal(linear, y, out=aux)
 
     # imagem de saída
     if out is None:
-        out = zeros(ind)
-    # acessos válidos
-    out[dentro] = img[y[dentro], x[dentro]]
-    # e inválidos
-    out[~dentro] = fundo
+        out = zeros(ind, C)
+    # acessos sempre válidos, direto na saída quando possível
+    if out.dtype == img.dtype:
+        pixels = out
+    else:
+        pixels = espaco.buffer('acesso.pixels', shape + (C,), img.dtype)
+
+    # cada pixel como uma única palavra de `C` bytes, sem cópia
+    origem, destino = palavras(img), palavras(pixels)
+    if origem is not None and destino is not None:
+        if COLETA == 'indexacao':
+            destino[...] = origem[linear, coluna]
+        else:
+            linear *= W
+            linear += coluna
+            np.take(origem.reshape(-1), linear, out=destino, mode='clip')
+        # e fundo para os inválidos, também como palavra
+        np.copyto(destino, palavra(fundo, destino.dtype), where=fora)
+    else:
+        if COLETA == 'indexacao':
+            pixels[...] = img[linear, coluna]
+        else:
+            # índice linear
+            linear *= W
+            linear += coluna
+            np.take(img.reshape(-1, C), linear, axis=0, out=pixels, mode='clip')
+        np.copyto(pixels, fundo, where=fora[..., np.newaxis])
 
+    if pixels is not out:
+        np.copyto(out, pixels)
     return out
@@ -0,0 +1,184 @@
+"""
+Renderização incremental: com a mesma transformação, só
+os pixels da saída que dependem de regiões alteradas da
+entrada são interpolados de novo.
+"""
+import io
+import math
+import hashlib
+import logging
+from typing import Dict, Tuple, Optional, Iterator
+import numpy as np
+from .tipos import Imagem, Color, Limites
+from .idx import aplica
+from .interp import Metodo
+from .plano import Plano, Janela, indices, recorte
+from .cache import atomico
+
+
+# lado dos blocos da entrada comparados entre execuções
+BLOCO = 32
+# lado dos ladrilhos da saída refeitos
+LADRILHO = 64
+
+
+def assinaturas(img: Imagem, bloco: int=BLOCO) -> np.ndarray:
+    """
+    Hash de cada bloco `bloco x bloco` da imagem.
+
+    Retorno
+    -------
+    hashes: ndarray
+        Matriz `(BY, BX)` com os hashes de 16 bytes.
+    """
+    H, W = img.shape[:2]
+    BY, BX = math.ceil(H / bloco), math.ceil(W / bloco)
+    hashes = np.empty((BY, BX), dtype='S16')
+    for by in range(BY):
+        for bx in range(BX):
+            pixels = np.ascontiguousarray(img[by*bloco:(by+1)*bloco, bx*bloco:(bx+1)*bloco])
+            hashes[by, bx] = hashlib.blake2b(pixels.data, digest_size=16).digest()
+    return hashes
+
+
+def ladrilhos(P: Plano, mudou: np.ndarray, bloco: int, raio: int, janela: Janela) -> Iterator[Janela]:
+    """
+    Ladrilhos da janela da saída que podem acessar algum
+    bloco alterado: cada bloco, com o raio do método em
+    volta, é levado pela operação direta até a saída.
+    """
+    Y, X, H, W = janela
+    candidatos = np.zeros((math.ceil(H / LADRILHO), math.ceil(W / LADRILHO)), dtype=bool)
+
+    for by, bx in zip(*np.nonzero(mudou)):
+        y0, x0 = by * bloco - raio, bx * bloco - raio
+        y1, x1 = (by + 1) * bloco + raio, (bx + 1) * bloco + raio
+        cantos: Limites = np.asarray([
+            [x0, x1, x0, x1],
+            [y0, y0, y1, y1],
+            [1, 1, 1, 1],
+        ], dtype=float)
+        cx, cy, _ = aplica(P.T, cantos)
+        # ladrilhos tocados pela caixa, relativos à janela
+        ty0 = max(math.floor(cy.min()) - 1 - Y, 0) // LADRILHO
+        tx0 = max(math.floor(cx.min()) - 1 - X, 0) // LADRILHO
+        ty1 = min(math.ceil(cy.max()) + 1 - Y, H - 1) // LADRILHO
+        tx1 = min(math.ceil(cx.max()) + 1 - X, W - 1) // LADRILHO
+        if ty1 >= ty0 and tx1 >= tx0:
+            candidatos[ty0:ty1+1, tx0:tx1+1] = True
+
+    for ty, tx in zip(*np.nonzero(candidatos)):
+        yield recorte((Y + ty * LADRILHO, X + tx * LADRILHO, LADRILHO, LADRILHO), (Y + H, X + W))
+
+
+def afetados(ind: np.ndarray, mudou: np.ndarray, bloco: int, raio: int) -> np.ndarray:
+    """
+    Pixels cuja vizinhança no método toca algum bloco
+    alterado. Como a vizinhança é menor que um bloco, ela
+    cruza no máximo dois blocos em cada eixo.
+    """
+    BY, BX = mudou.shape
+    x, y = np.floor(ind[:2]).astype(int)
+    res = np.zeros(x.shape, dtype=bool)
+    for cy in (y - (raio - 1), y + raio):
+        for cx in (x - (raio - 1), x + raio):
+            by, bx = cy // bloco, cx // bloco
+            dentro = (by >= 0) & (by < BY) & (bx >= 0) & (bx < BX)
+            res |= dentro & mudou[np.clip(by, 0, BY - 1), np.clip(bx, 0, BX - 1)]
+    return res
+
+
+def incremental(img: Imagem, P: Plano, metodo: Metodo, fundo: Color, estado: str, *,
+                janela: Optional[Janela]=None, bloco: int=BLOCO) -> Tuple[Imagem, int]:
+    """
+    Renderiza a transformação reaproveitando o resultado
+    anterior salvo em `estado`, se ele for da mesma
+    transformação e de uma entrada com as mesmas
+    dimensões. Sem estado compatível, renderiza tudo.
+
+    O novo resultado é salvo no estado, junto dos hashes
+    dos blocos da entrada.
+
+    Parâmetros
+    ----------
+    img: ndarray
+        Imagem de entrada, já com os canais do fundo.
+    P: Plano
+        Transformação a ser aplicada.
+    metodo: Metodo
+        Método de interpolação.
+    fundo: ndarray
+        Cor de fundo.
+    estado: str
+        Arquivo `npz` com o resultado anterior.
+    janela: (int, int, int, int), opcional
+        Retângulo `(y, x, altura, largura)` da saída.
+    bloco: int, opcional
+        Lado dos blocos da entrada comparados.
+
+    Retorno
+    -------
+    out: ndarray
+        Imagem resultante.
+    refeitos: int
+        Pixels interpolados nesta execução.
+
+    Erro
+    ----
+    ValueError
+        Problema de escrita do estado.
+    """
+    if janela is None:
+        janela = (0, 0) + P.dim
+    janela = recorte(janela, P.dim)
+    hashes = assinaturas(img, bloco)
+    chaves = dict(T=P.T, dim=np.asarray(P.dim), janela=np.asarray(janela), metodo=np.asarray(str(metodo)),
+                  fundo=fundo, forma=np.asarray(img.shape), bloco=np.asarray(bloco))
+
+    anterior = carrega(estado)
+    compativel = anterior is not None and all(
+        nome in anterior and anterior[nome].shape == valor.shape and np.array_equal(anterior[nome], valor)
+        for nome, valor in chaves.items()
+    )
+
+    if not compativel:
+        logging.info(f'{estado}: sem resultado anterior compatível')
+        out = metodo(img, indices(P, janela), fundo)
+        refeitos = out.shape[0] * out.shape[1]
+    else:
+        out = np.array(anterior['saida'])
+        mudou = anterior['hashes'] != hashes
+        logging.info(f'{np.count_nonzero(mudou)} de {mudou.size} blocos alterados')
+
+        refeitos = 0
+        Y, X, _, _ = janela
+        for jan in ladrilhos(P, mudou, bloco, metodo.raio, janela):
+            ind = indices(P, jan)
+            mascara = afetados(ind, mudou, bloco, metodo.raio)
+            if not mascara.any():
+                continue
+            y, x, h, w = jan
+            res = metodo(img, ind, fundo)
+            np.copyto(out[y-Y:y-Y+h, x-X:x-X+w], res, where=mascara[..., np.newaxis])
+            refeitos += np.count_nonzero(mascara)
+
+    buf = io.BytesIO()
+    np.savez(buf, saida=out, hashes=hashes, **chaves)
+    try:
+        atomico(estado, buf.getvalue())
+    except OSError as err:
+        raise ValueError(f'problema de escrita em {estado}: {err}') from err
+    return out, refeitos
+
+
+def carrega(estado: str) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Estado salvo, ou `None` se não existe ou não pode
+    ser lido.
+    """
+    try:
+        with np.load(estado, allow_pickle=False) as dados:
+            return {nome: dados[nome] for nome in dados.files}
+    except (OSError, ValueError) as err:
+        logging.debug(f'estado {estado} não lido: {err}')
+        return None
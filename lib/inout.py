@@ -1,36 +1,111 @@
 """
 Funções de IO com as imagens.
 """
+import io
+import os
+import struct
 import logging
+from sys import stdout
+from time import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Tuple, List, Optional
 import numpy as np
 import cv2
-from .tipos import Imagem
+from .tipos import Imagem, Color
+from .reducao import reduz
 
 
-def encode(img: Imagem, ext: str='PNG') -> bytes:
+# estratégias de compressão do zlib para PNG
+ESTRATEGIAS = {
+    'padrao': cv2.IMWRITE_PNG_STRATEGY_DEFAULT,
+    'filtrada': cv2.IMWRITE_PNG_STRATEGY_FILTERED,
+    'huffman': cv2.IMWRITE_PNG_STRATEGY_HUFFMAN_ONLY,
+    'rle': cv2.IMWRITE_PNG_STRATEGY_RLE,
+    'fixa': cv2.IMWRITE_PNG_STRATEGY_FIXED,
+}
+# filtros de linha do PNG
+FILTROS = {
+    'nenhum': cv2.IMWRITE_PNG_FILTER_NONE,
+    'sub': cv2.IMWRITE_PNG_FILTER_SUB,
+    'up': cv2.IMWRITE_PNG_FILTER_UP,
+    'avg': cv2.IMWRITE_PNG_FILTER_AVG,
+    'paeth': cv2.IMWRITE_PNG_FILTER_PAETH,
+    'rapidos': cv2.IMWRITE_PNG_FAST_FILTERS,
+    'todos': cv2.IMWRITE_PNG_ALL_FILTERS,
+}
+# tipo de tupla do PAM por número de canais
+PAM = {
+    1: cv2.IMWRITE_PAM_FORMAT_GRAYSCALE,
+    3: cv2.IMWRITE_PAM_FORMAT_RGB,
+    4: cv2.IMWRITE_PAM_FORMAT_RGB_ALPHA,
+}
+
+
+def parametros(img: Imagem, ext: str, *, compressao: Optional[int]=None,
+               estrategia: Optional[str]=None, filtro: Optional[str]=None) -> List[int]:
+    """
+    Parâmetros de escrita do OpenCV para o formato.
+    """
+    ext = ext.lower()
+    params = []
+    if ext == 'png':
+        if compressao is not None:
+            params += [cv2.IMWRITE_PNG_COMPRESSION, compressao]
+        if estrategia is not None:
+            params += [cv2.IMWRITE_PNG_STRATEGY, ESTRATEGIAS[estrategia]]
+        if filtro is not None:
+            params += [cv2.IMWRITE_PNG_FILTER, FILTROS[filtro]]
+    elif ext == 'pam':
+        params += [cv2.IMWRITE_PAM_TUPLETYPE, PAM[img.shape[2]]]
+    return params
+
+
+def encode(img: Imagem, ext: str='PNG', *, compressao: Optional[int]=None,
+           estrategia: Optional[str]=None, filtro: Optional[str]=None) -> bytes:
     """
     Codifica matriz em buffer para arquivo de imagem.
 
+    Além dos formatos do OpenCV, aceita `npy` e `raw`
+    (bytes da matriz, sem cabeçalho), sem compressão.
+
     Parâmetros
     ----------
     img: ndarray
         Matriz representando a imagem.
     ext: str, opcional
         Entensão do arquivo. Padrão: PNG.
+    compressao: int, opcional
+        Nível de compressão do PNG, de 0 a 9.
+    estrategia: str, opcional
+        Estratégia do zlib para PNG (`ESTRATEGIAS`).
+    filtro: str, opcional
+        Filtros de linha do PNG (`FILTROS`).
 
     Retorno
     -------
     buf: bytes
-        Buffer com dados da imagem em PNG.
+        Buffer com dados da imagem no formato.
 
     Erro
     ----
     ValueError
-        A entrada não representa uma imagem.
+        A entrada não representa uma imagem ou o
+        formato não suporta os canais dela.
     """
     logging.debug(f'encoding imagem {img.shape} em {ext}')
 
-    ok, buf = cv2.imencode('.' + ext, img)
+    if ext.lower() == 'raw':
+        return np.ascontiguousarray(img).tobytes()
+    elif ext.lower() == 'npy':
+        buf = io.BytesIO()
+        np.save(buf, img, allow_pickle=False)
+        return buf.getvalue()
+
+    params = parametros(img, ext, compressao=compressao, estrategia=estrategia, filtro=filtro)
+    try:
+        ok, buf = cv2.imencode('.' + ext, img, params)
+    except cv2.error as err:
+        raise ValueError(f'não foi possível codificar {img.shape} em "{ext}"') from err
     # problemas de codificação
     if not ok:
         raise ValueError(f'não foi possível codificar em "{ext}"')
@@ -38,45 +113,211 @@ def encode(img: Imagem, ext: str='PNG') -> bytes:
     return buf.tobytes()
 
 
-def decode(buffer: bytes) -> Imagem:
+def _png(buffer: bytes) -> Optional[Tuple[int, int, int]]:
+    """
+    Dimensões do cabeçalho IHDR de um PNG.
+    """
+    if buffer[:8] != b'\x89PNG\r\n\x1a\n' or buffer[12:16] != b'IHDR':
+        return None
+    W, H = struct.unpack('>II', buffer[16:24])
+    # canais do OpenCV por tipo de cor, com paleta como BGR
+    return H, W, {0: 1, 2: 3, 3: 3, 4: 4, 6: 4}.get(buffer[25], 0)
+
+
+def _jpeg(buffer: bytes) -> Optional[Tuple[int, int, int]]:
+    """
+    Dimensões do primeiro segmento SOF de um JPEG.
+    """
+    if buffer[:2] != b'\xff\xd8':
+        return None
+    pos = 2
+    while pos + 4 <= len(buffer):
+        if buffer[pos] != 0xFF:
+            return None
+        marcador = buffer[pos + 1]
+        # marcadores sem segmento
+        if marcador == 0xFF or 0xD0 <= marcador <= 0xD9 or marcador == 0x01:
+            pos += 1 if marcador == 0xFF else 2
+            continue
+        tamanho, = struct.unpack('>H', buffer[pos+2:pos+4])
+        # SOF0 a SOF15, menos DHT, JPG e DAC
+        if 0xC0 <= marcador <= 0xCF and marcador not in (0xC4, 0xC8, 0xCC):
+            if pos + 10 > len(buffer):
+                return None
+            H, W = struct.unpack('>HH', buffer[pos+5:pos+9])
+            return H, W, buffer[pos + 9]
+        pos += 2 + tamanho
+    return None
+
+
+def cabecalho(buffer: bytes) -> Optional[Tuple[int, int, int]]:
+    """
+    Dimensões `(H, W, C)` da imagem decodificada, lidas
+    só do cabeçalho, para PNG e JPEG.
+    """
+    return _png(buffer) or _jpeg(buffer)
+
+
+def dimensoes(buffer: bytes) -> Optional[Tuple[int, int]]:
     """
-    Decodifica imagem colorida a partir de
-    um buffer PNG.
+    Dimensões `(H, W)` da imagem lidas só do cabeçalho,
+    sem decodificar, para PNG e JPEG.
+    """
+    forma = cabecalho(buffer)
+    return None if forma is None else forma[:2]
+
+
+# leitura reduzida do OpenCV para JPEG, por fator e
+# para imagens em cinza ou coloridas
+REDUZIDA = {
+    (1, 1): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (2, 1): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (3, 1): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    (1, 3): cv2.IMREAD_REDUCED_COLOR_2,
+    (2, 3): cv2.IMREAD_REDUCED_COLOR_4,
+    (3, 3): cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+def decode(buffer: bytes, reducao: int=0) -> Imagem:
+    """
+    Decodifica imagem a partir de um buffer PNG,
+    mantendo o número de canais original.
 
     Parâmetros
     ----------
     buffer: bytes
         Dados do arquivo da imagem.
+    reducao: int, opcional
+        Quantidade de reduções pela metade. JPEGs são
+        decodificados direto em até 1/8 da resolução,
+        outros formatos e o restante usam `reducao.reduz`.
 
     Retorno
     -------
     img: ndarray
-        Matriz representando a imagem lida.
+        Matriz representando a imagem lida, com 1, 3
+        ou 4 canais.
 
     Erro
     ----
     ValueError
         Arquivo não pode ser decodificado como imagem.
     """
-    logging.debug(f'decoding buffer de {len(buffer)} bytes em BGRA')
+    logging.debug(f'decoding buffer de {len(buffer)} bytes')
 
     buf = np.frombuffer(buffer, dtype=np.uint8)
-    img = cv2.imdecode(buf, cv2.IMREAD_UNCHANGED)
+    flags, feitas = cv2.IMREAD_UNCHANGED, 0
+    jpeg = _jpeg(buffer) if reducao > 0 else None
+    if jpeg is not None and jpeg[2] in (1, 3):
+        feitas = min(reducao, 3)
+        # o EXIF não é aplicado na leitura normal
+        flags = REDUZIDA[feitas, jpeg[2]] | cv2.IMREAD_IGNORE_ORIENTATION
+
+    img = cv2.imdecode(buf, flags)
     # problemas de decodificação
     if img is None:
         raise ValueError('não foi possível parsear dado como imagem')
 
+    # imagens em escala de cinza também tem eixo de canais
     if img.ndim == 2:
-        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA)
-    elif img.shape[2] == 3:
-        return cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+        img = img[..., np.newaxis]
+    for _ in range(feitas, reducao):
+        img = reduz(img)
+    if reducao > 0:
+        logging.info(f'decodificação reduzida em {2 ** reducao}x: {img.shape}')
+    return img
+
+
+# conversões de cor do OpenCV por número de canais
+CONVERSAO = {
+    (1, 3): cv2.COLOR_GRAY2BGR,
+    (1, 4): cv2.COLOR_GRAY2BGRA,
+    (3, 4): cv2.COLOR_BGR2BGRA,
+}
+
+def necessarios(cor: Color, atual: int) -> int:
+    """
+    Número de canais para representar a cor de fundo em
+    uma imagem com `atual` canais: BGR para cores que não
+    são cinza e BGRA para cores com transparência.
+    """
+    b, g, r, a = cor
+    # canais necessários para a cor
+    if a < 255:
+        num = 4
+    elif b == g == r:
+        num = 1
     else:
-        return img
+        num = 3
+    return max(num, atual)
+
+
+def canais(img: Imagem, cor: Color) -> Tuple[Imagem, Color]:
+    """
+    Compatibiliza os canais da imagem com a cor de fundo.
+
+    A imagem só é promovida quando a cor não pode ser
+    representada nos canais dela (`necessarios`).
+
+    Parâmetros
+    ----------
+    img: ndarray
+        Imagem de entrada, com 1, 3 ou 4 canais.
+    cor: ndarray
+        Cor de fundo em BGRA.
+
+    Retorno
+    -------
+    img: ndarray
+        Imagem com os canais necessários.
+    fundo: ndarray
+        Cor de fundo com os mesmos canais da imagem.
+    """
+    atual = img.shape[2]
+    num = necessarios(cor, atual)
+    if atual < num:
+        logging.debug(f'promovendo imagem de {atual} para {num} canais')
+        img = cv2.cvtColor(img, CONVERSAO[atual, num])
+
+    return img, cor[:num]
+
+
+def formato(caminho: str) -> str:
+    """
+    Formato de escrita pela extensão do caminho, com
+    PNG para a saída padrão ou sem extensão.
+    """
+    if caminho == '-':
+        return 'PNG'
+    return os.path.splitext(caminho)[1][1:] or 'PNG'
+
+
+def grava(buf: bytes, caminho: str) -> None:
+    """
+    Escreve dados já codificados no arquivo, ou na saída
+    padrão com `-`.
+
+    Erro
+    ----
+    ValueError
+        Problema de escrita no caminho especificado.
+    """
+    try:
+        if caminho == '-':
+            stdout.buffer.write(buf)
+            stdout.buffer.flush()
+        else:
+            with open(caminho, 'wb') as arquivo:
+                arquivo.write(buf)
+    except OSError as err:
+        raise ValueError(f'problema de escrita em {caminho}: {err}') from err
 
 
-def imgwrite(img: Imagem, caminho: str) -> None:
+def imgwrite(img: Imagem, caminho: str, *, compressao: Optional[int]=None,
+             estrategia: Optional[str]=None, filtro: Optional[str]=None) -> Tuple[int, float]:
     """
-    Escreve imagem em um arquivo.
+    Escreve imagem em um arquivo, com formato dado pela
+    extensão. O caminho `-` escreve PNG na saída padrão.
 
     Parâmetros
     ----------
@@ -84,6 +325,15 @@ def imgwrite(img: Imagem, caminho: str) -> None:
         Matriz representando uma imagem.
     caminho: str
         Nome do arquivo para escrita.
+    compressao, estrategia, filtro: opcionais
+        Opções de codificação PNG, como em `encode`.
+
+    Retorno
+    -------
+    tamanho: int
+        Bytes escritos.
+    tempo: float
+        Tempo de codificação, em segundos.
 
     Erro
     ----
@@ -92,9 +342,57 @@ def imgwrite(img: Imagem, caminho: str) -> None:
         na codificação da imagem.
     """
     logging.debug(f'escrita de imagem {img.shape} em {caminho}')
+    ext = formato(caminho)
+
+    inicio = time()
+    buf = encode(img, ext, compressao=compressao, estrategia=estrategia, filtro=filtro)
+    tempo = time() - inicio
+    grava(buf, caminho)
+
+    logging.info(f'{caminho}: {len(buf)} bytes em {ext}, codificado em {tempo:.4f} segundos')
+    return len(buf), tempo
+
+
+class Escritor:
+    """
+    Escrita de imagens em uma thread separada, para que
+    o processo siga com o próximo trabalho enquanto a
+    codificação acontece.
+
+    Erros de escrita são relançados em `espera`, ou na
+    saída do bloco `with`.
+    """
+    def __init__(self, *, compressao: Optional[int]=None,
+                 estrategia: Optional[str]=None, filtro: Optional[str]=None) -> None:
+        self.opcoes = dict(compressao=compressao, estrategia=estrategia, filtro=filtro)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='escritor')
+        self.pendentes: List[Future] = []
+
+    def escreve(self, img: Imagem, caminho: str) -> 'Future[Tuple[int, float]]':
+        """
+        Agenda a escrita da imagem. A matriz não deve
+        ser alterada até a escrita terminar.
+        """
+        futuro = self.executor.submit(imgwrite, img, caminho, **self.opcoes)
+        self.pendentes.append(futuro)
+        return futuro
+
+    def espera(self) -> None:
+        """
+        Espera todas as escritas agendadas.
+        """
+        pendentes, self.pendentes = self.pendentes, []
+        for futuro in pendentes:
+            futuro.result()
+
+    def __enter__(self) -> 'Escritor':
+        return self
 
-    if not cv2.imwrite(caminho, img):
-        raise ValueError('problema de escrita ou codificação')
+    def __exit__(self, *exc: object) -> None:
+        try:
+            self.espera()
+        finally:
+            self.executor.shutdown()
 
 
 def imgshow(img: Imagem, nome: str="", delay: int=250) -> None:
@@ -4,10 +4,11 @@ em imagens.
 """
 import logging
 from enum import Enum, unique, auto
-from typing import Tuple
+from typing import Tuple, Optional, Union
 import numpy as np
 from .tipos import Indices, Imagem, Color
-from .idx import acesso, zeros
+from .idx import Compactas, acesso
+from .espaco import Espaco
 
 
 @unique
@@ -20,7 +21,8 @@ class Metodo(Enum):
     BICUBICA = auto()
     LAGRANGE = auto()
 
-    def __call__(self, img: Imagem, ind: Indices, fundo: Color) -> Imagem:
+    def __call__(self, img: Imagem, ind: Union[Indices, Compactas], fundo: Color, *, out: Optional[Imagem]=None,
+                 espaco: Optional[Espaco]=None) -> Imagem:
         """
         Aplica a interpolação selecionada.
 
@@ -28,10 +30,18 @@ class Metodo(Enum):
         ----------
         img: ndarray
             Imagem de entrada.
-        ind: ndarray
-            Matriz das coordenadas homogêneas.
-        fundo: (int, int, int, int)
-            Cor para índices fora da imagem.
+        ind: ndarray ou Compactas
+            Matriz das coordenadas homogêneas, ou as
+            coordenadas em ponto fixo.
+        fundo: ndarray
+            Cor para índices fora da imagem, com os mesmos
+            canais da imagem.
+        out: ndarray, opcional
+            Imagem de 8 bits, com o formato da saída, para
+            salvar o resultado.
+        espaco: Espaco, opcional
+            Área de trabalho reaproveitada entre chamadas
+            com a mesma saída.
 
         Retorno
         -------
@@ -42,7 +52,17 @@ class Metodo(Enum):
         logging.debug(f'indices:{ind.shape} com fundo {fundo}')
 
         fn = globals()[str(self)]
-        return fn(img, ind, fundo)
+        return fn(img, ind, fundo, out=out, espaco=espaco)
+
+    @property
+    def raio(self) -> int:
+        """
+        Maior distância, em pixels, entre a coordenada
+        truncada e os vizinhos acessados pelo método.
+        """
+        if self in (Metodo.BICUBICA, Metodo.LAGRANGE):
+            return 2
+        return 1
 
     def __str__(self) -> str:
         """
@@ -51,157 +71,274 @@ class Metodo(Enum):
         return self.name.lower() # pylint: disable=no-member
 
 
-def vizinho(img: Imagem, ind: Indices, fundo: Color) -> Imagem:
+def vizinho(img: Imagem, ind: Union[Indices, Compactas], fundo: Color, *, out: Optional[Imagem]=None,
+            espaco: Optional[Espaco]=None) -> Imagem:
     """
     Interpolação pelo vizinho mais próximo.
     """
-    return acesso(img, np.round(ind), fundo=fundo)
+    if isinstance(ind, Compactas):
+        ind, _ = modf(ind, round=True, espaco=espaco)
+    else:
+        # só o arredondamento, sem a parte fracionária de `modf`
+        if espaco is None:
+            espaco = Espaco()
+        ind = np.rint(ind[:2], out=espaco.buffer('vizinho.arredondado', (2,) + ind.shape[1:]))
+    if out is None:
+        return acesso(img, ind, fundo=fundo, espaco=espaco)
+    return acesso(img, ind, fundo=fundo, out=out, espaco=espaco)
 
 
-def asimg(mat: np.ndarray, *, round: bool=False) -> Imagem:
+def asimg(mat: np.ndarray, *, round: bool=False, out: Optional[Imagem]=None) -> Imagem:
     """
     Convesão de matriz numérica para imagem de 8
     bits, com tratamento de underflow e overflow.
+
+    A matriz de entrada é usada como espaço de trabalho
+    e tem seu conteúdo alterado. O resultado vai para
+    `out`, quando dado.
     """
     # conversão por arredondamento
     if round:
-        mat = np.round(mat)
-
-    # imagem resultante
-    img = mat.astype(np.uint8)
-    # posições de under e overflow
-    img[mat < 0] = 0
-    img[mat > 255] = 255
-    return img
-
-def modf(ind: Indices, *, round: bool=False) -> Tuple[np.ndarray, np.ndarray]:
+        np.rint(mat, out=mat)
+    # limita para 8 bits e converte de uma vez
+    np.clip(mat, 0, 255, out=mat)
+    if out is None:
+        out = np.empty(mat.shape, dtype=np.uint8)
+    np.copyto(out, mat, casting='unsafe')
+    return out
+
+def modf(ind: Union[Indices, Compactas], *, round: bool=False,
+         espaco: Optional[Espaco]=None) -> Tuple[np.ndarray, np.ndarray]:
     """
     Retorna a parte inteira e a parte fracionária de
     cada coordenada. A coordenada W é descartada.
+
+    Coordenadas compactas já estão separadas e mantêm
+    o tipo inteiro delas.
     """
+    if espaco is None:
+        espaco = Espaco()
+    if isinstance(ind, Compactas):
+        return _modf_compacto(ind, round=round, espaco=espaco)
     # descarta W
     ind = ind[:2]
+    x = espaco.buffer('modf.inteiro', ind.shape, np.intp)
+    dx = espaco.buffer('modf.fracao', ind.shape)
     # arredonda ou trunca
     if round:
-        x = np.round(ind)
+        np.rint(ind, out=dx)
     else:
-        x = np.floor(ind)
+        np.floor(ind, out=dx)
+    np.copyto(x, dx, casting='unsafe')
     # parte fracionária
-    dx = ind - x
-    return x.astype(int), dx
+    np.subtract(ind, dx, out=dx)
+    return x, dx
 
 
-def bilinear(img: Imagem, ind: Indices, fundo: Color) -> Imagem:
+def _modf_compacto(ind: Compactas, *, round: bool, espaco: Espaco) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    `modf` das coordenadas em ponto fixo.
+    """
+    x = espaco.buffer('modf.inteiro', ind.base.shape, ind.base.dtype)
+    dx = espaco.buffer('modf.fracao', ind.base.shape)
+    np.copyto(x, ind.base)
+    np.multiply(ind.fracao, 2.0 ** -ind.bits, out=dx)
+    # arredonda como `np.rint`, com empates para o par
+    if round:
+        metade = 1 << (ind.bits - 1)
+        meio = espaco.buffer('modf.meio', ind.base.shape, bool)
+        impar = espaco.buffer('modf.impar', ind.base.shape, bool)
+        np.bitwise_and(ind.base, 1, out=x)
+        np.not_equal(x, 0, out=impar)
+        impar &= np.equal(ind.fracao, metade, out=meio)
+        np.greater(ind.fracao, metade, out=meio)
+        meio |= impar
+        np.copyto(x, ind.base)
+        x += meio
+        dx -= meio
+    return x, dx
+
+
+def bilinear(img: Imagem, ind: Union[Indices, Compactas], fundo: Color, *, out: Optional[Imagem]=None,
+             espaco: Optional[Espaco]=None) -> Imagem:
     """
     Interpolação bilinear.
     """
+    if espaco is None:
+        espaco = Espaco()
+    shape = ind.shape[1:] + img.shape[2:]
+
     # índices truncados
-    ind, dxdy = modf(ind)
+    ind, dxdy = modf(ind, espaco=espaco)
     # "erro" do truncamento
     dx, dy = dxdy[...,np.newaxis]
+    # e seus complementos
+    cx = np.subtract(1, dx, out=espaco.buffer('bilinear.cx', dx.shape))
+    cy = np.subtract(1, dy, out=espaco.buffer('bilinear.cy', dy.shape))
+    w = espaco.buffer('peso', dx.shape)
 
     # vizinhança do ponto
-    f = zeros(ind, dtype=float)
+    f = espaco.buffer('vizinhanca', shape)
+    soma = espaco.buffer('acumulador', shape)
     # f(x, y)
-    f = acesso(img, ind, fundo, out=f)
-    out = (1 - dx) * (1 - dy) * f
+    acesso(img, ind, fundo, out=f, espaco=espaco)
+    np.multiply(np.multiply(cx, cy, out=w), f, out=soma)
     # f(x+1, y)
     ind[0] += 1
-    f = acesso(img, ind, fundo, out=f)
-    out += dx * (1 - dy) * f
+    acesso(img, ind, fundo, out=f, espaco=espaco)
+    soma += np.multiply(np.multiply(dx, cy, out=w), f, out=f)
     # f(x+1, y+1)
     ind[1] += 1
-    f = acesso(img, ind, fundo, out=f)
-    out += (1 - dx) * dy * f
+    acesso(img, ind, fundo, out=f, espaco=espaco)
+    soma += np.multiply(np.multiply(cx, dy, out=w), f, out=f)
     # f(x, y+1)
     ind[0] -= 1
-    f = acesso(img, ind, fundo, out=f)
-    out += dx * dy * f
+    acesso(img, ind, fundo, out=f, espaco=espaco)
+    soma += np.multiply(np.multiply(dx, dy, out=w), f, out=f)
 
     # transformação para 8 bits
-    return asimg(out)
+    return asimg(soma, out=out)
 
 
-def bicubica(img: Imagem, ind: Indices, fundo: Color) -> Imagem:
+def bicubica(img: Imagem, ind: Union[Indices, Compactas], fundo: Color, *, out: Optional[Imagem]=None,
+             espaco: Optional[Espaco]=None) -> Imagem:
     """
     Interpolação bicúbica.
     """
+    if espaco is None:
+        espaco = Espaco()
+    shape = ind.shape[1:] + img.shape[2:]
+
+    # índices truncados e "erros"
+    ind, dxdy = modf(ind, espaco=espaco)
+    dx, dy = dxdy[...,np.newaxis]
+    # buffers auxiliares dos pesos
+    s = espaco.buffer('bicubica.s', dx.shape)
+    t = espaco.buffer('bicubica.t', dx.shape)
+    q = espaco.buffer('bicubica.q', dx.shape)
+
     # operações internas
     def Pe3(t: np.ndarray) -> np.ndarray:
         logging.debug(f'P(t)^3 com t:{t.shape}')
         # já faz P(t)^3
-        idx = (t > 0)
-        t[~idx] = 0
-        t[idx] *= np.square(t[idx])
+        np.maximum(t, 0, out=t)
+        t *= np.square(t, out=q)
         return t
 
-    def R(s: np.ndarray) -> np.ndarray:
+    def R(s: np.ndarray, r: np.ndarray) -> np.ndarray:
         logging.debug(f'R(s) com s:{s.shape}')
 
-        r = Pe3(s + 2)
-        r -= 4 * Pe3(s + 1)
-        r -= 4 * Pe3(s - 1)
-        r += 6 * Pe3(s)
+        Pe3(np.add(s, 2, out=r))
+        r -= np.multiply(Pe3(np.add(s, 1, out=t)), 4, out=t)
+        r -= np.multiply(Pe3(np.subtract(s, 1, out=t)), 4, out=t)
+        r += np.multiply(Pe3(s), 6, out=s)
         r /= 6
         return r
 
-    # índices truncados e "erros"
-    ind, dxdy = modf(ind)
-    dx, dy = dxdy[...,np.newaxis]
+    # pesos de cada coluna e de cada linha da vizinhança
+    Rx, Ry = {}, {}
+    for m in range(-1, 2+1):
+        Rx[m] = R(np.subtract(m, dx, out=s), espaco.buffer(f'bicubica.rx{m}', dx.shape))
+        Ry[m] = R(np.subtract(dy, m, out=s), espaco.buffer(f'bicubica.ry{m}', dy.shape))
 
-    out = zeros(ind, dtype=float)
+    soma = espaco.buffer('acumulador', shape)
+    soma.fill(0)
     # vizinhança do ponto
-    f = zeros(ind, dtype=float)
+    f = espaco.buffer('vizinhanca', shape)
     for m in range(-1, 2+1):
         for n in range(-1, 2+1):
             # acesso do vizinho
-            ind += np.reshape([m, n], (2, 1, 1))
-            f = acesso(img, ind, fundo, out=f)
-            ind -= np.reshape([m, n], (2, 1, 1))
+            ind[0] += m
+            ind[1] += n
+            acesso(img, ind, fundo, out=f, espaco=espaco)
+            ind[0] -= m
+            ind[1] -= n
 
-            out += f * R(m - dx) * R(dy - n)
+            f *= Rx[m]
+            f *= Ry[n]
+            soma += f
 
     # transformação para 8 bits
-    return asimg(out)
+    return asimg(soma, out=out)
 
 
-def lagrange(img: Imagem, ind: Indices, fundo: Color) -> Imagem:
+def lagrange(img: Imagem, ind: Union[Indices, Compactas], fundo: Color, *, out: Optional[Imagem]=None,
+             espaco: Optional[Espaco]=None) -> Imagem:
     """
     Interpolação por polinômios de Lagrange.
     """
+    if espaco is None:
+        espaco = Espaco()
+    shape = ind.shape[1:] + img.shape[2:]
+
     # índices truncados e "erros"
-    (x, y), dxdy = modf(ind)
+    (x, y), dxdy = modf(ind, espaco=espaco)
     dx, dy = dxdy[...,np.newaxis]
 
+    # fatores dos polinômios
+    neg = espaco.buffer('lagrange.neg', dx.shape)
+    m1 = espaco.buffer('lagrange.m1', dx.shape)
+    m2 = espaco.buffer('lagrange.m2', dx.shape)
+    p1 = espaco.buffer('lagrange.p1', dx.shape)
+
+    def pesos(d: np.ndarray, nome: str) -> Tuple[np.ndarray, ...]:
+        logging.debug(f'pesos de {nome} com d:{d.shape}')
+
+        np.negative(d, out=neg)
+        np.subtract(d, 1, out=m1)
+        np.subtract(d, 2, out=m2)
+        np.add(d, 1, out=p1)
+        a, b, c, e = (espaco.buffer(f'lagrange.{nome}{k}', d.shape) for k in range(4))
+        # -d * (d - 1) * (d - 2)
+        np.multiply(neg, m1, out=a)
+        a *= m2
+        # (d + 1) * (d - 1) * (d - 2)
+        np.multiply(p1, m1, out=b)
+        b *= m2
+        # -d * (d + 1) * (d - 2)
+        np.multiply(neg, p1, out=c)
+        c *= m2
+        # d * (d + 1) * (d - 1)
+        np.multiply(d, p1, out=e)
+        e *= m1
+        return a, b, c, e
+
+    # denominadores dos polinômios
+    div = (6, 2, 2, 6)
+    wx = pesos(dx, 'x')
+    wy = pesos(dy, 'y')
+
     # operação interna
-    f = zeros(ind, dtype=float)
-    def L(n: int) -> np.ndarray:
+    ind = espaco.buffer('lagrange.ind', (2,) + x.shape, x.dtype)
+    f = espaco.buffer('vizinhanca', shape)
+    def L(n: int, res: np.ndarray) -> np.ndarray:
         logging.debug(f'L(n={n})')
 
-        ind = np.stack((x - 1, y + n - 2), axis=0)
-        # f(x - 1, y + n - 2)
-        a = -dx * (dx - 1) * (dx - 2) * acesso(img, ind, fundo, out=f)
-        # f(x + 0, y + n - 2)
-        ind[0] += 1
-        b = (dx + 1) * (dx - 1) * (dx - 2) * acesso(img, ind, fundo, out=f)
-        # f(x + 1, y + n - 2)
-        ind[0] += 1
-        c = -dx * (dx + 1) * (dx - 2) * acesso(img, ind, fundo, out=f)
-        # f(x + 2, y + n - 2)
-        ind[0] += 1
-        d = dx * (dx + 1) * (dx - 1) * acesso(img, ind, fundo, out=f)
-
-        return (a / 6) + (b / 2) + (c / 2) + (d / 6)
-
-    # L(1)
-    a = -dy * (dy - 1) * (dy - 2) * L(1)
-    # L(2)
-    b = (dy + 1) * (dy - 1) * (dy - 2) * L(2)
-    # L(3)
-    c = -dy * (dy + 1) * (dy - 2) * L(3)
-    # L(4)
-    d = dy * (dy + 1) * (dy - 1) * L(4)
+        np.subtract(x, 1, out=ind[0])
+        np.add(y, n - 2, out=ind[1])
+        for k in range(4):
+            # f(x + k - 1, y + n - 2)
+            acesso(img, ind, fundo, out=f, espaco=espaco)
+            ind[0] += 1
+
+            if k == 0:
+                np.multiply(wx[k], f, out=res)
+                res /= div[k]
+            else:
+                res += np.divide(np.multiply(wx[k], f, out=f), div[k], out=f)
+        return res
 
     # imagem resultante
-    out = (a / 6) + (b / 2) + (c / 2) + (d / 6)
-    return asimg(out)
+    soma = espaco.buffer('acumulador', shape)
+    linha = espaco.buffer('lagrange.linha', shape)
+    for k in range(4):
+        # L(k + 1)
+        L(k + 1, linha)
+        linha *= wy[k]
+        linha /= div[k]
+
+        if k == 0:
+            np.copyto(soma, linha)
+        else:
+            soma += linha
+    return asimg(soma, out=out)
@@ -0,0 +1,86 @@
+"""
+Deformações arbitrárias por mapas de coordenadas
+externos, como correção de lente ou malhas, lidos de
+arquivos `.npy` mapeados em disco e aplicados em faixas.
+"""
+from typing import Optional
+import numpy as np
+from .tipos import Imagem, Color
+from .espaco import Espaco
+from .interp import Metodo
+from .plano import Janela, FAIXA, ladrilhado
+
+
+def carrega(caminho: str) -> np.ndarray:
+    """
+    Mapa `(2, H, W)` do arquivo `.npy`, mapeado em disco
+    e só lido quando acessado.
+
+    O primeiro plano tem a coordenada X e o segundo a
+    coordenada Y da entrada para cada pixel `(y, x)` da
+    saída, em pixels com centro nos inteiros, como os
+    índices de `plano.indices`.
+
+    Erro
+    ----
+    ValueError
+        Arquivo ilegível ou mapa com formato ou tipo
+        inválido.
+    """
+    try:
+        mapa = np.load(caminho, mmap_mode='r', allow_pickle=False)
+    except (OSError, ValueError) as err:
+        raise ValueError(f'mapa {caminho} não lido: {err}') from err
+
+    if not isinstance(mapa, np.ndarray) or mapa.ndim != 3 or mapa.shape[0] != 2 \
+            or not np.issubdtype(mapa.dtype, np.floating):
+        raise ValueError(f'mapa deve ser matriz (2, H, W) de ponto flutuante, não {mapa.dtype}{mapa.shape}')
+    return mapa
+
+
+def remapeia(img: Imagem, mapa: np.ndarray, metodo: Metodo, fundo: Color, *,
+             janela: Optional[Janela]=None, faixa: int=FAIXA, out: Optional[Imagem]=None) -> Imagem:
+    """
+    Interpola a entrada nas coordenadas do mapa, em
+    faixas de `faixa` linhas, então só uma faixa do mapa
+    é lida e convertida por vez.
+
+    Parâmetros
+    ----------
+    img: ndarray
+        Imagem de entrada, já com os canais do fundo.
+    mapa: ndarray
+        Coordenadas `(2, H, W)` da entrada, como em
+        `carrega`.
+    metodo: Metodo
+        Método de interpolação.
+    fundo: ndarray
+        Cor para coordenadas fora da entrada.
+    janela: (int, int, int, int), opcional
+        Retângulo `(y, x, altura, largura)` da saída.
+    faixa: int, opcional
+        Linhas do mapa lidas por vez.
+    out: ndarray, opcional
+        Matriz com o formato da janela para o resultado,
+        que pode ser mapeada em disco.
+
+    Retorno
+    -------
+    out: ndarray
+        Imagem resultante.
+
+    Erro
+    ----
+    ValueError
+        Janela fora do mapa.
+    """
+    espaco = Espaco()
+    def desenha(jan: Janela, destino: Imagem) -> None:
+        y, x, h, w = jan
+        # coordenadas homogêneas da faixa, no buffer reaproveitado
+        ind = espaco.buffer('mapa.indices', (3, h, w))
+        ind[:2] = mapa[:, y:y+h, x:x+w]
+        ind[2] = 1
+        metodo(img, ind, fundo, out=destino, espaco=espaco)
+
+    return ladrilhado(desenha, mapa.shape[1:], img.shape[2], janela=janela, faixa=faixa, out=out)
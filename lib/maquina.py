@@ -0,0 +1,41 @@
+"""
+Identificação desta máquina, arquivos por usuário das
+medidas salvas e medida de tempo, comuns à calibração,
+ao ajuste automático e aos benchmarks.
+"""
+import os
+import platform
+from time import perf_counter
+from typing import Callable, Tuple, Any
+
+
+# diretório dos arquivos salvos por usuário
+DIRETORIO = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'mc920')
+
+
+def nome() -> str:
+    """
+    Nome desta máquina nos arquivos salvos.
+    """
+    return platform.node() or 'local'
+
+
+def arquivo(nome: str) -> str:
+    """
+    Caminho do arquivo salvo `nome`, no diretório por
+    usuário.
+    """
+    return os.path.join(DIRETORIO, nome)
+
+
+def medida(fn: Callable[[], Any], repeticoes: int) -> Tuple[float, Any]:
+    """
+    Menor tempo de execução da função e o último
+    resultado dela.
+    """
+    melhor, res = float('inf'), None
+    for _ in range(repeticoes):
+        inicio = perf_counter()
+        res = fn()
+        melhor = min(melhor, perf_counter() - inicio)
+    return melhor, res
@@ -0,0 +1,116 @@
+"""
+Várias saídas a partir de uma única decodificação da
+entrada.
+"""
+import logging
+import threading
+from time import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Dict, Optional, NamedTuple
+from .tipos import Imagem, Color
+from .interp import Metodo
+from .inout import Escritor, canais, necessarios
+from .plano import Plano, Janela, indices, compactas
+from .reducao import Reducoes, nivel, adapta
+from .adaptativo import adaptativo
+
+
+class Saida(NamedTuple):
+    """
+    Especificação de uma das saídas.
+    """
+    caminho: str
+    plano: Plano
+    metodo: Metodo
+    # cor de fundo em BGRA
+    cor: Color
+    janela: Optional[Janela] = None
+    tolerancia: Optional[float] = None
+    # bits das coordenadas em ponto fixo, se usadas
+    compacto: Optional[int] = None
+    # limiar da interpolação adaptativa e o método das
+    # regiões planas
+    adaptativo: Optional[float] = None
+    simples: Metodo = Metodo.BILINEAR
+
+
+class Entradas:
+    """
+    Entrada reduzida e com os canais da cor de fundo,
+    compartilhada entre as saídas.
+    """
+    def __init__(self, img: Imagem) -> None:
+        self.reducoes = Reducoes(img)
+        self.cache: Dict[Tuple[int, int], Imagem] = {}
+        self.trava = threading.Lock()
+
+    def entrada(self, k: int, cor: Color) -> Tuple[Imagem, Color]:
+        """
+        Entrada reduzida `k` vezes, com os canais
+        necessários para `cor`.
+        """
+        img = self.reducoes[k]
+        chave = k, necessarios(cor, img.shape[2])
+        with self.trava:
+            if chave not in self.cache:
+                self.cache[chave], _ = canais(img, cor)
+            return self.cache[chave], cor[:chave[1]]
+
+
+def multiplo(img: Imagem, saidas: List[Saida], escritor: Escritor, *,
+             trabalhadores: Optional[int]=None, prefiltro: bool=False) -> List[Tuple[Saida, float]]:
+    """
+    Gera todas as saídas da mesma entrada, em paralelo,
+    cada uma com suas coordenadas, exatas ou compactas, e
+    sua interpolação, direta ou adaptativa.
+
+    Saídas que reduzem a imagem pela metade ou mais, sem
+    projeção, partem da entrada pré-filtrada por médias
+    de blocos (`reducao`), compartilhada entre elas. As
+    maiores saídas começam primeiro.
+
+    Parâmetros
+    ----------
+    img: ndarray
+        Imagem de entrada, decodificada.
+    saidas: [Saida]
+        Especificação de cada saída.
+    escritor: Escritor
+        Escrita das imagens resultantes.
+    trabalhadores: int, opcional
+        Número de threads. Padrão: do `ThreadPoolExecutor`.
+    prefiltro: bool, opcional
+        Usa a entrada reduzida quando possível.
+
+    Retorno
+    -------
+    tempos: [(Saida, float)]
+        Tempo de cada saída, em segundos, na ordem em
+        que foram executadas.
+    """
+    entradas = Entradas(img)
+    ordem = sorted(saidas, key=lambda saida: saida.plano.dim[0] * saida.plano.dim[1], reverse=True)
+
+    def executa(saida: Saida) -> Tuple[Saida, float]:
+        inicio = time()
+        k = nivel(saida.plano.T) if prefiltro else 0
+        fonte, fundo = entradas.entrada(k, saida.cor)
+
+        P = adapta(saida.plano, k)
+        if saida.compacto is not None:
+            ind = compactas(P, fonte.shape[:2], saida.janela, saida.tolerancia, bits=saida.compacto)
+        else:
+            ind = indices(P, saida.janela, saida.tolerancia)
+
+        if saida.adaptativo is not None:
+            res = adaptativo(fonte, ind, fundo, saida.metodo, saida.adaptativo, simples=saida.simples)
+        else:
+            res = saida.metodo(fonte, ind, fundo)
+        escritor.escreve(res, saida.caminho)
+
+        tempo = time() - inicio
+        logging.info(f'{saida.caminho}: {saida.plano.dim} por {saida.metodo} com entrada {fonte.shape} em {tempo:.3f} segundos')
+        return saida, tempo
+
+    with ThreadPoolExecutor(trabalhadores) as executor:
+        return list(executor.map(executa, ordem))
@@ -0,0 +1,181 @@
+"""
+Geração de pirâmides de ladrilhos no formato Deep Zoom
+(DZI) direto da imagem de entrada.
+"""
+import os
+import math
+import shutil
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple, Optional, Iterator, Any
+import numpy as np
+from .tipos import Imagem, Color
+from .interp import Metodo
+from .plano import Plano, Janela, indices, reduzido
+from .inout import imgwrite
+
+
+DZI = '''<?xml version="1.0" encoding="UTF-8"?>
+<Image xmlns="http://schemas.microsoft.com/deepzoom/2008"
+  Format="{formato}" Overlap="0" TileSize="{ladrilho}">
+  <Size Width="{largura}" Height="{altura}"/>
+</Image>
+'''
+
+
+def niveis(dim: Tuple[int, int]) -> int:
+    """
+    Índice do nível de resolução completa, com o nível
+    zero tendo um único pixel.
+    """
+    return math.ceil(math.log2(max(dim)))
+
+
+def nivel(P: Plano, n: int) -> Plano:
+    """
+    Plano para o nível `n` da pirâmide, reduzindo a
+    saída pela metade a cada nível abaixo do máximo.
+    """
+    return reduzido(P, 2.0 ** (n - niveis(P.dim)))
+
+
+def limpa(pasta: str) -> None:
+    """
+    Remove os ladrilhos de uma pirâmide anterior, para que
+    níveis e ladrilhos que não existem mais na nova não
+    fiquem na pasta.
+
+    Erro
+    ----
+    ValueError
+        A pasta tem arquivos que não são da pirâmide.
+    """
+    if not os.path.isdir(pasta):
+        return
+    estranhos = [nome for nome in os.listdir(pasta)
+                 if not (nome == 'assinatura' or (nome.isdigit() and os.path.isdir(os.path.join(pasta, nome))))]
+    if estranhos:
+        raise ValueError(f'{pasta} existe e não é uma pirâmide: {", ".join(sorted(estranhos)[:3])}')
+    shutil.rmtree(pasta)
+
+
+def ladrilhos(dim: Tuple[int, int], ladrilho: int) -> Iterator[Tuple[int, int, Janela]]:
+    """
+    Coluna, linha e janela de cada ladrilho da saída.
+    """
+    H, W = dim
+    for lin, y in enumerate(range(0, H, ladrilho)):
+        for col, x in enumerate(range(0, W, ladrilho)):
+            yield col, lin, (y, x, ladrilho, ladrilho)
+
+
+# estado compartilhado com os processos de trabalho
+_ESTADO: Any = None
+
+def _inicia(img: Imagem, fundo: Color, metodo: Metodo) -> None:
+    global _ESTADO # pylint: disable=global-statement
+    _ESTADO = img, fundo, metodo
+
+def _renderiza(tarefa: Tuple[Plano, Janela, str]) -> str:
+    """
+    Renderiza e escreve um ladrilho a partir da entrada.
+    """
+    P, janela, caminho = tarefa
+    img, fundo, metodo = _ESTADO
+
+    res = metodo(img, indices(P, janela), fundo)
+    imgwrite(res, caminho)
+    return caminho
+
+
+def piramide(img: Imagem, P: Plano, metodo: Metodo, fundo: Color, destino: str, *,
+             ladrilho: int=256, formato: str='png', trabalhadores: Optional[int]=None,
+             origem: Optional[float]=None) -> Tuple[int, int]:
+    """
+    Gera a pirâmide Deep Zoom da imagem transformada.
+
+    Cada ladrilho de cada nível é interpolado direto da
+    entrada, com a escala do nível composta na operação.
+    Ladrilhos existentes e mais novos que a entrada são
+    mantidos se a transformação é a mesma. Caso contrário,
+    a pasta anterior é removida antes, com todos os seus
+    níveis.
+
+    Parâmetros
+    ----------
+    img: ndarray
+        Imagem de entrada.
+    P: Plano
+        Transformação da resolução completa.
+    metodo: Metodo
+        Método de interpolação.
+    fundo: ndarray
+        Cor de fundo.
+    destino: str
+        Caminho do arquivo `.dzi`. Os ladrilhos ficam
+        no diretório `<nome>_files` ao lado dele.
+    ladrilho: int, opcional
+        Lado dos ladrilhos. Padrão: 256.
+    formato: str, opcional
+        Extensão dos ladrilhos. Padrão: png.
+    trabalhadores: int, opcional
+        Número de processos. Padrão: número de CPUs.
+    origem: float, opcional
+        Data de modificação da entrada. Sem ela, todos
+        os ladrilhos são refeitos.
+
+    Retorno
+    -------
+    feitos: int
+        Quantidade de ladrilhos renderizados.
+    mantidos: int
+        Quantidade de ladrilhos mantidos.
+
+    Erro
+    ----
+    ValueError
+        A pasta dos ladrilhos existe com outros arquivos.
+    """
+    base, _ = os.path.splitext(destino)
+    pasta = base + '_files'
+    # mudanças na transformação invalidam tudo
+    assinatura = f'{np.array2string(P.T, precision=12)} {P.dim} {metodo} {fundo} {ladrilho} {formato}'
+    caminho = os.path.join(pasta, 'assinatura')
+    try:
+        with open(caminho) as arquivo:
+            valida = arquivo.read() == assinatura
+    except OSError:
+        valida = False
+    if not valida:
+        limpa(pasta)
+
+    tarefas, mantidos = [], 0
+    for n in range(niveis(P.dim) + 1):
+        Pn = nivel(P, n)
+        os.makedirs(os.path.join(pasta, str(n)), exist_ok=True)
+
+        for col, lin, janela in ladrilhos(Pn.dim, ladrilho):
+            arquivo = os.path.join(pasta, str(n), f'{col}_{lin}.{formato}')
+            try:
+                atual = valida and origem is not None and os.path.getmtime(arquivo) >= origem
+            except OSError:
+                atual = False
+
+            if atual:
+                mantidos += 1
+            else:
+                tarefas.append((Pn, janela, arquivo))
+
+    logging.info(f'pirâmide com {len(tarefas)} ladrilhos a fazer e {mantidos} mantidos')
+    if tarefas:
+        with ProcessPoolExecutor(trabalhadores, initializer=_inicia, initargs=(img, fundo, metodo)) as executor:
+            for feito in executor.map(_renderiza, tarefas, chunksize=8):
+                logging.debug(f'ladrilho {feito}')
+
+    with open(caminho, 'w') as arquivo:
+        arquivo.write(assinatura)
+    with open(destino, 'w') as arquivo:
+        H, W = P.dim
+        arquivo.write(DZI.format(formato=formato, ladrilho=ladrilho, largura=W, altura=H))
+
+    return len(tarefas), mantidos
@@ -0,0 +1,323 @@
+"""
+Plano completo da transformação: matriz final, com
+correções de origem e de pixel, e dimensões da saída.
+"""
+import math
+import logging
+import itertools
+from typing import Tuple, List, Optional, NamedTuple, Callable, Any
+import numpy as np
+from .tipos import OpLin, Indices, Imagem
+from .idx import Compactas, aplica, aproxima, indices as grade
+from .linop import inversa, identidade, translacao
+from . import linop
+from .opimg import (
+    limites, redimensionamento, arredondamento,
+    rotacao, rotacao_proj, escalonamento
+)
+
+
+# Retângulo `(y, x, altura, largura)` da saída
+Janela = Tuple[int, int, int, int]
+
+
+class Plano(NamedTuple):
+    """
+    Transformação pronta para ser aplicada.
+    """
+    # operação direta, da entrada para a saída,
+    # considerando o centro dos pixels
+    T: OpLin
+    # dimensões da saída
+    dim: Tuple[int, int]
+
+
+def plano(shape: Tuple[int, int], *, angulo: Optional[float]=None, beta: Optional[float]=None,
+          escala: Optional[float]=None, dim: Optional[Tuple[int, int]]=None) -> Plano:
+    """
+    Monta da matriz de transformação linear.
+
+    Parâmetros
+    ----------
+    shape: (int, int)
+        Dimensões da imagem de entrada.
+    angulo: float, opcional
+        Rotação no plano da imagem, em graus.
+    beta: float, opcional
+        Rotação em torno de Y, em graus.
+    escala: float, opcional
+        Escala de redimensionamento.
+    dim: (int, int), opcional
+        Dimensões fixas da saída.
+
+    Retorno
+    -------
+    plano: Plano
+        Operação corrigida e dimensões da saída.
+    """
+    T = identidade()
+    lim = limites(shape)
+
+    # rotação no plano da imagem
+    if angulo is not None:
+        R, lim = rotacao(angulo, lim)
+        T = R @ T
+    # rotação em torno de y com projeção
+    if beta is not None:
+        R, lim = rotacao_proj(beta, lim)
+        T = R @ T
+    # escalonamento
+    if escala is not None:
+        E, lim = escalonamento(escala, lim)
+        T = E @ T
+    # redimensionamento para saída fixa
+    if dim is not None:
+        E, lim = redimensionamento(lim, dim)
+        T = E @ T
+
+    # dimensões inteiras
+    A, saida = arredondamento(lim)
+    # translação para o centro do pixel e depois de
+    # volta pro canto superior esquerdo
+    T = translacao(-1/2) @ A @ T @ translacao(1/2)
+    return Plano(T, saida)
+
+
+def reduzido(P: Plano, fator: float) -> Plano:
+    """
+    Plano com a saída escalada por `fator`, composto
+    na operação considerando o centro dos pixels.
+
+    As dimensões são arredondadas para cima, então a
+    última linha e coluna podem ficar parciais.
+    """
+    H, W = (max(math.ceil(d * fator), 1) for d in P.dim)
+    E = translacao(-1/2) @ linop.escalonamento(fator) @ translacao(1/2)
+    return Plano(E @ P.T, (H, W))
+
+
+def recorte(janela: Janela, dim: Tuple[int, int]) -> Janela:
+    """
+    Limita a janela para as dimensões da saída, como
+    um recorte da imagem completa.
+
+    Erro
+    ----
+    ValueError
+        A janela não tem intersecção com a saída.
+    """
+    y, x, H, W = janela
+    y0, x0 = min(max(y, 0), dim[0]), min(max(x, 0), dim[1])
+    y1, x1 = min(max(y + H, 0), dim[0]), min(max(x + W, 0), dim[1])
+
+    if y1 <= y0 or x1 <= x0:
+        raise ValueError(f'janela {janela} fora da saída {dim}')
+    return y0, x0, y1 - y0, x1 - x0
+
+
+def indices(plano: Plano, janela: Optional[Janela]=None, tolerancia: Optional[float]=None) -> Indices:
+    """
+    Índices da entrada para cada pixel da saída, ou
+    só para os pixels de uma janela dela.
+
+    Parâmetros
+    ----------
+    plano: Plano
+        Transformação a ser aplicada.
+    janela: (int, int, int, int), opcional
+        Retângulo `(y, x, altura, largura)` da saída.
+    tolerancia: float, opcional
+        Erro máximo, em pixels, para aproximar a
+        operação por partes (`idx.aproxima`). Sem ela,
+        a operação é exata em todo pixel.
+
+    Retorno
+    -------
+    ind: ndarray
+        Índices transformados da janela.
+    """
+    if janela is None:
+        janela = (0, 0) + plano.dim
+    y, x, H, W = recorte(janela, plano.dim)
+    logging.debug(f'índices da janela {(y, x, H, W)} de {plano.dim}')
+
+    # índices da imagem de saída transformados
+    if tolerancia is not None:
+        return aproxima(inversa(plano.T), (H, W), (y, x), tol=tolerancia)
+    return aplica(inversa(plano.T), grade((H, W), (y, x)))
+
+
+def pontos(plano: Plano, coords: np.ndarray, *, saida: bool=True) -> np.ndarray:
+    """
+    Índices da entrada para uma lista de pontos, no
+    lugar da grade da saída, para interpolar só esses
+    pontos.
+
+    Parâmetros
+    ----------
+    plano: Plano
+        Transformação a ser aplicada.
+    coords: ndarray
+        Matriz `(N, 2)` com as coordenadas `(x, y)` de
+        cada ponto, em pixels.
+    saida: bool, opcional
+        Se os pontos estão na saída e são levados para
+        a entrada pela inversa, ou se já estão na
+        entrada. Padrão: na saída.
+
+    Retorno
+    -------
+    ind: ndarray
+        Matriz `(3, N)` das coordenadas homogêneas na
+        entrada, aceita pelos métodos de interpolação.
+
+    Erro
+    ----
+    ValueError
+        Pontos fora do formato `(N, 2)`.
+    """
+    coords = np.asarray(coords, dtype=float)
+    if coords.ndim != 2 or coords.shape[1] != 2:
+        raise ValueError(f'pontos devem ser matriz (N, 2), não {coords.shape}')
+
+    ind = np.ones((3, coords.shape[0]), dtype=float)
+    ind[:2] = coords.T
+    if not saida:
+        return ind
+    return aplica(inversa(plano.T), ind)
+
+
+# linhas calculadas por vez nas coordenadas compactas
+FAIXA = 64
+
+def compactas(plano: Plano, entrada: Tuple[int, int], janela: Optional[Janela]=None,
+              tolerancia: Optional[float]=None, *, bits: int=16) -> Compactas:
+    """
+    Coordenadas da entrada em ponto fixo para cada pixel
+    da janela, como em `indices`, mas calculadas em faixas
+    de linhas, sem a matriz completa em `float`.
+
+    Parâmetros
+    ----------
+    plano: Plano
+        Transformação a ser aplicada.
+    entrada: (int, int)
+        Dimensões da imagem de entrada.
+    janela: (int, int, int, int), opcional
+        Retângulo `(y, x, altura, largura)` da saída.
+    tolerancia: float, opcional
+        Erro máximo da aproximação por partes.
+    bits: int, opcional
+        Precisão da parte fracionária, de 1 a 16 bits.
+        Padrão: 16.
+
+    Retorno
+    -------
+    ind: Compactas
+        Coordenadas compactas da janela.
+    """
+    if janela is None:
+        janela = (0, 0) + plano.dim
+    y, x, H, W = recorte(janela, plano.dim)
+
+    ind = Compactas.vazia((H, W), entrada, bits)
+    for y0 in range(0, H, FAIXA):
+        faixa = indices(plano, (y + y0, x, min(FAIXA, H - y0), W), tolerancia)
+        ind.preenche(y0, faixa, entrada)
+    logging.debug(f'coordenadas compactas {ind.base.dtype}+{ind.fracao.dtype} com {ind.nbytes} bytes')
+    return ind
+
+
+def morton(ny: int, nx: int) -> List[Tuple[int, int]]:
+    """
+    Posições `(ty, tx)` de uma grade `ny x nx` na ordem
+    de Morton, em que ladrilhos próximos na ordem também
+    são próximos na imagem, nos dois eixos.
+    """
+    bits = max(ny, nx).bit_length()
+    def chave(pos: Tuple[int, int]) -> int:
+        ty, tx = pos
+        k = 0
+        for b in range(bits):
+            k |= ((tx >> b) & 1) << (2 * b) | ((ty >> b) & 1) << (2 * b + 1)
+        return k
+    return sorted(itertools.product(range(ny), range(nx)), key=chave)
+
+
+def ladrilhado(desenha: Callable[[Janela, Imagem], Any], dim: Tuple[int, int], canais: int, *,
+               janela: Optional[Janela]=None, faixa: Optional[int]=None, ladrilho: Optional[int]=None,
+               out: Optional[Imagem]=None, cancelado: Optional[Callable[[], bool]]=None) -> Optional[Imagem]:
+    """
+    Renderiza a janela da saída em faixas de `faixa`
+    linhas ou em ladrilhos de lado `ladrilho`, chamando
+    `desenha(bloco, destino)` para cada um. Sem nenhum
+    dos dois, a janela é feita de uma vez.
+
+    Os ladrilhos são percorridos na ordem de Morton e
+    cada um é desenhado em um buffer contíguo, copiado
+    depois para a saída, então a região da entrada lida
+    e os buffers intermediários de cada um ficam no
+    cache, mesmo em rotações.
+
+    Parâmetros
+    ----------
+    desenha: (janela, ndarray) -> Any
+        Renderiza o bloco `(y, x, altura, largura)`, em
+        coordenadas da saída completa, no destino dado.
+    dim: (int, int)
+        Dimensões da saída completa.
+    canais: int
+        Canais do resultado.
+    janela: (int, int, int, int), opcional
+        Retângulo `(y, x, altura, largura)` da saída.
+    faixa: int, opcional
+        Linhas de cada faixa.
+    ladrilho: int, opcional
+        Lado dos ladrilhos, no lugar das faixas.
+    out: ndarray, opcional
+        Matriz com o formato da janela para o resultado,
+        que pode ser mapeada em disco.
+    cancelado: () -> bool, opcional
+        Checado antes de cada bloco, para interromper a
+        renderização.
+
+    Retorno
+    -------
+    out: ndarray ou None
+        Imagem resultante, ou `None` se cancelada.
+
+    Erro
+    ----
+    ValueError
+        Janela fora da saída.
+    """
+    if janela is None:
+        janela = (0, 0) + tuple(dim)
+    Y, X, H, W = recorte(janela, dim)
+    if out is None:
+        out = np.empty((H, W, canais), dtype=np.uint8)
+
+    if ladrilho is not None:
+        blocos = [(ty * ladrilho, tx * ladrilho, ladrilho, ladrilho)
+                  for ty, tx in morton(math.ceil(H / ladrilho), math.ceil(W / ladrilho))]
+    else:
+        altura = H if faixa is None else faixa
+        blocos = [(y, 0, altura, W) for y in range(0, H, altura)]
+
+    # um só buffer para os ladrilhos, usado no início
+    # para os menores, das bordas
+    resto = out.shape[2:]
+    buf = np.empty(ladrilho * ladrilho * math.prod(resto), dtype=out.dtype) if ladrilho is not None else None
+    for y, x, h, w in blocos:
+        if cancelado is not None and cancelado():
+            return None
+        h, w = min(h, H - y), min(w, W - x)
+        destino = out[y:y+h, x:x+w]
+        if buf is None:
+            desenha((Y + y, X + x, h, w), destino)
+            continue
+
+        contiguo = buf[:h * w * math.prod(resto)].reshape((h, w) + resto)
+        desenha((Y + y, X + x, h, w), contiguo)
+        destino[...] = contiguo
+    return out
@@ -0,0 +1,86 @@
+"""
+Redução da entrada por médias de blocos, usada como
+pré-filtro para reduções grandes.
+"""
+import math
+import logging
+import threading
+from typing import Dict
+import numpy as np
+from .tipos import OpLin, Imagem
+from .plano import Plano
+
+
+def reduz(img: Imagem) -> Imagem:
+    """
+    Reduz a imagem pela metade com a média de blocos
+    2x2. Dimensões ímpares repetem a última linha ou
+    coluna.
+    """
+    H, W, _ = img.shape
+    if H % 2 or W % 2:
+        img = np.pad(img, ((0, H % 2), (0, W % 2), (0, 0)), mode='edge')
+
+    soma = img[0::2, 0::2].astype(np.uint16)
+    soma += img[1::2, 0::2]
+    soma += img[0::2, 1::2]
+    soma += img[1::2, 1::2]
+    # média arredondada
+    soma += 2
+    soma >>= 2
+    return soma.astype(np.uint8)
+
+
+def escala(T: OpLin) -> float:
+    """
+    Maior fator de escala da parte linear da operação,
+    ou infinito para operações projetivas, que não tem
+    escala uniforme.
+    """
+    if T[2, 0] != 0 or T[2, 1] != 0:
+        return math.inf
+    return float(np.linalg.svd(T[:2, :2], compute_uv=False)[0])
+
+
+def nivel(T: OpLin) -> int:
+    """
+    Número de reduções pela metade da entrada que ainda
+    mantém a transformação como uma redução.
+    """
+    s = escala(T)
+    if s > 1/2:
+        return 0
+    return int(math.floor(math.log2(1 / s)))
+
+
+def adapta(P: Plano, k: int) -> Plano:
+    """
+    Plano equivalente partindo da entrada reduzida `k`
+    vezes pela metade.
+    """
+    # centro do pixel reduzido na entrada original
+    f = 2 ** k
+    M = np.asarray([
+        [f, 0, (f - 1) / 2],
+        [0, f, (f - 1) / 2],
+        [0, 0,           1]
+    ], dtype=float)
+    return Plano(P.T @ M, P.dim)
+
+
+class Reducoes:
+    """
+    Versões reduzidas da entrada, calculadas sob demanda
+    a partir da anterior e compartilhadas entre threads.
+    """
+    def __init__(self, img: Imagem) -> None:
+        self.niveis: Dict[int, Imagem] = {0: img}
+        self.trava = threading.Lock()
+
+    def __getitem__(self, k: int) -> Imagem:
+        with self.trava:
+            for n in range(1, k + 1):
+                if n not in self.niveis:
+                    self.niveis[n] = reduz(self.niveis[n - 1])
+                    logging.debug(f'entrada reduzida {n} vezes: {self.niveis[n].shape}')
+            return self.niveis[k]
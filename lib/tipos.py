@@ -19,11 +19,12 @@ else:
 
 class Color(ndarray): # type: ignore # pylint: disable=function-redefined
     """
-    Vetor representando uma cor BGRA.
+    Vetor representando uma cor com os mesmos canais
+    da imagem (cinza, BGR ou BGRA).
     """
     dtype: Type[uint8] = uint8
     ndim: Literal[1] = 1
-    shape: Tuple[Literal[4]] = (4,)
+    shape: Tuple[Literal[1, 3, 4]]
 
 
 class OpLin(ndarray): # type: ignore # pylint: disable=function-redefined
@@ -62,8 +63,8 @@ class Imagem(ndarray): # type: ignore # pylint: disable=function-redefined
     """
     dtype: Type[uint8] = uint8
     ndim: Literal[3] = 3
-    # BGRA
-    shape: Tuple[int, int, Literal[4]]
+    # cinza, BGR ou BGRA
+    shape: Tuple[int, int, Literal[1, 3, 4]]
 
     def copy(self) -> Imagem:
         ...
@@ -0,0 +1,127 @@
+"""
+Varredura de parâmetros: muitas transformações da mesma
+entrada, renderizadas em paralelo.
+"""
+import os
+import logging
+from itertools import product
+from time import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple, Optional, Sequence, Any
+import numpy as np
+from .tipos import Imagem, Color
+from .interp import Metodo
+from .plano import Plano, plano, indices
+from .inout import imgwrite
+
+
+def combinacoes(angulos: Sequence[Optional[float]], betas: Sequence[Optional[float]],
+                escalas: Sequence[Optional[float]]) -> List[Dict[str, Optional[float]]]:
+    """
+    Todas as combinações dos parâmetros, com o ângulo
+    variando mais rápido.
+    """
+    return [dict(angulo=angulo, beta=beta, escala=escala)
+            for escala, beta, angulo in product(escalas, betas, angulos)]
+
+
+def numerado(caminho: str, n: int, total: int) -> str:
+    """
+    Caminho da `n`-ésima saída, com o número antes da
+    extensão e zeros à esquerda.
+    """
+    base, ext = os.path.splitext(caminho)
+    return f'{base}_{n:0{len(str(total - 1))}d}{ext}'
+
+
+# estado compartilhado com os processos de trabalho
+_ESTADO: Any = None
+
+def _inicia(img: Imagem, fundo: Color, metodo: Metodo, pilha: Optional[str]) -> None:
+    global _ESTADO # pylint: disable=global-statement
+    # cada processo abre a pilha mapeada uma única vez
+    if pilha is not None:
+        pilha = np.load(pilha, mmap_mode='r+')
+    _ESTADO = img, fundo, metodo, pilha
+
+def _renderiza(tarefa: Tuple[int, Plano, str]) -> int:
+    """
+    Renderiza uma transformação e escreve o resultado
+    no arquivo numerado ou na posição dela na pilha.
+    """
+    n, P, caminho = tarefa
+    img, fundo, metodo, pilha = _ESTADO
+
+    if pilha is None:
+        imgwrite(metodo(img, indices(P), fundo), caminho)
+    else:
+        metodo(img, indices(P), fundo, out=pilha[n])
+        pilha.flush()
+    return n
+
+
+def varredura(img: Imagem, params: List[Dict[str, Optional[float]]], metodo: Metodo,
+              fundo: Color, saida: str, *, dim: Optional[Tuple[int, int]]=None,
+              trabalhadores: Optional[int]=None) -> float:
+    """
+    Renderiza a entrada com cada combinação de parâmetros.
+
+    Os planos são todos montados antes, no processo
+    principal, e as renderizações são divididas entre
+    processos que recebem a entrada uma única vez.
+
+    Parâmetros
+    ----------
+    img: ndarray
+        Imagem de entrada, já com os canais do fundo.
+    params: [dict]
+        Parâmetros de `plano` de cada saída.
+    metodo: Metodo
+        Método de interpolação.
+    fundo: ndarray
+        Cor de fundo.
+    saida: str
+        Caminho base das saídas numeradas, ou arquivo
+        `.npy` com todas as saídas empilhadas.
+    dim: (int, int), opcional
+        Dimensões fixas das saídas.
+    trabalhadores: int, opcional
+        Número de processos. Padrão: número de CPUs.
+
+    Retorno
+    -------
+    vazao: float
+        Imagens por segundo, incluindo a escrita.
+
+    Erro
+    ----
+    ValueError
+        Saída padrão como destino, ou saídas de dimensões
+        diferentes empilhadas em `.npy`.
+    """
+    if saida == '-':
+        raise ValueError('varredura não escreve na saída padrão, só em arquivos numerados ou .npy')
+    inicio = time()
+    planos = [plano(img.shape[:2], dim=dim, **p) for p in params]
+    logging.info(f'{len(planos)} planos em {time() - inicio:.4f} segundos')
+
+    pilha = None
+    if saida.lower().endswith('.npy'):
+        formas = {P.dim for P in planos}
+        if len(formas) > 1:
+            raise ValueError(f'saídas com dimensões diferentes não podem ser empilhadas: {sorted(formas)}')
+        shape = (len(planos),) + planos[0].dim + img.shape[2:]
+        # só cria o arquivo, que é preenchido pelos processos
+        vazia = np.lib.format.open_memmap(saida, mode='w+', dtype=np.uint8, shape=shape)
+        del vazia
+        pilha = saida
+
+    tarefas = [(n, P, numerado(saida, n, len(planos))) for n, P in enumerate(planos)]
+    with ProcessPoolExecutor(trabalhadores, initializer=_inicia, initargs=(img, fundo, metodo, pilha)) as executor:
+        for n in executor.map(_renderiza, tarefas, chunksize=max(len(tarefas) // 64, 1)):
+            logging.debug(f'saída {n}: {params[n]}')
+
+    tempo = time() - inicio
+    vazao = len(planos) / tempo
+    logging.info(f'{len(planos)} imagens em {tempo:.3f} segundos ({vazao:.1f} imagens/s)')
+    return vazao
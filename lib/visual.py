@@ -0,0 +1,176 @@
+"""
+Visualização interativa das transformações, renderizando
+só na resolução da janela.
+"""
+import logging
+import threading
+from time import time
+from typing import Tuple, Optional, Callable, Dict, Any
+import cv2
+from .tipos import Imagem, Color
+from .interp import Metodo
+from .plano import Plano, Janela, plano, reduzido, indices, ladrilhado
+
+
+# limites das barras de controle
+BETA_MAX = 89
+ESCALA_MAX = 400 # em porcentagem
+
+
+def plano_tela(shape: Tuple[int, int], tela: Tuple[int, int], **params: Any) -> Plano:
+    """
+    Plano da transformação reduzido para caber na tela,
+    sem nunca aumentar a saída.
+
+    Parâmetros
+    ----------
+    shape: (int, int)
+        Dimensões da imagem de entrada.
+    tela: (int, int)
+        Dimensões máximas de exibição.
+    params:
+        Parâmetros da transformação, como em `plano`.
+    """
+    P = plano(shape, **params)
+    fator = min(1.0, tela[0] / P.dim[0], tela[1] / P.dim[1])
+    if fator < 1:
+        P = reduzido(P, fator)
+    return P
+
+
+def renderiza(img: Imagem, P: Plano, metodo: Metodo, fundo: Color,
+              cancelado: Callable[[], bool], *, faixa: int=64) -> Optional[Imagem]:
+    """
+    Renderiza o plano em faixas horizontais, checando
+    entre elas se o resultado ainda é necessário.
+
+    Retorno
+    -------
+    out: ndarray ou None
+        Imagem resultante, ou `None` se cancelada.
+    """
+    def desenha(jan: Janela, destino: Imagem) -> None:
+        metodo(img, indices(P, jan), fundo, out=destino)
+
+    return ladrilhado(desenha, P.dim, img.shape[2], faixa=faixa, cancelado=cancelado)
+
+
+class Visualizador:
+    """
+    Janela do OpenCV com barras de controle para os
+    parâmetros da transformação.
+
+    Cada mudança gera uma prévia rápida por vizinho mais
+    próximo e depois o resultado refinado com o método
+    escolhido, ambos em uma thread separada. Renderizações
+    desatualizadas são canceladas entre faixas.
+    """
+    def __init__(self, img: Imagem, fundo: Color, *, nome: str='', tela: Tuple[int, int]=(720, 1280),
+                 angulo: Optional[float]=None, beta: Optional[float]=None,
+                 escala: Optional[float]=None, metodo: Metodo=Metodo.BILINEAR) -> None:
+        self.img, self.fundo = img, fundo
+        self.nome, self.tela = nome, tela
+        self.inicial = dict(angulo=angulo or 0, beta=beta or 0, escala=escala or 1, metodo=metodo)
+
+        self.trava = threading.Condition()
+        # pedido de renderização mais recente
+        self.geracao = 0
+        self.pedido: Optional[Dict[str, Any]] = None
+        # último quadro pronto para exibição
+        self.quadro: Optional[Imagem] = None
+        self.fim = False
+
+    def parametros(self) -> Dict[str, Any]:
+        """
+        Valores atuais das barras de controle.
+        """
+        pos = lambda barra: cv2.getTrackbarPos(barra, self.nome)
+        # ângulos nulos não entram na transformação
+        return dict(
+            angulo=float(pos('angulo')) or None,
+            beta=float(pos('beta') - BETA_MAX) or None,
+            escala=max(pos('escala'), 1) / 100,
+            metodo=list(Metodo)[pos('metodo')],
+        )
+
+    def muda(self, _: int=0) -> None:
+        """
+        Agenda nova renderização com os parâmetros atuais.
+        """
+        with self.trava:
+            self.geracao += 1
+            self.pedido = self.parametros()
+            self.trava.notify()
+
+    def publica(self, quadro: Optional[Imagem], geracao: int) -> None:
+        """
+        Marca o quadro para exibição, se ainda for atual.
+        """
+        with self.trava:
+            if quadro is not None and geracao == self.geracao:
+                self.quadro = quadro
+
+    def trabalho(self) -> None:
+        """
+        Laço da thread de renderização.
+        """
+        while True:
+            with self.trava:
+                while self.pedido is None and not self.fim:
+                    self.trava.wait()
+                if self.fim:
+                    return
+                geracao, params, self.pedido = self.geracao, self.pedido, None
+
+            cancelado = lambda: self.geracao != geracao
+            metodo = params.pop('metodo')
+            P = plano_tela(self.img.shape[:2], self.tela, **params)
+
+            inicio = time()
+            previa = renderiza(self.img, P, Metodo.VIZINHO, self.fundo, cancelado)
+            self.publica(previa, geracao)
+            logging.debug(f'prévia {P.dim} em {1000 * (time() - inicio):.1f} ms')
+
+            if metodo is not Metodo.VIZINHO and previa is not None:
+                inicio = time()
+                refinado = renderiza(self.img, P, metodo, self.fundo, cancelado)
+                self.publica(refinado, geracao)
+                logging.debug(f'{metodo} {P.dim} em {1000 * (time() - inicio):.1f} ms')
+
+    def executa(self, delay: int=10) -> None:
+        """
+        Abre a janela e trata os eventos até que ela seja
+        fechada ou alguma tecla seja apertada.
+        """
+        cv2.namedWindow(self.nome, cv2.WINDOW_AUTOSIZE)
+        inicial = self.inicial
+        cv2.createTrackbar('angulo', self.nome, int(inicial['angulo']) % 360, 359, self.muda)
+        cv2.createTrackbar('beta', self.nome, int(inicial['beta']) + BETA_MAX, 2 * BETA_MAX, self.muda)
+        cv2.createTrackbar('escala', self.nome, int(100 * inicial['escala']), ESCALA_MAX, self.muda)
+        cv2.createTrackbar('metodo', self.nome, list(Metodo).index(inicial['metodo']), len(Metodo) - 1, self.muda)
+
+        thread = threading.Thread(target=self.trabalho, daemon=True)
+        thread.start()
+        self.muda()
+        try:
+            while cv2.waitKey(delay) < 0:
+                with self.trava:
+                    quadro, self.quadro = self.quadro, None
+                if quadro is not None:
+                    cv2.imshow(self.nome, quadro)
+
+                # problemas com versões diferentes de python e opencv
+                prop1 = cv2.getWindowProperty(self.nome, cv2.WND_PROP_ASPECT_RATIO)
+                prop2 = cv2.getWindowProperty(self.nome, cv2.WND_PROP_VISIBLE)
+                if prop1 == prop2:
+                    break
+        # Ctrl-C não são erros aqui
+        except KeyboardInterrupt:
+            pass
+        finally:
+            with self.trava:
+                self.fim = True
+                self.geracao += 1
+                self.trava.notify()
+            cv2.destroyAllWindows()
+            cv2.waitKey(1)
@@ -0,0 +1,43 @@
+"""
+Entradas comuns dos testes: imagens pequenas do
+repositório e a renderização de referência, pelo
+caminho direto de `indices`.
+"""
+import os
+import sys
+import pytest
+import numpy as np
+import cv2
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from lib.tipos import Imagem
+from lib.interp import Metodo
+from lib.plano import Plano, indices
+
+
+def carrega(nome: str) -> Imagem:
+    """
+    Imagem BGR de `imagens/`.
+    """
+    img = cv2.imread(os.path.join(RAIZ, 'imagens', nome), cv2.IMREAD_COLOR)
+    assert img is not None, nome
+    return img
+
+
+def referencia(img: Imagem, P: Plano, metodo: Metodo) -> Imagem:
+    """
+    Renderização exata, com fundo preto.
+    """
+    return metodo(img, indices(P), np.zeros(img.shape[2], dtype=np.uint8))
+
+
+@pytest.fixture(scope='session')
+def casa() -> Imagem:
+    return carrega('house64.png')
+
+
+@pytest.fixture(scope='session')
+def babuino() -> Imagem:
+    return carrega('baboon128.png')
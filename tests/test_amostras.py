@@ -0,0 +1,33 @@
+"""
+Amostragem da imagem transformada em pontos esparsos
+(`api.amostras`).
+"""
+import numpy as np
+import pytest
+from lib import api
+from lib.interp import Metodo
+
+
+@pytest.mark.parametrize('metodo', list(Metodo))
+def test_pontos_inteiros_iguais_aos_pixels(babuino, metodo):
+    parametros = dict(angulo=30, beta=10, escala=1.5, metodo=metodo)
+    ref = api.transforma(babuino, **parametros)
+
+    rng = np.random.default_rng(0)
+    H, W, _ = ref.shape
+    xs, ys = rng.integers(0, W, 200), rng.integers(0, H, 200)
+    res = api.amostras(babuino, np.stack([xs, ys], axis=1), **parametros)
+    assert np.array_equal(res, ref[ys, xs])
+
+
+def test_pontos_na_entrada(casa):
+    # Lagrange interpola, então reproduz os pixels
+    coords = np.asarray([[0, 0], [5, 7], [63, 63]])
+    res = api.amostras(casa, coords, saida=False, metodo=Metodo.LAGRANGE,
+                       cor=np.asarray([0, 0, 0, 255], dtype=np.uint8))
+    assert np.array_equal(res, casa[coords[:, 1], coords[:, 0]])
+
+
+def test_formato_invalido(casa):
+    with pytest.raises(ValueError):
+        api.amostras(casa, np.zeros((4, 3)))
@@ -0,0 +1,43 @@
+"""
+Coordenadas compactas em ponto fixo (`--compacto`).
+"""
+import numpy as np
+import pytest
+from lib.interp import Metodo
+from lib.plano import plano, indices, compactas
+from conftest import referencia
+
+
+@pytest.mark.parametrize('metodo', [Metodo.BILINEAR, Metodo.BICUBICA, Metodo.LAGRANGE])
+def test_um_nivel_da_referencia(babuino, metodo):
+    P = plano(babuino.shape[:2], angulo=33, escala=1.7)
+    ind = compactas(P, babuino.shape[:2], bits=16)
+    res = metodo(babuino, ind, np.zeros(3, dtype=np.uint8))
+
+    ref = referencia(babuino, P, metodo)
+    assert res.shape == ref.shape
+    assert np.abs(res.astype(int) - ref).max() <= 1
+
+
+def test_vizinho_quase_igual(babuino):
+    P = plano(babuino.shape[:2], angulo=33, escala=1.7)
+    ind = compactas(P, babuino.shape[:2], bits=16)
+    res = Metodo.VIZINHO(babuino, ind, np.zeros(3, dtype=np.uint8))
+
+    ref = referencia(babuino, P, Metodo.VIZINHO)
+    # só frações logo acima de 0.5 mudam de pixel
+    assert np.mean(np.any(res != ref, axis=-1)) < 1e-3
+
+
+def test_parte_inteira_exata(casa):
+    P = plano(casa.shape[:2], angulo=22, beta=20, escala=1.5)
+    ind = compactas(P, casa.shape[:2], bits=8)
+    exatos = indices(P)
+
+    inteiros = np.floor(exatos[:2])
+    dentro = (inteiros[0] >= 0) & (inteiros[0] < casa.shape[1]) & (inteiros[1] >= 0) & (inteiros[1] < casa.shape[0])
+    assert np.array_equal(ind.base[:, dentro], inteiros[:, dentro])
+    # fração truncada, nunca acima da exata
+    frac = ind.fracao / (1 << ind.bits)
+    erro = (exatos[:2] - inteiros)[:, dentro] - frac[:, dentro]
+    assert erro.min() >= 0 and erro.max() < 2.0 ** -ind.bits
@@ -0,0 +1,49 @@
+"""
+Renderização incremental de entradas editadas
+(`--incremental`).
+"""
+import numpy as np
+import pytest
+from lib.interp import Metodo
+from lib.plano import plano
+from lib.incremental import incremental
+from conftest import referencia
+
+
+@pytest.mark.parametrize('metodo', [Metodo.VIZINHO, Metodo.BILINEAR, Metodo.LAGRANGE])
+def test_edicao_igual_a_referencia(babuino, metodo, tmp_path):
+    estado = str(tmp_path / 'estado.npz')
+    fundo = np.zeros(3, dtype=np.uint8)
+    P = plano(babuino.shape[:2], angulo=30, escala=1.5)
+
+    out, refeitos = incremental(babuino, P, metodo, fundo, estado)
+    assert np.array_equal(out, referencia(babuino, P, metodo))
+    assert refeitos == out.shape[0] * out.shape[1]
+
+    editada = babuino.copy()
+    editada[40:50, 60:70] = 255 - editada[40:50, 60:70]
+    out, refeitos = incremental(editada, P, metodo, fundo, estado)
+    assert np.array_equal(out, referencia(editada, P, metodo))
+    assert 0 < refeitos < out.shape[0] * out.shape[1] // 4
+
+
+def test_outra_transformacao_refaz_tudo(casa, tmp_path):
+    estado = str(tmp_path / 'estado.npz')
+    fundo = np.zeros(3, dtype=np.uint8)
+    incremental(casa, plano(casa.shape[:2], angulo=10), Metodo.BILINEAR, fundo, estado)
+
+    P = plano(casa.shape[:2], angulo=20)
+    out, refeitos = incremental(casa, P, Metodo.BILINEAR, fundo, estado)
+    assert np.array_equal(out, referencia(casa, P, Metodo.BILINEAR))
+    assert refeitos == out.shape[0] * out.shape[1]
+
+
+def test_sem_mudanca_nada_refeito(casa, tmp_path):
+    estado = str(tmp_path / 'estado.npz')
+    fundo = np.zeros(3, dtype=np.uint8)
+    P = plano(casa.shape[:2], angulo=10)
+    incremental(casa, P, Metodo.BICUBICA, fundo, estado)
+
+    out, refeitos = incremental(casa, P, Metodo.BICUBICA, fundo, estado)
+    assert refeitos == 0
+    assert np.array_equal(out, referencia(casa, P, Metodo.BICUBICA))
@@ -0,0 +1,49 @@
+"""
+Renderização em faixas e em ladrilhos na ordem de
+Morton.
+"""
+import itertools
+import numpy as np
+import pytest
+from lib.interp import Metodo
+from lib.plano import plano, indices, morton, ladrilhado
+from lib.ajuste import interpolacao
+from lib.mapa import remapeia
+from conftest import referencia
+
+
+def test_morton_permutacao():
+    ordem = morton(3, 5)
+    assert sorted(ordem) == list(itertools.product(range(3), range(5)))
+    # os quatro primeiros formam o primeiro bloco 2x2
+    assert set(ordem[:4]) == {(0, 0), (0, 1), (1, 0), (1, 1)}
+
+
+@pytest.mark.parametrize('faixa, ladrilho', [(None, 64), (None, 37), (16, None), (None, None)])
+@pytest.mark.parametrize('metodo', [Metodo.VIZINHO, Metodo.BICUBICA])
+def test_igual_a_referencia(babuino, metodo, faixa, ladrilho):
+    P = plano(babuino.shape[:2], angulo=30, escala=1.5)
+    fundo = np.zeros(3, dtype=np.uint8)
+    res = interpolacao(babuino, P, metodo, fundo, faixa=faixa, ladrilho=ladrilho)
+    assert np.array_equal(res, referencia(babuino, P, metodo))
+
+    janela = (10, 20, 100, 90)
+    res = interpolacao(babuino, P, metodo, fundo, faixa=faixa, ladrilho=ladrilho, janela=janela)
+    assert np.array_equal(res, referencia(babuino, P, metodo)[10:110, 20:110])
+
+
+def test_mapa_igual_a_referencia(casa):
+    P = plano(casa.shape[:2], angulo=22, beta=20, escala=1.5)
+    mapa = indices(P)[:2].astype(np.float64)
+    res = remapeia(casa, mapa, Metodo.LAGRANGE, np.zeros(3, dtype=np.uint8), faixa=7)
+    assert np.array_equal(res, referencia(casa, P, Metodo.LAGRANGE))
+
+
+def test_cancelado():
+    chamadas = []
+    def desenha(janela, destino):
+        chamadas.append(janela)
+        destino[...] = 0
+
+    assert ladrilhado(desenha, (100, 100), 3, ladrilho=32, cancelado=lambda: len(chamadas) >= 2) is None
+    assert len(chamadas) == 2
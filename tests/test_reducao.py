@@ -0,0 +1,58 @@
+"""
+Decodificação reduzida e pré-filtro de reduções grandes
+(`--prefiltro`).
+"""
+import numpy as np
+import cv2
+from lib import api
+from lib.interp import Metodo
+from lib.inout import decode
+from lib.plano import plano, indices
+from lib.reducao import reduz, adapta, nivel
+from conftest import referencia
+
+
+# fundo opaco, sem canal alfa na saída
+PRETO = np.asarray([0, 0, 0, 255], dtype=np.uint8)
+
+
+def psnr(img: np.ndarray, ref: np.ndarray) -> float:
+    mse = np.mean(np.square(img.astype(float) - ref))
+    return 10 * np.log10(255**2 / mse)
+
+
+def test_plano_adaptado_da_forma_original(casa):
+    # a metade exata da entrada vira identidade na reduzida
+    P = plano(casa.shape[:2], escala=0.5)
+    A = adapta(P, nivel(P.T))
+    reduzida = reduz(casa)
+
+    assert A.dim == reduzida.shape[:2]
+    assert np.allclose(A.T, np.eye(3))
+    assert np.array_equal(Metodo.BILINEAR(reduzida, indices(A), np.zeros(3, dtype=np.uint8)), reduzida)
+
+
+def test_decodificacao_reduzida(babuino):
+    png = cv2.imencode('.png', babuino)[1].tobytes()
+    assert np.array_equal(decode(png, 2), reduz(reduz(babuino)))
+
+    jpeg = cv2.imencode('.jpg', babuino)[1].tobytes()
+    H, W, _ = babuino.shape
+    assert decode(jpeg, 1).shape == (H // 2, W // 2, 3)
+
+
+def test_sem_prefiltro_exato(babuino):
+    P = plano(babuino.shape[:2], escala=0.2)
+    res = api.transforma(babuino, escala=0.2, cor=PRETO)
+    assert np.array_equal(res, referencia(babuino, P, Metodo.BILINEAR))
+
+
+def test_prefiltro_proximo_da_media(babuino):
+    exato = api.transforma(babuino, escala=0.2, cor=PRETO)
+    filtrado = api.transforma(babuino, escala=0.2, cor=PRETO, prefiltro=True)
+    assert filtrado.shape == exato.shape
+
+    # a média por área é a referência sem aliasing
+    H, W, _ = exato.shape
+    area = cv2.resize(babuino, (W, H), interpolation=cv2.INTER_AREA)
+    assert psnr(filtrado, area) > psnr(exato, area)
@@ -0,0 +1,34 @@
+"""
+Aproximação afim por partes das coordenadas projetivas
+(`--tolerancia`).
+"""
+import numpy as np
+import pytest
+from lib.interp import Metodo
+from lib.plano import plano, indices
+from conftest import referencia
+
+
+@pytest.mark.parametrize('tolerancia', [0.01, 0.1, 0.5])
+def test_erro_dentro_da_tolerancia(casa, tolerancia):
+    P = plano(casa.shape[:2], angulo=22, beta=20, escala=1.5)
+    exatos = indices(P)
+    aprox = indices(P, tolerancia=tolerancia)
+
+    assert aprox.shape == exatos.shape
+    assert np.abs(aprox[:2] - exatos[:2]).max() <= tolerancia
+
+
+def test_afim_sem_erro(casa):
+    P = plano(casa.shape[:2], angulo=30, escala=2)
+    assert np.allclose(indices(P, tolerancia=0.5), indices(P), atol=1e-9)
+
+
+def test_renderizacao_proxima(casa):
+    P = plano(casa.shape[:2], angulo=22, beta=20, escala=1.5)
+    res = Metodo.BILINEAR(casa, indices(P, tolerancia=0.01), np.zeros(3, dtype=np.uint8))
+
+    ref = referencia(casa, P, Metodo.BILINEAR)
+    diferenca = np.abs(res.astype(int) - ref)
+    # as bordas da imagem podem trocar com o fundo
+    assert np.mean(diferenca > 2) < 0.01
@@ -0,0 +1,28 @@
+"""
+Trabalhador da renderização distribuída (`transforma.py
+--distribuido`).
+"""
+from lib.args import Argumentos, verbosidade, natural
+from lib.distribuido import serve
+
+
+DESCRICAO = 'Trabalhador da renderização distribuída.'
+# parser de argumentos
+parser = Argumentos(allow_abbrev=False, description=DESCRICAO)
+parser.add_argument('porta', metavar='PORTA', type=natural(min=0, max=65535),
+                    help='porta TCP de escuta')
+parser.add_argument('-e', '--endereco', default='127.0.0.1',
+                    help='endereço de escuta (padrão: só a máquina local; use 0.0.0.0 para'
+                         ' todas as interfaces, numa rede confiável)')
+parser.add_argument('-v', '--verboso', action='count', default=0,
+                    help='mostra detalhes da execução')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    verbosidade(args.verboso)
+    # Ctrl-C não são erros aqui
+    try:
+        serve((args.endereco, args.porta))
+    except KeyboardInterrupt:
+        pass
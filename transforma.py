@@ -1,25 +1,37 @@
 """
 Ferramenta de rotação e escalonamento de imagens.
 """
+import os
+import json
 import logging
-from sys import stdout
 from time import time
 from timeit import timeit
 from argparse import Namespace
-from typing import Tuple
+from typing import Tuple, Dict, Optional, Union, Any
+import numpy as np
 from lib.tipos import Imagem, Indices
+from lib.idx import Compactas
 from lib.args import (
-    Argumentos, MATH, verbosidade,
-    imagem, racional, natural, cor, metodo
+    Argumentos, MATH, verbosidade, transformacoes, combina,
+    entrada, racional, natural, intervalo, cor, metodo, saida
 )
-from lib.inout import imgshow, imgwrite, encode
+from lib.inout import imgshow, encode, decode, cabecalho, dimensoes, formato, grava, canais, necessarios, Escritor, ESTRATEGIAS, FILTROS
 from lib.interp import Metodo
-from lib.idx import indices, aplica
-from lib.linop import inversa, identidade, translacao
-from lib.opimg import (
-    limites, redimensionamento, arredondamento,
-    rotacao, rotacao_proj, escalonamento
-)
+from lib.plano import Plano, plano, indices, compactas, recorte
+from lib.adaptativo import adaptativo
+from lib.multiplo import Saida, multiplo
+from lib.piramide import piramide
+from lib.visual import Visualizador
+from lib.fonte import Fonte, renderiza
+from lib.reducao import nivel, adapta
+from lib.cache import Cache
+from lib.custo import calibracao, estimativa
+from lib.incremental import incremental
+from lib.ajuste import Perfil, carrega, aplica, interpolacao
+from lib.cisalhamento import cisalhamento
+from lib.mapa import carrega as mapeado, remapeia
+from lib.varredura import combinacoes, varredura
+from lib.distribuido import distribuido, locais
 
 
 DESCRICAO = 'Ferramenta de rotação e escalonamento de imagens.'
@@ -27,97 +39,516 @@ EPILOGO = 'Expressões matemáticas reconhecidas: ' + ', '.join(sorted(MATH.keys
 # parser de argumentos
 parser = Argumentos(allow_abbrev=False, add_help=False, description=DESCRICAO, epilog=EPILOGO)
 # modificações na imagem
-transf = parser.add_argument_group('Transformações')
-transf.add_argument('-a', '--angulo', metavar='ALFA', type=racional(),
-                    help='rotação no plano da imagem, em graus')
-transf.add_argument('-b', '--beta', type=racional(),
-                    help='rotação em torno de Y, em graus, projetado de volta para o plano XY')
-escala = transf.add_mutually_exclusive_group()
-escala.add_argument('-e', '--escala', type=racional(min=0),
-                    help='escala de redimensionamento')
-escala.add_argument('-d', '--dim', metavar=('ALTURA', 'LARGURA'), type=natural(min=0), nargs=2,
-                    help='dimensões da imagem resultante')
+transformacoes(parser.add_argument_group('Transformações'))
+# varredura de parâmetros
+varred = parser.add_argument_group('Varredura', 'Intervalos INICIO..FIM[:PASSO], com fim incluso, '
+                                   'renderizados em saídas numeradas ou empilhados em uma saída .npy')
+varred.add_argument('--angulos', metavar='INTERVALO', type=intervalo(),
+                    help='varia a rotação no plano da imagem')
+varred.add_argument('--betas', metavar='INTERVALO', type=intervalo(),
+                    help='varia a rotação em torno de Y')
+varred.add_argument('--escalas', metavar='INTERVALO', type=intervalo(min=0),
+                    help='varia a escala')
 # opções adicionais
 optadc = parser.add_argument_group('Opções adicionais')
 optadc.add_argument('-m', '--metodo', type=metodo, choices=Metodo, default='bilinear',
                     help='método de interpolação do resultado (padrão: bilinear)')
 optadc.add_argument('-c', '--cor', type=cor, default=cor('transparente'),
                     help='cor de fundo da imagem transformada (reconhece opções do Matplotlib)')
+optadc.add_argument('--adaptativo', metavar='LIMIAR', type=racional(min=0),
+                    help='usa o método só onde a variação local da entrada passa do limiar')
+optadc.add_argument('--simples', metavar='METODO', type=metodo, choices=Metodo, default='bilinear',
+                    help='método das regiões planas com --adaptativo (padrão: bilinear)')
+optadc.add_argument('--tolerancia', metavar='PIXELS', type=racional(min=0),
+                    help='aproxima a projeção por partes com esse erro máximo nas coordenadas')
+optadc.add_argument('--compacto', metavar='BITS', type=natural(min=1, max=16), nargs='?', const=16,
+                    help='coordenadas em ponto fixo, com BITS de parte fracionária (padrão: 16)')
+optadc.add_argument('--cisalhamento', action='store_true',
+                    help='rotação e escala afins em três cisalhamentos 1D, mais rápida nos métodos caros')
+optadc.add_argument('--mapa', metavar='NPY',
+                    help='mapa (2, H, W) de coordenadas X e Y da entrada, no lugar da transformação')
+optadc.add_argument('-j', '--janela', metavar=('Y', 'X', 'ALTURA', 'LARGURA'), type=natural(min=0), nargs=4,
+                    help='calcula só o retângulo dado da imagem resultante')
 optadc.add_argument('-h', '--help', action='help',
                     help='mostra esse texto de ajuda')
 optadc.add_argument('-v', '--verboso', action='count', default=0,
                     help='mostra detalhes da execução')
 # entrada e saída
 inpout = parser.add_argument_group('Entrada e saída')
-inpout.add_argument('imagem', metavar='IMAGEM', type=imagem, default='-',
+inpout.add_argument('imagem', metavar='IMAGEM', type=entrada, default='-',
                     help='imagem de entrada')
 inpout.add_argument('-o', '--output', dest='saida',
                     help='salva resultado em arquivo (padrão: exibe em nova janela)')
+inpout.add_argument('-s', '--saidas', metavar='ARQUIVO[:OPÇÕES]', type=saida, nargs='+',
+                    help='gera várias saídas da mesma entrada, com opções próprias de transformação')
+inpout.add_argument('--prefiltro', action='store_true',
+                    help='decodifica ou reduz a entrada antes de reduções grandes, com resultado aproximado')
+inpout.add_argument('-i', '--interativo', action='store_true',
+                    help='abre visualização com controles para os parâmetros')
+inpout.add_argument('--png-compressao', dest='compressao', metavar='NIVEL', type=natural(min=0, max=9),
+                    help='nível de compressão do PNG, de 0 a 9 (padrão do OpenCV)')
+inpout.add_argument('--png-estrategia', dest='estrategia', choices=ESTRATEGIAS,
+                    help='estratégia de compressão do zlib para PNG')
+inpout.add_argument('--png-filtro', dest='filtro', choices=FILTROS,
+                    help='filtros de linha do PNG')
+inpout.add_argument('--piramide', metavar='DZI',
+                    help='gera pirâmide de ladrilhos Deep Zoom no lugar da saída')
+inpout.add_argument('--ladrilho', type=natural(min=1), default=256,
+                    help='lado dos ladrilhos da pirâmide e da leitura de entradas .npy (padrão: 256)')
+inpout.add_argument('--distribuido', metavar='HOST:PORTA', nargs='+', default=[],
+                    help='renderiza em faixas nos trabalhadores dados (trabalhador.py)')
+inpout.add_argument('--locais', metavar='N', type=natural(min=1),
+                    help='inicia N trabalhadores locais para --distribuido')
+inpout.add_argument('--faixa', metavar='ALTURA', type=natural(min=1),
+                    help='altura das faixas distribuídas (padrão: quatro por trabalhador)')
+inpout.add_argument('--plano', action='store_true',
+                    help='só mostra as dimensões, a memória e o tempo previstos, sem renderizar')
+inpout.add_argument('--incremental', action='store_true',
+                    help='reaproveita a saída anterior, refazendo só os pixels que dependem de blocos alterados')
+inpout.add_argument('--cache', metavar='DIR',
+                    help='guarda e reaproveita resultados no diretório, pela entrada e transformação')
+inpout.add_argument('--cache-limite', metavar='MB', type=natural(min=1), default=1024,
+                    help='tamanho máximo do cache, removendo os resultados menos usados (padrão: 1024)')
+inpout.add_argument('--sem-perfil', dest='perfil', action='store_false',
+                    help='ignora o perfil de benchmark.py autoajuste desta máquina')
+inpout.add_argument('-t', '--trabalhadores', type=natural(min=1),
+                    help='número de processos paralelos (padrão: número de CPUs)')
 
 # # # # #
 # MAIN  #
 
-def transformacao(img: Imagem, args: Namespace) -> Indices:
-    """
-    Monta da matriz de transformação linear e aplica
-    para conseguir os índices transformados.
-    """
-    T = identidade()
-    lim = limites(img.shape[:2])
-
-    # rotação no plano da imagem
-    if args.angulo is not None:
-        R, lim = rotacao(args.angulo, lim)
-        T = R @ T
-    # rotação em torno de y com projeção
-    if args.beta is not None:
-        R, lim = rotacao_proj(args.beta, lim)
-        T = R @ T
-    # escalonamento
-    if args.escala is not None:
-        E, lim = escalonamento(args.escala, lim)
-        T = E @ T
-    # redimensionamento para saída fixa
-    if args.dim is not None:
-        E, lim = redimensionamento(lim, args.dim)
-        T = E @ T
-
-    # dimensões inteiras
-    A, dim = arredondamento(lim)
-    # translação para o centro do pixel e depois de
-    # volta pro canto superior esquerdo
-    T = translacao(-1/2) @ A @ T @ translacao(1/2)
+def planejamento(shape: Tuple[int, int], args: Namespace, reducao: int=0) -> Plano:
+    """
+    Monta da matriz de transformação linear a partir
+    dos argumentos, para uma entrada de dimensões
+    `shape` decodificada com `reducao` reduções.
+    """
+    P = plano(shape, angulo=args.angulo, beta=args.beta,
+              escala=args.escala, dim=args.dim)
+    return adapta(P, reducao)
+
+
+def unica(args: Namespace) -> bool:
+    """
+    Se é pedida só a saída comum, sem várias saídas,
+    varredura, visualização ou pirâmide.
+    """
+    return args.saidas is None and not args.interativo and args.piramide is None \
+        and not (args.angulos or args.betas or args.escalas)
+
+
+def modo(args: Namespace) -> str:
+    """
+    Caminho de renderização escolhido pelos argumentos,
+    na mesma ordem de prioridade do programa principal.
+    """
+    if args.saidas is not None:
+        return 'saidas'
+    if args.distribuido or args.locais:
+        return 'distribuido'
+    if args.incremental:
+        return 'incremental'
+    if args.angulos or args.betas or args.escalas:
+        return 'varredura'
+    if args.interativo:
+        return 'interativo'
+    if args.piramide is not None:
+        return 'piramide'
+    if args.mapa is not None:
+        return 'mapa'
+    if args.cisalhamento:
+        return 'cisalhamento'
+    return 'unica'
+
+
+# opções de coordenadas e seus nomes na linha de comando
+OPCOES = {'janela': '-j', 'compacto': '--compacto', 'adaptativo': '--adaptativo', 'tolerancia': '--tolerancia'}
+# descrição de cada caminho e as opções que ele não usa
+IGNORADAS = {
+    'distribuido': ('a renderização distribuída', ('compacto', 'adaptativo')),
+    'incremental': ('--incremental', ('compacto', 'adaptativo', 'tolerancia')),
+    'varredura': ('a varredura', ('janela', 'compacto', 'adaptativo', 'tolerancia')),
+    'interativo': ('-i', ('janela', 'compacto', 'adaptativo', 'tolerancia')),
+    'piramide': ('--piramide', ('janela', 'compacto', 'adaptativo', 'tolerancia')),
+    'mapa': ('--mapa', ('compacto', 'adaptativo', 'tolerancia')),
+    'cisalhamento': ('--cisalhamento', ('compacto', 'adaptativo', 'tolerancia')),
+}
+
+
+def reducoes(dados: bytes, args: Namespace) -> Tuple[Optional[Tuple[int, int]], int]:
+    """
+    Dimensões originais da entrada e reduções pela
+    metade possíveis na decodificação, só para a saída
+    única, que não precisa da resolução completa.
+    """
+    forma = dimensoes(dados)
+    if forma is None or not unica(args) or not args.prefiltro or args.mapa is not None:
+        return forma, 0
+    return forma, nivel(planejamento(forma, args).T)
+
+
+def identificador(dados: bytes, forma: Tuple[int, int], reducao: int, args: Namespace) -> str:
+    """
+    Chave no cache do resultado, com todas as opções
+    que alteram os bytes da saída.
+    """
+    adaptativo = args.adaptativo is not None
+    return Cache.chave(dados, planejamento(forma, args), metodo=str(args.metodo), cor=args.cor.tolist(),
+                       janela=args.janela, tolerancia=args.tolerancia, compacto=args.compacto,
+                       adaptativo=args.adaptativo, simples=str(args.simples) if adaptativo else None,
+                       cisalhamento=args.cisalhamento,
+                       reducao=reducao, formato=formato(args.saida).lower(), compressao=args.compressao,
+                       estrategia=args.estrategia, filtro=args.filtro)
+
+
+def reaproveitado(cache: Cache, chave: str, caminho: str) -> bool:
+    """
+    Escreve o resultado do cache, se houver.
+    """
+    buf = cache.busca(chave)
+    if buf is None:
+        return False
+    grava(buf, caminho)
+    logging.info(f'cache: {cache.relatorio()}')
+    return True
+
+
+def previsao(dados: Union[bytes, Imagem], args: Namespace, perfil: Perfil) -> Dict[str, Any]:
+    """
+    Custo previsto da saída única, só com o plano e as
+    dimensões da entrada, decodificando apenas quando o
+    cabeçalho não é reconhecido. As faixas ou ladrilhos
+    do perfil entram na memória prevista.
+    """
+    if isinstance(dados, bytes):
+        forma = cabecalho(dados)
+        _, reducao = reducoes(dados, args)
+        if forma is None:
+            forma = decode(dados).shape
+    else:
+        forma, reducao = dados.shape, 0
+    H, W, C = forma
+
+    # entrada decodificada, já reduzida
+    Hi, Wi = H, W
+    for _ in range(reducao):
+        Hi, Wi = -(-Hi // 2), -(-Wi // 2)
+    entrada = (Hi, Wi, necessarios(args.cor, C))
+
+    P = planejamento((H, W), args, reducao)
+    # mesma escolha da renderização em faixas ou ladrilhos
+    bloco = None
+    if (args.compacto, args.adaptativo, args.tolerancia) == (None, None, None):
+        if perfil.ladrilho is not None:
+            bloco = perfil.ladrilho ** 2
+        elif perfil.faixa is not None:
+            bloco = perfil.faixa * recorte(args.janela or (0, 0) + P.dim, P.dim)[3]
 
+    coef = calibracao()
+    if coef is None:
+        logging.warning('máquina sem calibração, tempo não previsto; calibre com python3 benchmark.py calibracao')
+    res = estimativa(P, entrada, args.metodo, coef, janela=args.janela, compacto=args.compacto,
+                     tolerancia=args.tolerancia, canais=C, bloco=bloco)
+    return dict(entrada=list(entrada), reducao=reducao, metodo=str(args.metodo), saida=list(res.saida),
+                bytes_entrada=res.entrada, bytes_indices=res.indices, memoria=res.memoria,
+                tempo=None if res.tempo is None else round(res.tempo, 6))
+
+
+def transformacao(img: Imagem, P: Plano, args: Namespace) -> Union[Indices, Compactas]:
+    """
+    Aplica a transformação planejada para conseguir os
+    índices transformados.
+    """
+    # coordenadas em ponto fixo, menores
+    if args.compacto is not None:
+        return compactas(P, img.shape[:2], args.janela, args.tolerancia, bits=args.compacto)
     # índices da imagem de saída transformados
-    return aplica(inversa(T), indices(dim))
+    return indices(P, args.janela, args.tolerancia)
 
 
 if __name__ == '__main__':
     args = parser.parse_intermixed_args()
     verbosidade(args.verboso)
+    if args.compacto is not None and args.adaptativo is not None:
+        parser.error('--compacto não funciona com --adaptativo')
+
+    # configuração ajustada para esta máquina
+    perfil = Perfil() if not args.perfil else carrega().get(args.metodo, Perfil())
+    try:
+        aplica(perfil)
+    except ValueError as err:
+        parser.error(f'perfil inválido: {err}')
+    if args.trabalhadores is None:
+        args.trabalhadores = perfil.trabalhadores
+    logging.info(f'perfil {perfil}')
+    if args.incremental and (args.saida in (None, '-') or not unica(args)):
+        parser.error('--incremental precisa de uma saída única em arquivo (-o)')
+    # opções que o caminho escolhido não usaria
+    rotulo, nomes = IGNORADAS.get(modo(args), ('', ()))
+    ignoradas = [OPCOES[nome] for nome in nomes if getattr(args, nome) is not None]
+    if ignoradas:
+        parser.error(f'{rotulo} não funciona com {", ".join(ignoradas)}')
+    if args.cisalhamento and (args.incremental or args.saidas is not None or args.distribuido or args.locais):
+        parser.error('--cisalhamento só funciona na saída única local, sem --incremental')
+
+    # mapa de coordenadas externo, lido em faixas
+    mapa = None
+    if args.mapa is not None:
+        transformacao_dada = (args.angulo, args.beta, args.escala, args.dim) != (None, None, None, None)
+        if transformacao_dada or not unica(args) or args.distribuido or args.locais or args.plano:
+            parser.error('--mapa substitui a transformação e só funciona na saída única local,'
+                         ' sem -a, -b, -e, -d ou --plano')
+        if args.cisalhamento or args.incremental:
+            parser.error('--mapa não funciona com --cisalhamento ou --incremental')
+        try:
+            mapa = mapeado(args.mapa)
+        except ValueError as err:
+            parser.error(f'argument --mapa: {err}')
 
     # argumentos da cli
-    img, arquivo = args.imagem
+    dados, arquivo = args.imagem
+    # só a previsão de custo, sem renderizar
+    if args.plano:
+        if not unica(args):
+            parser.error('--plano só estima a saída única')
+        if args.cisalhamento or args.distribuido or args.locais:
+            parser.error('--plano não estima --cisalhamento nem a renderização distribuída')
+        try:
+            print(json.dumps(previsao(dados, args, perfil), indent=2))
+        except ValueError as err:
+            parser.error(str(err))
+        raise SystemExit
+
+    # resultados anteriores, só da saída única em arquivo
+    cache, chave = None, None
+    if args.cache is not None and isinstance(dados, bytes) and args.saida is not None and unica(args) \
+            and not (args.distribuido or args.locais or args.incremental) and args.mapa is None:
+        try:
+            cache = Cache(args.cache, limite=args.cache_limite << 20)
+        except OSError as err:
+            parser.error(f'argument --cache: {err}')
+
+    # decodificação já reduzida, quando a saída é bem menor
+    if isinstance(dados, bytes):
+        forma, reducao = reducoes(dados, args)
+        # com as dimensões do cabeçalho, o resultado do
+        # cache dispensa até a decodificação
+        if cache is not None and forma is not None:
+            try:
+                chave = identificador(dados, forma, reducao, args)
+                if reaproveitado(cache, chave, args.saida):
+                    raise SystemExit
+            except ValueError as err:
+                parser.error(str(err))
+        try:
+            img = decode(dados, reducao)
+        except ValueError as err:
+            parser.error(f'argument IMAGEM: {err}')
+    else:
+        img, reducao = dados, 0
+    forma = img.shape[:2] if reducao == 0 else forma
     logging.info(f'imagem {arquivo} de dimensões {img.shape}')
 
+    if cache is not None and chave is None:
+        try:
+            chave = identificador(dados, forma, reducao, args)
+            if reaproveitado(cache, chave, args.saida):
+                raise SystemExit
+        except ValueError as err:
+            parser.error(str(err))
+
+    # várias saídas da mesma entrada
+    if args.saidas is not None:
+        especificacoes = [(args.saida, args)] if args.saida is not None else []
+        especificacoes += [(caminho, combina(args, opcoes)) for caminho, opcoes in args.saidas]
+        for caminho, opcoes in especificacoes:
+            if opcoes.compacto is not None and opcoes.adaptativo is not None:
+                parser.error(f'{caminho}: --compacto não funciona com --adaptativo')
+        try:
+            saidas = [Saida(caminho, planejamento(img.shape[:2], opcoes), opcoes.metodo, opcoes.cor,
+                            opcoes.janela, opcoes.tolerancia, opcoes.compacto, opcoes.adaptativo, opcoes.simples)
+                      for caminho, opcoes in especificacoes]
+        except ValueError as err:
+            parser.error(str(err))
+
+        inicio = time()
+        opcoes = dict(compressao=args.compressao, estrategia=args.estrategia, filtro=args.filtro)
+        try:
+            with Escritor(**opcoes) as escritor:
+                tempos = multiplo(img, saidas, escritor, trabalhadores=args.trabalhadores, prefiltro=args.prefiltro)
+        except ValueError as err:
+            parser.error(str(err))
+        logging.info(f'{len(tempos)} saídas em {time() - inicio} segundos'
+                     f' (soma das saídas: {sum(t for _, t in tempos)} segundos)')
+        raise SystemExit
+
+    # faixas da saída renderizadas em outros processos ou
+    # máquinas, cada uma com só a região da entrada que usa
+    if args.distribuido or args.locais:
+        if args.saida is None:
+            parser.error('renderização distribuída precisa de uma saída (-o)')
+        inicio = time()
+        enderecos, processos = locais(args.locais) if args.locais else ([], [])
+        try:
+            res = distribuido(Fonte(img), planejamento(forma, args, reducao), args.metodo, args.cor,
+                              args.distribuido + enderecos, janela=args.janela,
+                              altura=args.faixa, tolerancia=args.tolerancia)
+            with Escritor(compressao=args.compressao, estrategia=args.estrategia, filtro=args.filtro) as escritor:
+                escritor.escreve(res, args.saida)
+        except ValueError as err:
+            parser.error(str(err))
+        finally:
+            for processo in processos:
+                processo.terminate()
+        logging.info(f'renderização distribuída em {time() - inicio} segundos')
+        raise SystemExit
+
+    # entrada mapeada em disco, lida só na região que
+    # cada ladrilho da saída precisa, com coordenadas exatas
+    # ou aproximadas; as demais opções seguem pelo caminho
+    # comum, com a entrada lida por inteiro
+    if isinstance(img, np.memmap) and args.saida is not None and unica(args) \
+            and (args.compacto, args.adaptativo) == (None, None) and not args.incremental \
+            and not args.cisalhamento and mapa is None:
+        inicio = time()
+        try:
+            P = planejamento(img.shape[:2], args)
+            fonte = Fonte(img, bloco=args.ladrilho)
+            janela = args.janela or (0, 0) + P.dim
+            # saída em npy também fica só em disco
+            if args.saida.lower().endswith('.npy'):
+                _, _, H, W = recorte(janela, P.dim)
+                shape = (H, W, necessarios(args.cor, img.shape[2]))
+                out = np.lib.format.open_memmap(args.saida, mode='w+', dtype=np.uint8, shape=shape)
+                renderiza(fonte, P, args.metodo, args.cor, ladrilho=args.ladrilho,
+                          janela=janela, tolerancia=args.tolerancia, out=out).flush()
+            else:
+                res = renderiza(fonte, P, args.metodo, args.cor, ladrilho=args.ladrilho,
+                                janela=janela, tolerancia=args.tolerancia)
+                with Escritor(compressao=args.compressao, estrategia=args.estrategia, filtro=args.filtro) as escritor:
+                    escritor.escreve(res, args.saida)
+        except (ValueError, OSError) as err:
+            parser.error(str(err))
+        logging.info(f'renderização por ladrilhos em {time() - inicio} segundos')
+        raise SystemExit
+
+    # só adiciona canais se a cor de fundo precisar
+    img, fundo = canais(img, args.cor)
+
+    # só os pixels afetados pelas regiões alteradas da
+    # entrada, com o resultado anterior salvo ao lado da saída
+    if args.incremental:
+        inicio = time()
+        try:
+            res, refeitos = incremental(img, planejamento(forma, args, reducao), args.metodo, fundo,
+                                        args.saida + '.estado.npz', janela=args.janela)
+            with Escritor(compressao=args.compressao, estrategia=args.estrategia, filtro=args.filtro) as escritor:
+                escritor.escreve(res, args.saida)
+        except ValueError as err:
+            parser.error(str(err))
+        total = res.shape[0] * res.shape[1]
+        logging.info(f'{refeitos} de {total} pixels refeitos em {time() - inicio} segundos')
+        raise SystemExit
+
+    # varredura de parâmetros, em saídas separadas
+    if args.angulos or args.betas or args.escalas:
+        if args.saida in (None, '-'):
+            parser.error('varredura precisa de uma saída em arquivo (-o), não a saída padrão')
+        params = combinacoes(args.angulos or [args.angulo], args.betas or [args.beta], args.escalas or [args.escala])
+        try:
+            varredura(img, params, args.metodo, fundo, args.saida, dim=args.dim, trabalhadores=args.trabalhadores)
+        except ValueError as err:
+            parser.error(str(err))
+        raise SystemExit
+
+    # visualização interativa, na resolução da tela
+    if args.interativo:
+        Visualizador(img, fundo, nome=arquivo, angulo=args.angulo, beta=args.beta,
+                     escala=args.escala, metodo=args.metodo).executa()
+        raise SystemExit
+
+    # pirâmide de ladrilhos no lugar da saída
+    if args.piramide is not None:
+        inicio = time()
+        origem = os.path.getmtime(arquivo) if os.path.isfile(arquivo) else None
+        try:
+            feitos, mantidos = piramide(img, planejamento(img.shape[:2], args), args.metodo, fundo, args.piramide,
+                                        ladrilho=args.ladrilho, trabalhadores=args.trabalhadores, origem=origem)
+        except ValueError as err:
+            parser.error(str(err))
+        logging.info(f'{feitos} ladrilhos feitos e {mantidos} mantidos em {time() - inicio} segundos')
+        raise SystemExit
+
     inicio = time()
+    # coordenadas do mapa, com saída em npy também só em disco
+    if mapa is not None:
+        try:
+            if args.saida is not None and args.saida.lower().endswith('.npy'):
+                _, _, H, W = recorte(args.janela or (0, 0) + mapa.shape[1:], mapa.shape[1:])
+                out = np.lib.format.open_memmap(args.saida, mode='w+', dtype=np.uint8, shape=(H, W, img.shape[2]))
+                remapeia(img, mapa, args.metodo, fundo, janela=args.janela, out=out).flush()
+                logging.info(f'mapa {mapa.shape[1:]} em {time() - inicio} segundos')
+                raise SystemExit
+            img = remapeia(img, mapa, args.metodo, fundo, janela=args.janela)
+        except (ValueError, OSError) as err:
+            parser.error(str(err))
+        logging.info(f'mapa {mapa.shape[1:]} em {time() - inicio} segundos')
+
+    # transformação afim em três passadas 1D
+    elif args.cisalhamento:
+        try:
+            img = cisalhamento(img, planejamento(forma, args, reducao), args.metodo, fundo, janela=args.janela)
+        except ValueError as err:
+            parser.error(str(err))
+        logging.info(f'cisalhamentos em {time() - inicio} segundos')
+
+    # em faixas ou ladrilhos pelo perfil, com coordenadas exatas
+    elif (perfil.faixa, perfil.ladrilho) != (None, None) \
+            and (args.compacto, args.adaptativo, args.tolerancia) == (None, None, None):
+        try:
+            img = interpolacao(img, planejamento(forma, args, reducao), args.metodo, fundo,
+                            faixa=perfil.faixa, ladrilho=perfil.ladrilho, janela=args.janela)
+        except ValueError as err:
+            parser.error(str(err))
+        divisao = (f'ladrilhos de {perfil.ladrilho} pixels' if perfil.ladrilho is not None
+                   else f'faixas de {perfil.faixa} linhas')
+        logging.info(f'interpolação em {divisao} em {time() - inicio} segundos')
+
     # operações na imagem
-    ind = transformacao(img, args)
-    # tempo de transformação
-    logging.info(f'transformação em {time() - inicio} segundos')
+    else:
+        try:
+            ind = transformacao(img, planejamento(forma, args, reducao), args)
+        except ValueError as err:
+            parser.error(str(err))
+        # tempo de transformação
+        logging.info(f'transformação em {time() - inicio} segundos')
 
-    inicio = time()
-    # interpolação para o resultado
-    img = args.metodo(img, ind, args.cor)
-    # tempo de interpolação
-    logging.info(f'interpolação em {time() - inicio} segundos')
+        inicio = time()
+        # interpolação para o resultado
+        if args.adaptativo is not None:
+            img = adaptativo(img, ind, fundo, args.metodo, args.adaptativo, simples=args.simples)
+        else:
+            img = args.metodo(img, ind, fundo)
+        # tempo de interpolação
+        logging.info(f'interpolação em {time() - inicio} segundos')
 
     # exibição do resultado
     if args.saida is None:
         imgshow(img, arquivo)
-    # imprime o buffer PNG
-    elif args.saida == '-':
-        stdout.buffer.write(encode(img))
-    # ou escrita em arquivo
+    # ou escrita em arquivo, com formato pela extensão,
+    # ou em PNG na saída padrão
+    elif cache is not None:
+        try:
+            buf = encode(img, formato(args.saida), compressao=args.compressao,
+                         estrategia=args.estrategia, filtro=args.filtro)
+            grava(buf, args.saida)
+            cache.guarda(chave, buf)
+        except (ValueError, OSError) as err:
+            parser.error(str(err))
+        logging.info(f'cache: {cache.relatorio()}')
     else:
-        imgwrite(img, args.saida)
+        try:
+            with Escritor(compressao=args.compressao, estrategia=args.estrategia, filtro=args.filtro) as escritor:
+                escritor.escreve(img, args.saida)
+        except ValueError as err:
+            parser.error(str(err))